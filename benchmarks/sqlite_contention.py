@@ -0,0 +1,149 @@
+"""Benchmark of SQLite lock contention between the API and Celery workers writing to the same database.
+
+One API process reads lists of time series and occasionally updates a record, like the dashboard does, while worker
+processes insert time series and update video records in short transactions, like ingestion and syncing do. Each
+process uses the database settings of its profile. The benchmark reports the number of operations, "database is
+locked" errors and latencies per process type, for the former rollback journal settings and for the tuned settings.
+
+Usage::
+
+    python benchmarks/sqlite_contention.py --duration 10 --workers 2
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from orc_api import db as models
+
+# settings before tuning: rollback journal, full sync and the 5 s default timeout of the sqlite3 module
+BASELINE_SETTINGS = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "busy_timeout": 5000,
+    "mmap_size": 0,
+    "cache_size": 2000,
+    "pool_size": 5,
+    "max_overflow": 10,
+}
+
+
+def get_settings(mode: str, profile: str) -> dict:
+    """Get database settings of a process type for the benchmarked mode."""
+    return BASELINE_SETTINGS if mode == "baseline" else models.get_db_settings(profile)
+
+
+def api_process(url, mode, duration, results):
+    """Read the last 5000 time series, and update one in every 10 requests."""
+    engine = models.create_db_engine(url, get_settings(mode, "api"))
+    Session = sessionmaker(bind=engine)
+    latencies, errors = [], 0
+    stop = time.monotonic() + duration
+    n = 0
+    while time.monotonic() < stop:
+        tic = time.perf_counter()
+        try:
+            with Session() as session:
+                session.execute(
+                    select(models.TimeSeries.__table__).order_by(models.TimeSeries.timestamp.desc()).limit(5000)
+                ).all()
+                if n % 10 == 0:
+                    session.execute(text("UPDATE time_series SET h = h + 0.001 WHERE id = 1"))
+                    session.commit()
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - tic)
+        n += 1
+    results.put(("api", latencies, errors))
+
+
+def worker_process(url, mode, duration, results, worker_id):
+    """Insert batches of time series and update video records, as ingestion and sync jobs do."""
+    engine = models.create_db_engine(url, get_settings(mode, "worker"))
+    Session = sessionmaker(bind=engine)
+    latencies, errors = [], 0
+    stop = time.monotonic() + duration
+    n = 0
+    while time.monotonic() < stop:
+        tic = time.perf_counter()
+        try:
+            with Session() as session:
+                start = datetime(2030, 1, 1) + timedelta(days=worker_id * 10000 + n)
+                session.execute(
+                    insert(models.TimeSeries),
+                    [{"timestamp": start + timedelta(minutes=m), "h": m / 100} for m in range(100)],
+                )
+                session.execute(text("UPDATE video SET status = 'DONE' WHERE id = :id"), {"id": n % 100 + 1})
+                session.commit()
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - tic)
+        n += 1
+        # workers spend most of their time processing, not writing
+        time.sleep(0.005)
+    results.put(("worker", latencies, errors))
+
+
+def populate(url):
+    """Create tables with some time series and videos."""
+    engine = models.create_db_engine(url, BASELINE_SETTINGS)
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.TimeSeries),
+            [{"timestamp": datetime(2020, 1, 1) + timedelta(minutes=5 * n), "h": 1.0} for n in range(10000)],
+        )
+        conn.execute(insert(models.Video), [{"timestamp": datetime(2020, 1, 1), "status": "NEW"} for _ in range(100)])
+    engine.dispose()
+
+
+def run(mode: str, duration: float, n_workers: int):
+    """Run the API and workers concurrently on a new database, and print results per process type."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        populate(url)
+        # spawn clean processes, as the API and workers are, instead of forking threads of imported libraries
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = [context.Process(target=api_process, args=(url, mode, duration, results))]
+        processes += [
+            context.Process(target=worker_process, args=(url, mode, duration, results, worker_id))
+            for worker_id in range(n_workers)
+        ]
+        for p in processes:
+            p.start()
+        collected = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+    print(f"{mode}:")
+    for role in ["api", "worker"]:
+        latencies = np.concatenate([r[1] for r in collected if r[0] == role]) * 1000
+        errors = sum(r[2] for r in collected if r[0] == role)
+        print(
+            f"  {role:>6}: {len(latencies)} operations, {errors} locked errors, latency p50 "
+            f"{np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+            f"max {latencies.max():.1f} ms"
+        )
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--duration", type=float, default=10, help="duration [s] per mode")
+    parser.add_argument("--workers", type=int, default=2, help="number of worker processes")
+    args = parser.parse_args()
+    for mode in ["baseline", "tuned"]:
+        run(mode, args.duration, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark of listing time series filtered on video configurations, as in ``GET /api/time_series/``.
+
+Compares the former approach (load all records, filter in Python through the lazy-loaded video of each record) with
+``crud.time_series.get_list``, which filters in an outer join and loads video ids in the same query. Reports the
+number of SQL statements and the latency of both, including serialization of the response.
+
+Usage::
+
+    python benchmarks/time_series_list.py --records 100000
+
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from orc_api import crud
+from orc_api import db as models
+from orc_api.schemas.time_series import TimeSeriesResponseWithVideoId
+
+
+def populate(session, n_records: int, video_every: int = 10):
+    """Add time series every 5 minutes, with a video of one of two video configurations on every n-th record."""
+    session.add_all([models.VideoConfig(name="config 1"), models.VideoConfig(name="config 2")])
+    session.commit()
+    start = datetime(2020, 1, 1)
+    # core inserts, without ORM events, to populate the database quickly
+    session.execute(
+        insert(models.TimeSeries),
+        [{"timestamp": start + timedelta(minutes=5 * n), "h": n / 1000, "q_50": n / 100} for n in range(n_records)],
+    )
+    session.execute(
+        insert(models.Video),
+        [
+            {"timestamp": start + timedelta(minutes=5 * n), "time_series_id": n + 1, "video_config_id": n % 2 + 1}
+            for n in range(0, n_records, video_every)
+        ],
+    )
+    session.commit()
+
+
+def list_before(session, video_config_ids):
+    """List time series as before: all records are loaded and filtered in Python."""
+    ts_list = crud.time_series.get_query_list(session).all()
+    ts_final = []
+    for ts in ts_list:
+        if ts.video:
+            if ts.video.video_config_id in video_config_ids:
+                ts_final.append(ts)
+        elif 0 in video_config_ids:
+            ts_final.append(ts)
+    return ts_final
+
+
+def list_after(session, video_config_ids):
+    """List time series with filtering and video ids in one query."""
+    return crud.time_series.get_list(session, video_config_ids=video_config_ids, with_video_id=True)
+
+
+def run(session, engine, list_func, video_config_ids):
+    """Return number of statements, latency [s] and number of records of listing and serializing time series."""
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    session.expire_all()
+    event.listen(engine, "before_cursor_execute", count_statements)
+    tic = time.perf_counter()
+    records = list_func(session, video_config_ids)
+    _ = [TimeSeriesResponseWithVideoId.model_validate(ts).model_dump() for ts in records]
+    latency = time.perf_counter() - tic
+    event.remove(engine, "before_cursor_execute", count_statements)
+    return len(statements), latency, len(records)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=100000, help="number of time series records")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'benchmark.db')}")
+        models.Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        populate(session, args.records)
+        for video_config_ids in [[1], [0, 1, 2]]:
+            print(f"video_config_ids={video_config_ids}")
+            for name, list_func in [("before", list_before), ("after", list_after)]:
+                n_statements, latency, n_records = run(session, engine, list_func, video_config_ids)
+                print(f"  {name:>6}: {n_records} records, {n_statements} statements, {latency:.2f} s")
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
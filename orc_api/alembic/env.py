@@ -22,7 +22,7 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-from orc_api.db import sqlite_engine
+from orc_api.db import database_url
 from orc_api.db.base import Base
 
 # target_metadata = mymodel.Base.metadata
@@ -32,7 +32,8 @@ target_metadata = Base.metadata
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
-DATABASE_URL = sqlite_engine
+# a URL set in the config (e.g. by the updater or tests) takes precedence over the database of ORC-OS
+DATABASE_URL = config.get_main_option("sqlalchemy.url") or database_url
 
 
 def run_migrations_offline() -> None:
@@ -47,9 +48,8 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=DATABASE_URL,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
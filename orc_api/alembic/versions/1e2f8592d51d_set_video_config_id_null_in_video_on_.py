@@ -18,8 +18,33 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def upgrade_postgresql() -> None:
+    """Change foreign keys in place, PostgreSQL does not need to recreate tables."""
+    # the initial migration did not create the foreign key of video_config_id (use_alter is ignored in create_table)
+    op.create_foreign_key(
+        "fk_video_video_config_id", "video", "video_config", ["video_config_id"], ["id"], ondelete="SET NULL"
+    )
+    op.drop_constraint("video_config_sample_video_id_fkey", "video_config", type_="foreignkey")
+    # SQLite recreates video_config without its sync status index, which is added again in the next revision
+    op.drop_index("ix_video_config_sync_status", table_name="video_config")
+    # QUEUE was added to SyncStatus, the SQLite enum is a plain string, PostgreSQL has an enum type
+    op.execute("ALTER TYPE syncstatus ADD VALUE IF NOT EXISTS 'QUEUE'")
+
+
+def downgrade_postgresql() -> None:
+    """Restore foreign keys in place, the added enum value of sync status remains."""
+    op.create_index("ix_video_config_sync_status", "video_config", ["sync_status"], unique=False)
+    op.create_foreign_key(
+        "video_config_sample_video_id_fkey", "video_config", "video", ["sample_video_id"], ["id"]
+    )
+    op.drop_constraint("fk_video_video_config_id", "video", type_="foreignkey")
+
+
 def upgrade() -> None:
     conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        upgrade_postgresql()
+        return
     conn.execute(sa.text("""
         PRAGMA foreign_keys=OFF;
     """))
@@ -134,8 +159,11 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
-    op.execute("PRAGMA foreign_keys=OFF")
     conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        downgrade_postgresql()
+        return
+    op.execute("PRAGMA foreign_keys=OFF")
     op.create_table(
         'video_config_old',
         sa.Column('id', sa.Integer(), nullable=False),
@@ -332,3 +332,6 @@ def downgrade() -> None:
     op.drop_table("camera_config")
     op.drop_table("callback_url")
     # ### end Alembic commands ###
+    # enum types of PostgreSQL remain after their tables are dropped
+    for name in ["syncstatus", "devicestatus", "deviceformstatus", "scripttype", "videostatus"]:
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,47 @@
+"""updated_at stamp on remote tables
+
+Revision ID: 4a6c1d9e2f70
+Revises: e5328ed85676
+Create Date: 2026-10-17 09:12:44.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a6c1d9e2f70'
+down_revision: Union[str, Sequence[str], None] = 'e5328ed85676'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# all tables that derive from RemoteBase
+tables = ["camera_config", "cross_section", "recipe", "time_series", "video", "video_config"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable column without server default, so SQLite can add it in-place without recreating tables.
+    for table in tables:
+        op.add_column(
+            table,
+            sa.Column(
+                'updated_at',
+                sa.DateTime(),
+                nullable=True,
+                comment='Date time of last change of the record, used to invalidate cached derived data.'
+            )
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    for table in tables:
+        if bind.dialect.name == 'sqlite':
+            with op.batch_alter_table(table, recreate='always') as batch_op:
+                batch_op.drop_column('updated_at')
+        else:
+            op.drop_column(table, 'updated_at')
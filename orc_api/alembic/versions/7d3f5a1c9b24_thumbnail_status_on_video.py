@@ -0,0 +1,43 @@
+"""thumbnail status on video
+
+Revision ID: 7d3f5a1c9b24
+Revises: 9c41e7a2d5b3
+Create Date: 2026-10-17 16:21:08.402719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f5a1c9b24'
+down_revision: Union[str, Sequence[str], None] = '9c41e7a2d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+thumbnailstatus = sa.Enum('PENDING', 'DONE', 'FAILED', name='thumbnailstatus')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        thumbnailstatus.create(bind, checkfirst=True)
+    op.add_column(
+        'video', sa.Column('thumbnail_status', thumbnailstatus, server_default='PENDING', nullable=False)
+    )
+    # existing thumbnails were created when the video was stored
+    op.execute("UPDATE video SET thumbnail_status = 'DONE' WHERE thumbnail IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('video', recreate='always') as batch_op:
+            batch_op.drop_column('thumbnail_status')
+    else:
+        op.drop_column('video', 'thumbnail_status')
+        thumbnailstatus.drop(bind, checkfirst=True)
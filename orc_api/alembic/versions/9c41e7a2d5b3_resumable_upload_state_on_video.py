@@ -0,0 +1,36 @@
+"""resumable upload state on video
+
+Revision ID: 9c41e7a2d5b3
+Revises: 4a6c1d9e2f70
+Create Date: 2026-10-17 14:02:31.524117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41e7a2d5b3'
+down_revision: Union[str, Sequence[str], None] = '4a6c1d9e2f70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video', sa.Column('upload_id', sa.String(), nullable=True))
+    op.add_column('video', sa.Column('upload_offset', sa.Integer(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('video', recreate='always') as batch_op:
+            batch_op.drop_column('upload_offset')
+            batch_op.drop_column('upload_id')
+    else:
+        op.drop_column('video', 'upload_offset')
+        op.drop_column('video', 'upload_id')
@@ -65,6 +65,9 @@ def downgrade() -> None:
     op.drop_index(op.f('ix_service_service_type'), table_name='service')
     op.drop_index(op.f('ix_service_service_short_name'), table_name='service')
     op.drop_table('service')
+    # enum types of PostgreSQL remain after their tables are dropped
+    for name in ['servicetype', 'parametertype']:
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
 
     # remove JSON field from time series
     op.drop_column('time_series', 'misc')
@@ -0,0 +1,34 @@
+"""media metadata on video
+
+Revision ID: c2a8e4f1d6b7
+Revises: 7d3f5a1c9b24
+Create Date: 2026-10-17 18:47:53.190264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a8e4f1d6b7'
+down_revision: Union[str, Sequence[str], None] = '7d3f5a1c9b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing videos are probed when their metadata is first needed
+    op.add_column('video', sa.Column('media', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('video', recreate='always') as batch_op:
+            batch_op.drop_column('media')
+    else:
+        op.drop_column('video', 'media')
@@ -28,5 +28,5 @@ def upgrade() -> None:
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_column('callback_url', 'timeout')
+    op.drop_column('callback_url', 'retry_timeout')
     # ### end Alembic commands ###
@@ -6,7 +6,8 @@ import time
 from celery import Celery
 from celery.signals import beat_init
 
-from orc_api import INCOMING_DIRECTORY
+from orc_api import INCOMING_DEBOUNCE, INCOMING_DIRECTORY, INCOMING_RESCAN_INTERVAL, INCOMING_WATCHER
+from orc_api.utils.incoming_watcher import IncomingWatcher
 
 CELERY_BROKER_URL = os.getenv("ORC_CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("ORC_CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
@@ -28,12 +29,17 @@ celery_app.conf.update(
     timezone=CELERY_TIMEZONE,
     # Route tasks by workload so heavy video jobs do not block periodic maintenance.
     task_default_queue="sync",
+    # video jobs are long-running, only fetch a new one when a worker thread is free, so that jobs spread over
+    # workers and admission control decides on actual free memory
+    worker_prefetch_multiplier=1,
     task_routes={
         "orc_api.tasks.run_video": {"queue": "video"},
         "orc_api.tasks.sync_video": {"queue": "sync"},
         "orc_api.tasks.sync_videos_batch": {"queue": "sync"},
+        "orc_api.tasks.sync_time_series": {"queue": "sync"},
         "orc_api.tasks.run_water_level_job": {"queue": "periodic"},
         "orc_api.tasks.check_new_videos": {"queue": "periodic"},
+        "orc_api.tasks.ingest_videos": {"queue": "periodic"},
         "orc_api.tasks.run_disk_maintenance_job": {"queue": "periodic"},
     },
 )
@@ -85,7 +91,9 @@ def _build_beat_schedule() -> dict:
                 )
                 beat_schedule["video_check_job"] = {
                     "task": "orc_api.tasks.check_new_videos",
-                    "schedule": 5,
+                    # with a watcher, new videos are submitted immediately and full scans only catch missed files,
+                    # scans that find files not yet stable schedule their own follow-up scan
+                    "schedule": 5 if INCOMING_WATCHER == "off" else INCOMING_RESCAN_INTERVAL,
                     "args": (INCOMING_DIRECTORY, settings.model_dump(mode="dict"), start_time),
                     "options": {"queue": "periodic", "expires": 30},
                 }
@@ -108,6 +116,34 @@ def _dispatch_startup_tasks(app, beat_schedule: dict) -> None:
         print(f"Dispatched startup run for {entry_name} ({task_name}).")
 
 
+# watcher of the incoming folder, running in the beat process
+incoming_watcher = None
+
+
+def _start_incoming_watcher(app, entry: dict):
+    """Start watching the incoming folder, submitting completed video files for ingestion right away."""
+    global incoming_watcher
+    if INCOMING_WATCHER == "off":
+        print("Incoming folder watcher disabled, new videos are found with periodic scans only.")
+        return None
+    if incoming_watcher is not None:
+        incoming_watcher.stop()
+    path_incoming, settings_dict, _ = entry["args"]
+
+    def submit(file_paths):
+        app.send_task("orc_api.tasks.ingest_videos", args=(file_paths, settings_dict), queue="periodic")
+
+    incoming_watcher = IncomingWatcher(
+        path_incoming,
+        callback=submit,
+        suffix=settings_dict["video_file_fmt"].split(".")[-1],
+        debounce=INCOMING_DEBOUNCE,
+        use_inotify={"inotify": True, "poll": False}.get(INCOMING_WATCHER),
+    )
+    incoming_watcher.start()
+    return incoming_watcher
+
+
 @beat_init.connect
 def configure_beat_schedule(sender, **kwargs):
     """Build the beat schedule from DB settings at beat-startup time.
@@ -128,3 +164,5 @@ def configure_beat_schedule(sender, **kwargs):
         scheduler.sync()
     # Immediately dispatch one run for each periodic task so that maintenance tasks run at startup
     _dispatch_startup_tasks(app, beat_schedule)
+    if "video_check_job" in beat_schedule:
+        _start_incoming_watcher(app, beat_schedule["video_check_job"])
@@ -3,20 +3,25 @@
 import asyncio
 import os
 import shutil
+from datetime import datetime
+from typing import Optional
 
-from orc_api import UPLOAD_DIRECTORY, crud
+from orc_api import INCOMING_STABLE_WINDOW, INCOMING_WATCHER, UPLOAD_DIRECTORY, crud
 from orc_api.celery_app import celery_app
 from orc_api.database import get_session
+from orc_api.db.base import SyncStatus
 from orc_api.db.video import Video
 from orc_api.log import logger
 from orc_api.schemas.disk_management import DiskManagementResponse
-from orc_api.schemas.settings import SettingsResponse
+from orc_api.schemas.settings import SettingsResponse, file_claims
+from orc_api.schemas.time_series import sync_time_series_batch
 from orc_api.schemas.video import VideoResponse
+from orc_api.utils import sync_executor
 
 
 def async_job_wrapper(func, kwargs):
     """Wrap call to async functions synchronously, needed for scheduler."""
-    asyncio.run(func(**kwargs))  # Run the async function in the event loop
+    return asyncio.run(func(**kwargs))  # Run the async function in the event loop
 
 
 @celery_app.task(name="orc_api.tasks.run_water_level_job")
@@ -60,12 +65,23 @@ def run_disk_maintenance_job() -> dict:
 
 @celery_app.task(name="orc_api.tasks.check_new_videos")
 def check_new_videos(path_incoming: str, settings_dict: dict, start_time: float) -> dict:
-    """Check for new videos in the incoming directory and add them to the database."""
+    """Check for new videos in the incoming directory and add them to the database.
+
+    With the incoming folder watcher active, full scans only run every ``INCOMING_RESCAN_INTERVAL`` seconds. Files
+    missed by the watcher need two observations to be stable, so when a scan finds files that are not yet stable, a
+    follow-up scan is scheduled ``INCOMING_STABLE_WINDOW`` seconds later, instead of waiting for the next full scan.
+    """
     try:
         settings = SettingsResponse.model_validate(settings_dict)
-        async_job_wrapper(
+        pending = async_job_wrapper(
             settings.check_new_videos, {"path_incoming": path_incoming, "start_time": start_time, "logger": logger}
         )
+        # one follow-up scan at a time, also when a regular scan runs while a follow-up is scheduled
+        if pending and INCOMING_WATCHER != "off" and file_claims.claim("follow-up-scan", ttl=INCOMING_STABLE_WINDOW):
+            logger.debug(f"{len(pending)} new files are not yet stable, checking again in {INCOMING_STABLE_WINDOW} s.")
+            check_new_videos.apply_async(
+                args=(path_incoming, settings_dict, start_time), countdown=INCOMING_STABLE_WINDOW, queue="periodic"
+            )
         return {"status": "ok"}
     except Exception as e:
         error_msg = f"Error checking for new videos: {str(e)}"
@@ -73,6 +89,19 @@ def check_new_videos(path_incoming: str, settings_dict: dict, start_time: float)
         return {"status": "error", "message": error_msg}
 
 
+@celery_app.task(name="orc_api.tasks.ingest_videos")
+def ingest_videos(file_paths: list, settings_dict: dict) -> dict:
+    """Add completed video files, reported by the incoming folder watcher, to the database."""
+    try:
+        settings = SettingsResponse.model_validate(settings_dict)
+        async_job_wrapper(settings.ingest_videos, {"file_paths": file_paths, "logger": logger})
+        return {"status": "ok"}
+    except Exception as e:
+        error_msg = f"Error ingesting new videos: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        return {"status": "error", "message": error_msg}
+
+
 @celery_app.task(name="orc_api.tasks.run_video")
 def run_video(video_id: int, shutdown_after_task: bool = False) -> dict:
     """Process and run a video.
@@ -179,8 +208,65 @@ def sync_videos_batch(video_ids: list, site: int, sync_file: bool, sync_image: b
 
     """
     logger.info(f"Starting batch sync for {len(video_ids)} videos to site {site}")
-    results = []
-    for video_id in video_ids:
-        result = sync_video_task(video_id=video_id, site=site, sync_file=sync_file, sync_image=sync_image)
-        results.append(result)
+    # push shared video configs (with camera configs, recipes and cross sections) once for the whole batch
+    with get_session() as db:
+        failed_video_configs = sync_executor.sync_video_configs(db, video_ids, site, logger=logger)
+        skipped = {}
+        if failed_video_configs:
+            query = db.query(Video).filter(Video.id.in_(video_ids), Video.video_config_id.in_(failed_video_configs))
+            skipped = dict(query.with_entities(Video.id, Video.video_config_id).all())
+            query.update({Video.sync_status: SyncStatus.FAILED}, synchronize_session=False)
+            db.commit()
+    results = sync_executor.sync_videos_concurrently(
+        [video_id for video_id in video_ids if video_id not in skipped],
+        site=site,
+        sync_video=lambda video_id: sync_video_task(
+            video_id=video_id, site=site, sync_file=sync_file, sync_image=sync_image
+        ),
+        logger=logger,
+    )
+    results += [
+        {
+            "status": "error",
+            "video_id": video_id,
+            "message": f"Video configuration {video_config_id} could not be synced",
+        }
+        for video_id, video_config_id in skipped.items()
+    ]
     return {"status": "completed", "total": len(video_ids), "results": results}
+
+
+@celery_app.task(name="orc_api.tasks.sync_time_series")
+def sync_time_series_task(site: int, start: Optional[str] = None, stop: Optional[str] = None) -> dict:
+    """Sync all unsynced time series records to a remote site in chunks.
+
+    Parameters
+    ----------
+    site : int
+        Remote site ID
+    start : str, optional
+        Only sync records from this ISO-formatted datetime
+    stop : str, optional
+        Only sync records until this ISO-formatted datetime
+
+    Returns
+    -------
+    dict
+        Status and number of synced and failed records
+
+    """
+    logger.info(f"Starting time series sync to site {site}")
+    try:
+        with get_session() as db:
+            counts = sync_time_series_batch(
+                db,
+                site=site,
+                start=datetime.fromisoformat(start) if start else None,
+                stop=datetime.fromisoformat(stop) if stop else None,
+                logger=logger,
+            )
+        return {"status": "ok", "site": site, **counts}
+    except Exception as e:
+        error_msg = f"Error syncing time series to site {site}: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        return {"status": "error", "site": site, "message": error_msg}
@@ -2,7 +2,6 @@
 
 import json
 import os
-import shutil
 import traceback
 from datetime import datetime
 from pathlib import Path
@@ -10,20 +9,20 @@ from typing import Optional
 
 import click
 
-from orc_api import UPLOAD_DIRECTORY, crud
+from orc_api import crud
 from orc_api.crud import video as video_crud
 from orc_api.database import get_session
-from orc_api.db import Video
 from orc_api.db.video_config import VideoConfig
 from orc_api.schemas.camera_config import CameraConfigData, CameraConfigResponse
 from orc_api.schemas.cross_section import CrossSectionResponse
 from orc_api.schemas.recipe import RecipeResponse
 from orc_api.schemas.video import VideoCreate
 from orc_api.schemas.video_config import VideoConfigResponse
+from orc_api.utils import thumbnails
 from orc_api.utils.io import read_cross_section_from_csv, read_cross_section_from_geojson
 
 
-def add_video(db, file_path: str, timestamp: str, video_config_id: Optional[int] = None):
+def add_video(db, file_path: str, timestamp: str, video_config_id: Optional[int] = None, move: bool = False):
     """Add a new video from file path and timestamp through CLI."""
     try:
         ts = datetime.strptime(timestamp, "%Y%m%dT%H%M%SZ")
@@ -32,20 +31,14 @@ def add_video(db, file_path: str, timestamp: str, video_config_id: Optional[int]
         raise SystemExit(1)
     try:
         video_schema = VideoCreate(timestamp=ts, video_config_id=video_config_id)
-        video_instance = Video(**video_schema.model_dump(exclude_none=True))
-        video_instance = video_crud.add(db=db, video=video_instance)
-
-        date_dir = ts.strftime("%Y%m%d")
-        rel_file_path = os.path.join("videos", date_dir, str(video_instance.id), os.path.basename(file_path))
-        abs_file_path = os.path.join(UPLOAD_DIRECTORY, rel_file_path)
-        os.makedirs(os.path.dirname(abs_file_path), exist_ok=True)
-        shutil.copyfile(file_path, abs_file_path)
-
-        video_instance.file = rel_file_path
-        db.commit()
-        db.refresh(video_instance)
-
-        click.echo(f"✓ Video added: id={video_instance.id} file={rel_file_path}")
+        # the file is moved or linked into the upload directory, only copied if these are not possible
+        video_instance = video_crud.create_from_file(
+            db=db, file_path=file_path, timestamp=video_schema.timestamp, video_config_id=video_config_id, move=move
+        )
+        click.echo(f"✓ Video added: id={video_instance.id} file={video_instance.file}")
+        # thumbnails are created in a background thread, which does not outlive this command
+        if not thumbnails.thumbnail_worker.join(timeout=60):
+            click.echo("Thumbnails are not created yet, they will be created when the API starts.", err=True)
         return {"status": "success", "video_id": video_instance.id}
     except Exception as e:
         click.echo(f"✗ Adding video failed: {e}", err=True)
@@ -118,10 +111,11 @@ def video():
 @click.argument("file_path", type=click.Path(exists=True), required=True)
 @click.argument("timestamp", type=str, required=True)
 @click.option("--video-config-id", type=int, default=None, help="Optional video configuration id")
-def add(file_path, timestamp, video_config_id):
+@click.option("--move", is_flag=True, default=False, help="Move the file into ORC-OS instead of keeping the original")
+def add(file_path, timestamp, video_config_id, move):
     """Add a new video from file path and timestamp through CLI."""
     db = get_session()
-    add_video(db, file_path=file_path, timestamp=timestamp, video_config_id=video_config_id)
+    add_video(db, file_path=file_path, timestamp=timestamp, video_config_id=video_config_id, move=move)
 
 
 @video.command(name="list")
@@ -3,6 +3,7 @@
 from sqlalchemy.orm import Session
 
 from orc_api import db as models
+from orc_api.crud import generic
 
 
 def add(db: Session, camera_config: models.CameraConfig) -> models.CameraConfig:
@@ -21,10 +22,7 @@ def get_query_by_id(db: Session, id: int):
 def get(db: Session, id: int):
     """Get a single camera config record by id."""
     # get one by id
-    query = get_query_by_id(db=db, id=id)
-    if query.count() == 0:
-        return
-    return query.first()
+    return db.get(models.CameraConfig, id)
 
 
 def list(db: Session):
@@ -35,22 +33,13 @@ def list(db: Session):
 
 def update(db: Session, id: int, camera_config: dict):
     """Update a camera config record using a dict of potentially modified fields."""
-    rec = get_query_by_id(db=db, id=id)
-    if not rec.first():
+    record = generic.update(db, models.CameraConfig, id, camera_config)
+    if record is None:
         raise ValueError(f"Camera config with id {id} does not exist. Create a record first.")
-    # update_data = time_series.model_dump(exclude_unset=True, exclude=["id"])
-    rec.update(camera_config)
-    db.commit()
-    db.flush()
-    return rec.first()
+    return record
 
 
 def delete(db: Session, id: int):
     """Delete a single video."""
-    query = db.query(models.CameraConfig).filter(models.CameraConfig.id == id)
-    if query.count() == 0:
+    if not generic.delete_ids(db, models.CameraConfig, [id]):
         raise ValueError(f"Camera config with id {id} does not exist.")
-    recipe = query.first()
-    db.delete(recipe)
-    db.commit()
-    return
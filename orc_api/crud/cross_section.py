@@ -3,6 +3,7 @@
 from sqlalchemy.orm import Session
 
 from orc_api import db as models
+from orc_api.crud import generic
 
 
 def get_query_by_id(db: Session, id: int):
@@ -12,10 +13,7 @@ def get_query_by_id(db: Session, id: int):
 
 def get(db: Session, id: int):
     """Get a single video."""
-    query = get_query_by_id(db=db, id=id)
-    if query.count() == 0:
-        return
-    return query.first()
+    return db.get(models.CrossSection, id)
 
 
 def list(db: Session):
@@ -33,22 +31,13 @@ def add(db: Session, cross_section: models.CrossSection) -> models.CrossSection:
 
 def delete(db: Session, id: int):
     """Delete a single recipe."""
-    query = db.query(models.CrossSection).filter(models.CrossSection.id == id)
-    if query.count() == 0:
+    if not generic.delete_ids(db, models.CrossSection, [id]):
         raise ValueError(f"Cross Section with id {id} does not exist.")
-    recipe = query.first()
-    db.delete(recipe)
-    db.commit()
-    return
 
 
 def update(db: Session, id: int, cross_section: dict):
     """Update a cross-section record using a dict of potentially modified fields."""
-    rec = get_query_by_id(db=db, id=id)
-    if not rec.first():
+    record = generic.update(db, models.CrossSection, id, cross_section)
+    if record is None:
         raise ValueError(f"Time series with id {id} does not exist. Create a record first.")
-    # update_data = time_series.model_dump(exclude_unset=True, exclude=["id"])
-    rec.update(cross_section)
-    db.commit()
-    db.flush()
-    return rec.first()
+    return record
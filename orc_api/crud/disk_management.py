@@ -9,9 +9,7 @@ from orc_api.schemas.disk_management import DiskManagementCreate
 def get(db: Session):
     """Retrieve the disk management settings record from the database."""
     # there should always only be one disk management config. Hence retrieve the first.
-    dms = db.query(DiskManagement)
-    if dms.count() > 0:
-        return dms.first()
+    return db.query(DiskManagement).first()
 
 
 def create_update(db: Session, disk_management: DiskManagementCreate):
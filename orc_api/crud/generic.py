@@ -1,11 +1,83 @@
 """Generic CRUD operations, used in multiple CRUD modules."""
 
-from datetime import datetime
-from typing import Any, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 
+from sqlalchemy import select, union_all
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import Session
 from sqlalchemy.orm.query import Query
 
 
+def update(db: Session, model: Any, id: int, values: Dict[str, Any]) -> Optional[Any]:
+    """Update fields of a record by id, and return the updated record, or None if no record has the id.
+
+    The record is updated and returned in one ``UPDATE ... RETURNING`` statement where the database supports this
+    (PostgreSQL, SQLite >= 3.35). With older SQLite versions, the updated record is read by primary key afterwards.
+    As with ``Query.update``, ORM update events are not triggered, column ``onupdate`` defaults are applied.
+
+    Parameters
+    ----------
+    db : Session
+        database session
+    model : sqlalchemy model
+        based on Base, with an ``id`` primary key
+    id : int
+        id of the record to update
+    values : dict
+        column names and new values
+
+    Returns
+    -------
+    Model instance or None
+        The updated record, or None if no record with ``id`` exists.
+
+    """
+    statement = sql_update(model).where(model.id == id).values(values)
+    if db.get_bind().dialect.update_returning:
+        record = db.scalars(statement.returning(model), execution_options={"populate_existing": True}).one_or_none()
+    else:
+        result = db.execute(statement)
+        record = db.get(model, id, populate_existing=True) if result.rowcount else None
+    if record is None:
+        db.rollback()
+        return None
+    db.commit()
+    return record
+
+
+def delete_ids(db: Session, model: Any, ids: List[int]) -> int:
+    """Delete records by id in one ``DELETE ... WHERE id IN (...)`` statement, without loading them.
+
+    ORM delete events and relationship cascades are not applied, so this must not be used for models that rely on
+    these (e.g. videos, of which files are removed when deleted). Database foreign key actions do apply.
+
+    Parameters
+    ----------
+    db : Session
+        database session
+    model : sqlalchemy model
+        based on Base, with an ``id`` primary key
+    ids : list of int
+        ids of the records to delete
+
+    Returns
+    -------
+    int
+        The number of deleted records.
+
+    """
+    if not ids:
+        return 0
+    try:
+        count = db.query(model).filter(model.id.in_(ids)).delete()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return count
+
+
 def get_closest(
     query: Query,
     model: Any,
@@ -14,11 +86,13 @@ def get_closest(
 ) -> Optional[Any]:
     """Fetch the model instance closest to the given timestamp.
 
-    This function queries to find the model instance that is closest
-    to the specified timestamp. If both prior and subsequent model instances
-    exist, it determines the closest one based on the absolute time difference.
-    Optionally, it checks whether the closest record falls within an allowed
-    time difference from the specified timestamp.
+    This function finds the model instances just before and just after the
+    specified timestamp and returns the closest of both, based on the absolute
+    time difference. Both are found in a single statement, each by walking the
+    timestamp index from the specified timestamp onwards until the first record
+    that matches the filters of `query`. With `allowed_dt`, the walk is bounded
+    to records within the allowed time difference, so that the cost of the lookup
+    does not grow with the size of the table.
 
     Parameters
     ----------
@@ -47,23 +121,25 @@ def get_closest(
     """
     # SQLite does not allow for tzinfo in a time stamp, therefore, first remove the tzinfo if it exists
     timestamp = timestamp.replace(tzinfo=None)
-    before_record = query.filter(model.timestamp <= timestamp).order_by(model.timestamp.desc()).first()
-    after_record = query.filter(model.timestamp > timestamp).order_by(model.timestamp).first()
-
-    # Determine the closest record
-    closest_record = None
-    if before_record and after_record:
-        if abs((before_record.timestamp - timestamp).total_seconds()) <= abs(
-            (after_record.timestamp - timestamp).total_seconds()
-        ):
-            closest_record = before_record
-        else:
-            closest_record = after_record
-    elif before_record:
-        closest_record = before_record
-    elif after_record:
-        closest_record = after_record
+    # remove any ordering of the query, so that the timestamp index determines the order
+    query = query.order_by(None)
+    before_query = query.filter(model.timestamp <= timestamp)
+    after_query = query.filter(model.timestamp > timestamp)
+    if allowed_dt:
+        before_query = before_query.filter(model.timestamp >= timestamp - timedelta(seconds=allowed_dt))
+        after_query = after_query.filter(model.timestamp <= timestamp + timedelta(seconds=allowed_dt))
+    before_id = before_query.with_entities(model.id).order_by(model.timestamp.desc()).limit(1).subquery()
+    after_id = after_query.with_entities(model.id).order_by(model.timestamp).limit(1).subquery()
+    candidates = (
+        query.session.query(model).filter(model.id.in_(union_all(select(before_id.c.id), select(after_id.c.id)))).all()
+    )
 
+    # Determine the closest record, the one before the timestamp if both are equally close
+    closest_record = min(
+        candidates,
+        key=lambda record: (abs((record.timestamp - timestamp).total_seconds()), record.timestamp > timestamp),
+        default=None,
+    )
     if not closest_record:
         return None
     if allowed_dt:
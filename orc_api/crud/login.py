@@ -8,9 +8,7 @@ from orc_api import db as models
 
 def get(db: Session):
     """Get the hashed password."""
-    pw_query = db.query(models.Password)
-    if pw_query.count() > 0:
-        return pw_query.first()
+    return db.query(models.Password).first()
 
 
 def create(db: Session, new_password: str):
@@ -47,7 +45,6 @@ def delete_all_passwords(db: Session) -> int:
         int: Number of password records deleted
 
     """
-    count = db.query(models.Password).count()
-    db.query(models.Password).delete()
+    count = db.query(models.Password).delete()
     db.commit()
     return count
@@ -3,6 +3,7 @@
 from sqlalchemy.orm import Session
 
 from orc_api import db as models
+from orc_api.crud import generic
 
 
 def get_query_by_id(db: Session, id: int):
@@ -12,10 +13,7 @@ def get_query_by_id(db: Session, id: int):
 
 def get(db: Session, id: int):
     """Get a single video."""
-    query = get_query_by_id(db=db, id=id)
-    if query.count() == 0:
-        return
-    return query.first()
+    return db.get(models.Recipe, id)
 
 
 def list(db: Session):
@@ -33,22 +31,13 @@ def add(db: Session, recipe: models.Recipe) -> models.Recipe:
 
 def update(db: Session, id: int, recipe: dict):
     """Update a recipe record using a dict of potentially modified fields."""
-    rec = get_query_by_id(db=db, id=id)
-    if not rec.first():
+    record = generic.update(db, models.Recipe, id, recipe)
+    if record is None:
         raise ValueError(f"Recipe with id {id} does not exist. Create a record first.")
-    # update_data = time_series.model_dump(exclude_unset=True, exclude=["id"])
-    rec.update(recipe)
-    db.commit()
-    db.flush()
-    return rec.first()
+    return record
 
 
 def delete(db: Session, id: int):
     """Delete a single recipe."""
-    query = db.query(models.Recipe).filter(models.Recipe.id == id)
-    if query.count() == 0:
+    if not generic.delete_ids(db, models.Recipe, [id]):
         raise ValueError(f"Recipe with id {id} does not exist.")
-    recipe = query.first()
-    db.delete(recipe)
-    db.commit()
-    return
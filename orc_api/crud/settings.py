@@ -8,9 +8,7 @@ from orc_api import db as models
 def get(db: Session):
     """Get the disk management configuration. There should always be one configuration."""
     # there should always only be one disk management config. Hence retrieve the first.
-    settings = db.query(models.Settings)
-    if settings.count() > 0:
-        return settings.first()
+    return db.query(models.Settings).first()
 
 
 def add(db: Session, settings: models.Settings):
@@ -1,15 +1,23 @@
 """CRUD operations for time series."""
 
+import math
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence
 
-from sqlalchemy import exists
-from sqlalchemy.orm import Session
+from sqlalchemy import BigInteger, Integer, Row, case, cast, exists, func, or_
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import Session, contains_eager, selectinload
 from sqlalchemy.orm.query import Query
+from sqlalchemy.sql.elements import ColumnElement
 
 from orc_api import db as models
 from orc_api.crud import generic
 
+# time series with these statuses still need to be synced with the remote server
+UNSYNCED_STATUSES = [models.SyncStatus.LOCAL, models.SyncStatus.UPDATED, models.SyncStatus.FAILED]
+# variables that are aggregated per time bucket
+AGGREGATE_VARIABLES = ["h", "q_50"]
+
 
 def filter_start_stop(
     query: Query, start: Optional[datetime] = None, stop: Optional[datetime] = None, desc: Optional[bool] = None
@@ -26,6 +34,29 @@ def filter_start_stop(
     return query
 
 
+def join_video(query: Query) -> Query:
+    """Join the video attached to time series, keeping time series without video."""
+    return query.outerjoin(models.Video, models.Video.time_series_id == models.TimeSeries.id)
+
+
+def filter_video_config_ids(query: Query, video_config_ids: List[int]) -> Query:
+    """Filter a query, joined with ``join_video``, on the video configuration of the video attached to time series.
+
+    Time series without video are selected with video configuration ID 0.
+    """
+    condition = models.Video.video_config_id.in_(video_config_ids)
+    if 0 in video_config_ids:
+        condition = or_(condition, models.Video.id.is_(None))
+    return query.filter(condition)
+
+
+def _epoch(db: Session, column) -> ColumnElement:
+    """Get seconds since 1970-01-01 of a time stamp column in SQL."""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.extract("epoch", column), BigInteger)
+    return cast(func.strftime("%s", column), Integer)
+
+
 def get_query_by_id(db: Session, id: int):
     """Get a single time series record by id."""
     return db.query(models.TimeSeries).filter(models.TimeSeries.id == id)
@@ -38,9 +69,22 @@ def get_query_list(
     desc: Optional[bool] = None,
     count: Optional[int] = None,
     has_video: Optional[bool] = None,
+    video_config_ids: Optional[List[int]] = None,
+    with_video_id: bool = False,
 ):
-    """Get a query of time series (not yet extracted)."""
+    """Get a query of time series (not yet extracted).
+
+    With ``video_config_ids``, only time series of videos with these video configurations are selected (0 for time
+    series without video). With ``with_video_id``, the id of the attached video is loaded in the same query, so that
+    ``ts.video.id`` does not require a query per record.
+    """
     query = db.query(models.TimeSeries)
+    if video_config_ids or with_video_id:
+        query = join_video(query)
+    if video_config_ids:
+        query = filter_video_config_ids(query, video_config_ids)
+    if with_video_id:
+        query = query.options(contains_eager(models.TimeSeries.video).load_only(models.Video.id))
     query = filter_start_stop(query, start, stop, desc)
     if has_video is not None:
         if has_video:
@@ -56,12 +100,36 @@ def get_query_list(
     return query
 
 
+def get_query_unsynced(
+    db: Session,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    count: Optional[int] = None,
+) -> Query:
+    """Get a query of time series that are not (successfully) synced yet, ordered by id.
+
+    Use ``after_id`` with the last id of a previous chunk to continue with the next chunk, also when records of the
+    previous chunk remain unsynced (e.g. failed). Attached videos are loaded in one go, as these are needed to
+    validate the records.
+    """
+    query = (
+        db.query(models.TimeSeries)
+        .options(selectinload(models.TimeSeries.video))
+        .filter(models.TimeSeries.sync_status.in_(UNSYNCED_STATUSES))
+    )
+    query = filter_start_stop(query, start, stop, desc=False)
+    if after_id is not None:
+        query = query.filter(models.TimeSeries.id > after_id)
+    query = query.order_by(models.TimeSeries.id)
+    if count is not None:
+        query = query.limit(count)
+    return query
+
+
 def get(db: Session, id: int):
     """Get single time series record by id."""
-    query = get_query_by_id(db=db, id=id)
-    if query.count() == 0:
-        return
-    return query.first()
+    return db.get(models.TimeSeries, id)
 
 
 def get_list(
@@ -71,23 +139,131 @@ def get_list(
     desc: Optional[bool] = True,
     video_config_ids: Optional[List[int]] = None,
     count: Optional[int] = None,
+    with_video_id: bool = False,
 ):
-    """Get records of time series."""
-    query = get_query_list(db=db, start=start, stop=stop, count=count, desc=desc)
-    ts_list = query.all()
-    if not video_config_ids:
-        return ts_list
-    ts_final = []
-    # filter out those that are in video_config_ids
-    for ts in ts_list:
-        if ts.video:
-            if ts.video.video_config_id in video_config_ids:
-                ts_final.append(ts)
-        else:
-            if 0 in video_config_ids:
-                # also append if zero in list of video_config_ids
-                ts_final.append(ts)
-    return ts_final
+    """Get records of time series, filtered on video configurations of their video in the same query."""
+    query = get_query_list(
+        db=db,
+        start=start,
+        stop=stop,
+        count=count,
+        desc=desc,
+        video_config_ids=video_config_ids,
+        with_video_id=with_video_id,
+    )
+    return query.all()
+
+
+def get_rows(
+    db: Session,
+    columns: List[str],
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    desc: Optional[bool] = True,
+    count: Optional[int] = None,
+    chunk_size: int = 1000,
+) -> Iterator[Row]:
+    """Iterate over selected columns of time series records, fetching rows from the database in chunks.
+
+    Rows are plain tuples instead of ORM instances, and only ``chunk_size`` rows are held in memory at once, so that
+    years of records can be exported without loading all of them.
+    """
+    query = db.query(*[getattr(models.TimeSeries, column) for column in columns])
+    query = filter_start_stop(query, start, stop, desc)
+    if count is not None:
+        query = query.limit(count)
+    yield from query.execution_options(yield_per=chunk_size)
+
+
+def get_bucket_size(
+    db: Session,
+    max_points: int,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    video_config_ids: Optional[List[int]] = None,
+) -> int:
+    """Get the smallest time bucket size [s] that returns at most ``max_points`` buckets for the selected period.
+
+    If ``start`` or ``stop`` is not provided, the period is limited by the first and last selected record.
+    """
+    if start is None or stop is None:
+        query = db.query(func.min(models.TimeSeries.timestamp), func.max(models.TimeSeries.timestamp))
+        query = filter_start_stop(query, start, stop, desc=False)
+        if video_config_ids:
+            query = filter_video_config_ids(join_video(query), video_config_ids)
+        first, last = query.one()
+        if first is None:
+            return 1
+        start = start or first
+        stop = stop or last
+    span = max((stop - start).total_seconds(), 0)
+    # buckets are aligned on multiples of the bucket size, so a period may touch one bucket more than it spans
+    return max(1, math.ceil(span / (max_points - 1)))
+
+
+def get_aggregates(
+    db: Session,
+    bucket_size: int,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    video_config_ids: Optional[List[int]] = None,
+    quantiles: Sequence[float] = (0.25, 0.5, 0.75),
+) -> List[Row]:
+    """Aggregate time series in time buckets, computed in SQL.
+
+    Per bucket, the number of records and minimum, mean, maximum and quantiles of each of ``AGGREGATE_VARIABLES`` are
+    returned. Buckets are numbered by seconds since 1970-01-01 divided by ``bucket_size``. Quantiles take the nearest
+    lower value (as ``numpy.quantile(..., method="lower")``), found by ranking values within each bucket.
+
+    Parameters
+    ----------
+    db : Session
+        database session
+    bucket_size : int
+        size of time buckets [s]
+    start, stop : datetime, optional
+        period of time series
+    video_config_ids : list of int, optional
+        only aggregate time series of videos with these video configurations (0 for time series without video)
+    quantiles : sequence of float, optional
+        quantiles (between 0 and 1) to compute per variable
+
+    Returns
+    -------
+    list of Row
+        rows with ``bucket``, ``count`` and per variable ``<var>_min``, ``<var>_mean``, ``<var>_max`` and
+        ``<var>_q<i>`` for the i-th quantile, ordered by bucket
+
+    """
+    bucket = (_epoch(db, models.TimeSeries.timestamp) // bucket_size).label("bucket")
+    columns = [bucket]
+    for var in AGGREGATE_VARIABLES:
+        value = getattr(models.TimeSeries, var)
+        columns += [
+            value.label(var),
+            # rank values within the bucket, missing values last
+            func.row_number().over(partition_by=bucket, order_by=[value.is_(None), value]).label(f"{var}_rank"),
+            func.count(value).over(partition_by=bucket).label(f"{var}_n"),
+        ]
+    query = db.query(*columns)
+    query = filter_start_stop(query, start, stop, desc=False)
+    if video_config_ids:
+        query = filter_video_config_ids(join_video(query), video_config_ids)
+    ranked = query.subquery()
+
+    aggregates = [ranked.c.bucket, func.count().label("count")]
+    for var in AGGREGATE_VARIABLES:
+        value, rank, n = ranked.c[var], ranked.c[f"{var}_rank"], ranked.c[f"{var}_n"]
+        aggregates += [
+            func.min(value).label(f"{var}_min"),
+            func.avg(value).label(f"{var}_mean"),
+            func.max(value).label(f"{var}_max"),
+        ]
+        for i, q in enumerate(quantiles):
+            # rank of floor((n - 1) * q) + 1 in integer arithmetic, which is the same in SQLite and PostgreSQL
+            q_rank = (n - 1) * round(q * 1000) // 1000 + 1
+            aggregates.append(func.max(case((rank == q_rank, value))).label(f"{var}_q{i}"))
+    return db.query(*aggregates).group_by(ranked.c.bucket).order_by(ranked.c.bucket).all()
 
 
 def get_closest(
@@ -110,11 +286,31 @@ def add(db: Session, time_series: models.TimeSeries) -> models.TimeSeries:
 
 def update(db: Session, id: int, time_series: dict):
     """Update a time series record using the TimeSeriesResponse instance."""
-    rec = get_query_by_id(db=db, id=id)
-    if not rec.first():
+    record = generic.update(db, models.TimeSeries, id, time_series)
+    if record is None:
         raise ValueError(f"Time series with id {id} does not exist. Create a record first.")
-    # update_data = time_series.model_dump(exclude_unset=True, exclude=["id"])
-    rec.update(time_series)
+    return record
+
+
+def update_remote_ids(db: Session, remote_ids: Dict[int, int]):
+    """Set remote ids of synced time series records in one transaction, using a dict of {id: remote_id}."""
+    if not remote_ids:
+        return
+    db.execute(
+        sql_update(models.TimeSeries),
+        [
+            {"id": id, "remote_id": remote_id, "sync_status": models.SyncStatus.SYNCED}
+            for id, remote_id in remote_ids.items()
+        ],
+    )
+    db.commit()
+
+
+def update_sync_status(db: Session, ids: List[int], sync_status: models.SyncStatus):
+    """Set the sync status of several time series records at once."""
+    if not ids:
+        return
+    db.query(models.TimeSeries).filter(models.TimeSeries.id.in_(ids)).update(
+        {"sync_status": sync_status}, synchronize_session=False
+    )
     db.commit()
-    db.flush()
-    return rec.first()
@@ -2,15 +2,20 @@
 
 import os
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from fastapi import UploadFile
+from sqlalchemy import and_, or_, select
+from sqlalchemy import delete as sql_delete
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.orm.query import Query
 
 from orc_api import UPLOAD_DIRECTORY
 from orc_api import db as models
 from orc_api.crud import generic
+from orc_api.log import logger
+from orc_api.utils import disk_management, image
+from orc_api.utils.file_reaper import file_reaper
 
 
 def filter_start_stop(query: Query, start: Optional[datetime] = None, stop: Optional[datetime] = None, desc=True):
@@ -46,10 +51,7 @@ def get_query_by_id(db: Session, id: int) -> Query:
 
 def get(db: Session, id: int) -> Optional[models.Video]:
     """Get a single video."""
-    query = get_query_by_id(db=db, id=id)
-    if query.count() == 0:
-        return
-    return query.first()
+    return db.get(models.Video, id)
 
 
 def get_closest(
@@ -112,6 +114,70 @@ def get_query_list(
     return query
 
 
+def get_query_list_rows(
+    db: Session,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    status: Optional[models.VideoStatus] = None,
+    sync_status: Optional[models.SyncStatus] = None,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    first: Optional[int] = None,
+    count: Optional[int] = None,
+) -> Query:
+    """Get a column-projected query of videos for listing, ordered by (timestamp, id) from last to first.
+
+    Only the video columns needed for listing are selected, together with the attached time series columns
+    (prefixed with ``ts_``). No relationships are loaded. If ``cursor`` is provided as a (timestamp, id) tuple of the
+    last record of a previous page, only records after that record are returned (keyset pagination), which does not
+    slow down with deeper pages, in contrast to ``first`` (OFFSET).
+    """
+    ts_columns = [c.label(f"ts_{c.key}") for c in models.TimeSeries.__table__.columns]
+    query = db.query(
+        models.Video.id,
+        models.Video.timestamp,
+        models.Video.file,
+        models.Video.status,
+        models.Video.sync_status,
+        models.Video.remote_id,
+        models.Video.video_config_id,
+        models.Video.time_series_id,
+        *ts_columns,
+    ).outerjoin(models.TimeSeries, models.Video.time_series_id == models.TimeSeries.id)
+    query = filter_start_stop(query, start, stop, desc=False)
+    query = filter_status(query, status)
+    query = filter_sync_status(query, sync_status)
+    if cursor is not None:
+        cursor_timestamp, cursor_id = cursor
+        query = query.where(
+            or_(
+                models.Video.timestamp < cursor_timestamp,
+                and_(models.Video.timestamp == cursor_timestamp, models.Video.id < cursor_id),
+            )
+        )
+    # the timestamp index implicitly contains the id (rowid), so this ordering is served by the index
+    query = query.order_by(models.Video.timestamp.desc(), models.Video.id.desc())
+    if first is not None:
+        query = query.offset(first)
+    if count is not None:
+        query = query.limit(count)
+    return query
+
+
+def get_list_rows(
+    db: Session,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    status: Optional[models.VideoStatus] = None,
+    sync_status: Optional[models.SyncStatus] = None,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    first: Optional[int] = None,
+    count: Optional[int] = None,
+):
+    """List column-projected rows of videos, optionally after a (timestamp, id) cursor."""
+    query = get_query_list_rows(db, start, stop, status, sync_status, cursor, first, count)
+    return query.all()
+
+
 def get_list(
     db: Session,
     start: Optional[datetime] = None,
@@ -142,25 +208,38 @@ def get_list_count(
 
 def delete(db: Session, id: int):
     """Delete a single video."""
-    query = db.query(models.Video).filter(models.Video.id == id)
-    if query.count() == 0:
+    # loaded and deleted through the session, so that the files of the video are removed as well
+    video = db.get(models.Video, id)
+    if video is None:
         raise ValueError(f"Video with id {id} does not exist.")
-    video = query.first()
     db.delete(video)
     db.commit()
     return
 
 
-def delete_start_stop(db: Session, start: datetime, stop: datetime):
-    """Delete all videos between start and stop datetime."""
-    query = db.query(models.Video)
-    query = filter_start_stop(query, start, stop, desc=False)  # order_by cannot be called when records are deleted
-    videos = query.all()  # Fetch all records (load into memory)
-    for video in videos:
-        db.delete(video)  # Use session's delete method to trigger event listener for file removal
-    # query.delete()
+def delete_start_stop(db: Session, start: datetime, stop: datetime) -> int:
+    """Delete all videos between start and stop datetime in one statement, and remove their files in the background.
+
+    The ``before_delete`` listener of videos is not triggered. Instead, the directories of the deleted videos are
+    handed to the file reaper, so that the request and the database transaction do not wait for the disk.
+
+    Returns
+    -------
+    int
+        number of deleted videos
+
+    """
+    statement = filter_start_stop(sql_delete(models.Video), start, stop, desc=False)
+    if db.get_bind().dialect.delete_returning:
+        files = db.scalars(statement.returning(models.Video.file)).all()
+    else:
+        # SQLite < 3.35, select the files of the same videos first
+        files = db.scalars(filter_start_stop(select(models.Video.file), start, stop, desc=False)).all()
+        db.execute(statement)
     db.commit()
-    return
+    paths = {os.path.split(os.path.join(UPLOAD_DIRECTORY, file))[0] for file in files if file}
+    file_reaper.submit(sorted(paths))
+    return len(files)
 
 
 def add(db: Session, video: models.Video) -> models.Video:
@@ -173,14 +252,27 @@ def add(db: Session, video: models.Video) -> models.Video:
 
 def update(db: Session, id: int, video: dict):
     """Update a video record using the VideoResponse instance."""
-    rec = get_query_by_id(db=db, id=id)
-    if not rec.first():
+    record = generic.update(db, models.Video, id, video)
+    if record is None:
         raise ValueError(f"Video with id {id} does not exist. Create a record first.")
-    # update_data = video.model_dump(exclude_unset=True, exclude=["id"])
-    rec.update(video)
-    db.commit()
-    db.flush()
-    return rec.first()
+    return record
+
+
+def probe_media(file_path: str) -> Optional[dict]:
+    """Probe metadata of a video file, None if the file cannot be read as video."""
+    try:
+        return image.probe_video(file_path)
+    except Exception as e:
+        logger.warning(f"Could not read metadata of video file {file_path}: {e}")
+        return None
+
+
+def update_media(db: Session, id: int, file_path: str) -> Optional[dict]:
+    """Probe and store metadata of a video that has none yet, e.g. because it was stored by an older version."""
+    media = probe_media(file_path)
+    if media is not None:
+        update(db, id, {"media": media})
+    return media
 
 
 async def create_from_upload(
@@ -215,7 +307,93 @@ async def create_from_upload(
             f.write(chunk)
 
     video_instance.file = rel_file_path
+    video_instance.media = probe_media(abs_file_path)
     db.commit()
     db.refresh(video_instance)
     # return the raw database model
     return video_instance
+
+
+def create_from_files(
+    db: Session,
+    files: List[Tuple[str, datetime]],
+    video_config_id: Optional[int] = None,
+    move: bool = True,
+    skip_missing: bool = False,
+) -> List[models.Video]:
+    """Transfer local video files into the upload directory and create their database records in one transaction.
+
+    Files are renamed (or linked if ``move`` is False) instead of copied where possible, see
+    ``disk_management.transfer_file``. If anything fails, the transaction is rolled back and the transfers are
+    undone.
+
+    Parameters
+    ----------
+    db : Session
+        database session
+    files : list of (str, datetime)
+        paths to video files with their timestamps
+    video_config_id : int, optional
+        video config to use for all videos
+    move : bool, optional
+        if set (default), the original files are removed, otherwise they are kept
+    skip_missing : bool, optional
+        if set, files that no longer exist at transfer time (e.g. picked up by another task) are skipped without
+        creating a record, instead of failing the whole batch (default False)
+
+    Returns
+    -------
+    list of models.Video
+        the created video records, in the same order as ``files`` (without skipped files)
+
+    """
+    # probe metadata before the transaction starts
+    videos = [
+        models.Video(timestamp=timestamp, video_config_id=video_config_id, media=probe_media(file_path))
+        for file_path, timestamp in files
+    ]
+    db.add_all(videos)
+    transferred = []
+    created = []
+    try:
+        # ids are needed for the file paths
+        db.flush()
+        for (file_path, timestamp), video_instance in zip(files, videos):
+            rel_file_path = os.path.join(
+                "videos", timestamp.strftime("%Y%m%d"), str(video_instance.id), os.path.basename(file_path)
+            )
+            abs_file_path = os.path.join(UPLOAD_DIRECTORY, rel_file_path)
+            try:
+                disk_management.transfer_file(file_path, abs_file_path, move=move)
+            except FileNotFoundError:
+                if not skip_missing:
+                    raise
+                logger.warning(f"Video file {file_path} disappeared before it could be transferred, skipping.")
+                # the record has no file yet, so remove it without the file cleanup of ORM deletes
+                db.execute(sql_delete(models.Video).where(models.Video.id == video_instance.id))
+                db.expunge(video_instance)
+                continue
+            transferred.append((file_path, abs_file_path))
+            video_instance.file = rel_file_path
+            created.append(video_instance)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for file_path, abs_file_path in transferred:
+            if move:
+                disk_management.move_file(abs_file_path, file_path)
+            else:
+                os.remove(abs_file_path)
+        raise
+    return created
+
+
+def create_from_file(
+    db: Session,
+    file_path: str,
+    timestamp: datetime,
+    video_config_id: Optional[int] = None,
+    move: bool = True,
+) -> models.Video:
+    """Transfer a local video file into the upload directory and create its database record, see create_from_files."""
+    return create_from_files(db, files=[(file_path, timestamp)], video_config_id=video_config_id, move=move)[0]
@@ -5,6 +5,7 @@ from typing import List
 from sqlalchemy.orm import Session
 
 from orc_api import db as models
+from orc_api.crud import generic
 
 
 def get_query_by_id(db: Session, id: int):
@@ -14,10 +15,7 @@ def get_query_by_id(db: Session, id: int):
 
 def get(db: Session, id: int):
     """Get a single video config."""
-    query = get_query_by_id(db=db, id=id)
-    if query.count() == 0:
-        return
-    return query.first()
+    return db.get(models.VideoConfig, id)
 
 
 def get_list(db: Session) -> List[models.Video]:
@@ -26,15 +24,35 @@ def get_list(db: Session) -> List[models.Video]:
     return query.all()
 
 
+def get_summary_rows(db: Session, ids: List[int]):
+    """Get light-weight rows of video configs with their camera config data, without loading geometries.
+
+    Only columns needed to summarize a video config (e.g. for listing videos) are selected, together with the
+    ``updated_at`` stamps of the video config and camera config, so that derived summaries can be cached.
+    """
+    query = (
+        db.query(
+            models.VideoConfig.id,
+            models.VideoConfig.name,
+            models.VideoConfig.sample_video_id,
+            models.VideoConfig.camera_config_id,
+            models.VideoConfig.recipe_id,
+            models.VideoConfig.cross_section_id,
+            models.VideoConfig.cross_section_wl_id,
+            models.VideoConfig.updated_at,
+            models.CameraConfig.data.label("camera_config_data"),
+            models.CameraConfig.updated_at.label("camera_config_updated_at"),
+        )
+        .outerjoin(models.CameraConfig, models.VideoConfig.camera_config_id == models.CameraConfig.id)
+        .filter(models.VideoConfig.id.in_(ids))
+    )
+    return query.all()
+
+
 def delete(db: Session, id: int):
     """Delete a single video."""
-    query = db.query(models.VideoConfig).filter(models.VideoConfig.id == id)
-    if query.count() == 0:
+    if not generic.delete_ids(db, models.VideoConfig, [id]):
         raise ValueError(f"Video config with id {id} does not exist.")
-    video_config = query.first()
-    db.delete(video_config)
-    db.commit()
-    return
 
 
 def add(db: Session, video_config: models.VideoConfig) -> models.VideoConfig:
@@ -47,11 +65,10 @@ def add(db: Session, video_config: models.VideoConfig) -> models.VideoConfig:
 
 def update(db: Session, id: int, video_config: dict):
     """Update a video record using the VideoResponse instance."""
-    record = get_query_by_id(db=db, id=id).first()
+    record = db.get(models.VideoConfig, id)
     if not record:
         raise ValueError(f"Video config with id {id} does not exist. Create a record first.")
     for key, value in video_config.items():
         setattr(record, key, value)
     db.commit()
-    db.flush()
     return record
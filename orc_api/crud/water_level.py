@@ -14,9 +14,7 @@ def delete(db: Session):
 def get(db: Session):
     """Get the water level settings."""
     # Retrieve the first water level.
-    wls = db.query(models.WaterLevelSettings)
-    if wls.count() > 0:
-        return wls.first()
+    return db.query(models.WaterLevelSettings).first()
 
 
 def update(db: Session, water_level_settings: models.WaterLevelSettings):
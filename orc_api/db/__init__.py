@@ -2,12 +2,25 @@
 
 import os
 import sqlite3
+import sys
+from contextlib import closing
 
 from sqlalchemy import create_engine, event, inspect
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 
-from orc_api import __home__
+from orc_api import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_PROFILE,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+    __home__,
+)
 
 from .base import Base, RemoteBase, SyncStatus
 from .callback_url import CallbackUrl
@@ -20,7 +33,7 @@ from .recipe import Recipe
 from .service import Service, ServiceParameter
 from .settings import Settings
 from .time_series import TimeSeries
-from .video import Video, VideoStatus
+from .video import ThumbnailStatus, Video, VideoStatus
 from .video_config import VideoConfig
 from .water_level_settings import ScriptType, WaterLevelSettings
 
@@ -41,6 +54,7 @@ __all__ = [
     "Settings",
     "TimeSeries",
     "SyncStatus",
+    "ThumbnailStatus",
     "Video",
     "VideoConfig",
     "VideoStatus",
@@ -48,9 +62,87 @@ __all__ = [
     "ScriptType",
 ]
 
+# database settings per process type. The API waits shortly for locks to keep requests responsive, workers run
+# long background jobs and can wait longer, beat only schedules jobs and needs few resources.
+DB_PROFILES = {
+    "api": {"busy_timeout": 5000, "mmap_size": 64 * 1024**2, "cache_size": 8192, "pool_size": 10, "max_overflow": 10},
+    "worker": {"busy_timeout": 30000, "mmap_size": 64 * 1024**2, "cache_size": 4096, "pool_size": 4, "max_overflow": 4},
+    "beat": {"busy_timeout": 15000, "mmap_size": 0, "cache_size": 1024, "pool_size": 1, "max_overflow": 2},
+}
+
+
+def get_db_profile() -> str:
+    """Get the database settings profile of this process, from ORC_DB_PROFILE or the command line."""
+    if DB_PROFILE:
+        return DB_PROFILE
+    # the celery command, or python -m celery with the celery package in the path of the script
+    if "celery" in os.path.normpath(sys.argv[0]).split(os.sep)[-2:]:
+        return "beat" if "beat" in sys.argv else "worker"
+    return "api"
+
+
+def get_db_settings(profile: str) -> dict:
+    """Get the database settings of a profile, overridden by environment variables where set."""
+    settings = {
+        **DB_PROFILES[profile],
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+    }
+    overrides = {
+        "busy_timeout": SQLITE_BUSY_TIMEOUT,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+    settings.update({key: int(value) for key, value in overrides.items() if value is not None})
+    return settings
+
+
+def is_sqlite(url: str) -> bool:
+    """Check if a database URL refers to a SQLite database."""
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def create_db_engine(url: str, settings: dict) -> Engine:
+    """Create a database engine with a connection pool, and tuned pragmas on each new SQLite connection."""
+    if not is_sqlite(url):
+        # database server, e.g. PostgreSQL. Connections dropped by the server or a restart are replaced before use.
+        return create_engine(
+            url, pool_size=settings["pool_size"], max_overflow=settings["max_overflow"], pool_pre_ping=True
+        )
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        # WAL mode is stored in the database file, other pragmas are set per connection
+        cursor.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout'])}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+        # negative values are in KiB instead of pages
+        cursor.execute(f"PRAGMA cache_size=-{int(settings['cache_size'])}")
+        cursor.close()
+
+    return engine
+
+
+def backup_database(source_path: str, target_path: str):
+    """Copy a SQLite database with the online backup of SQLite, including changes not yet checkpointed from WAL."""
+    with closing(sqlite3.connect(source_path)) as source, closing(sqlite3.connect(target_path)) as target:
+        source.backup(target)
+
+
 db_path_config = os.path.join(__home__, "orc-os.db")
 sqlite_engine = f"sqlite:///{db_path_config}"
-engine_config = create_engine(sqlite_engine, connect_args={"check_same_thread": False})
+database_url = DATABASE_URL or sqlite_engine
+engine_config = create_db_engine(database_url, get_db_settings(get_db_profile()))
 
 
 # make sure that foreign keys are recognized and foreign key constraints handled
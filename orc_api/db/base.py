@@ -26,6 +26,13 @@ class RemoteBase(Base):
     __abstract__ = True
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=True,
+        default=lambda: datetime.now(),
+        onupdate=lambda: datetime.now(),
+        comment="Date time of last change of the record, used to invalidate cached derived data.",
+    )
     remote_id: Mapped[int] = mapped_column(Integer, nullable=True, unique=True)
     sync_status: Mapped[SyncStatus] = mapped_column(
         Enum(SyncStatus), nullable=True, default=SyncStatus.LOCAL, index=True
@@ -6,25 +6,13 @@ import shutil
 from datetime import datetime
 from typing import Optional
 
-import cv2
-from PIL import Image
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, String, event
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import JSON, DateTime, Enum, ForeignKey, Integer, String, event, orm
+from sqlalchemy.orm import Mapped, mapped_column, object_session, relationship
 
 from orc_api import UPLOAD_DIRECTORY
 from orc_api.db import RemoteBase
 
 
-def create_thumbnail(image_path: str, size=(50, 50)) -> Image:
-    """Create thumbnail for image."""
-    cap = cv2.VideoCapture(image_path)
-    res, image = cap.read()
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    img = Image.fromarray(image)
-    img.thumbnail(size, Image.LANCZOS)
-    return img
-
-
 class VideoStatus(enum.Enum):
     """Status of video as Enum."""
 
@@ -35,6 +23,14 @@ class VideoStatus(enum.Enum):
     ERROR = 5
 
 
+class ThumbnailStatus(enum.Enum):
+    """Status of thumbnails of a video as Enum."""
+
+    PENDING = 1
+    DONE = 2
+    FAILED = 3
+
+
 class Video(RemoteBase):
     """Represents a video entity in the database.
 
@@ -57,10 +53,18 @@ class Video(RemoteBase):
         The image associated with the video. Can be null.
     thumbnail : str or None
         The thumbnail of the video. Can be null.
+    thumbnail_status : ThumbnailStatus
+        Whether thumbnails of the video file are still to be created, are created or could not be created.
+    media : dict or None
+        Metadata of the video file (frame count, fps, width, height, codec and duration), probed at ingestion.
     video_config_id : int
         Foreign key linking to the associated video configuration.
     time_series_id : int
         Foreign key linking to the associated time series.
+    upload_id : str or None
+        Identifier of an unfinished chunked upload of the video file to LiveORC. Can be null.
+    upload_offset : int
+        Number of bytes of the video file confirmed by LiveORC in the unfinished chunked upload.
 
     """
 
@@ -72,12 +76,21 @@ class Video(RemoteBase):
     file: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     image: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     thumbnail: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    thumbnail_status: Mapped[enum.Enum] = mapped_column(
+        Enum(ThumbnailStatus), default=ThumbnailStatus.PENDING, server_default="PENDING", nullable=False
+    )
+    media: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
     video_config_id: Mapped[Optional[int]] = mapped_column(
-        Integer, ForeignKey("video_config.id", use_alter=True, ondelete="SET NULL"), nullable=True
+        Integer,
+        # named, so that the constraint added after creating the tables can also be dropped on PostgreSQL
+        ForeignKey("video_config.id", use_alter=True, ondelete="SET NULL", name="fk_video_video_config_id"),
+        nullable=True,
     )  # relate by id
     video_config = relationship("VideoConfig", foreign_keys=[video_config_id])
     time_series_id: Mapped[int] = mapped_column(Integer, ForeignKey("time_series.id"), nullable=True, unique=True)
     time_series = relationship("TimeSeries", uselist=False, back_populates="video")  # , foreign_keys=[time_series_id]
+    upload_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    upload_offset: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     def __str__(self):
         return "{}: {}".format(self.timestamp, self.file)
@@ -86,20 +99,31 @@ class Video(RemoteBase):
         return "{}".format(self.__str__())
 
 
-@event.listens_for(Video, "before_insert")
-@event.listens_for(Video, "before_update")
-def create_thumbnail_listener(mapper, connection, target):
-    """Create a thumbnail if this does not yet exist."""
-    if target.file and not target.thumbnail:
-        # now make a thumbnail and store
-        rel_thumb_path = f"{os.path.splitext(target.file)[0]}_thumb.jpg"
-        abs_file_path = os.path.join(UPLOAD_DIRECTORY, target.file)
-        abs_thumb_path = os.path.join(UPLOAD_DIRECTORY, rel_thumb_path)
-        # only if we are 100% sure the video file exists, we create a thumb
-        if os.path.exists(abs_file_path):
-            thumb = create_thumbnail(abs_file_path)
-            thumb.save(abs_thumb_path, "JPEG")
-            target.thumbnail = rel_thumb_path
+@event.listens_for(Video, "after_insert")
+@event.listens_for(Video, "after_update")
+def queue_thumbnail_listener(mapper, connection, target):
+    """Queue creation of thumbnails of the video file, once the transaction is committed."""
+    if target.file and not target.thumbnail and target.thumbnail_status in [None, ThumbnailStatus.PENDING]:
+        # only if we are 100% sure the video file exists, thumbnails are created
+        if os.path.exists(os.path.join(UPLOAD_DIRECTORY, target.file)):
+            object_session(target).info.setdefault("thumbnail_queue", {})[target.id] = target.file
+
+
+@event.listens_for(orm.Session, "after_commit")
+def submit_thumbnails_listener(session):
+    """Submit videos of the committed transaction to the thumbnail worker, decoding happens in the background."""
+    thumbnail_queue = session.info.pop("thumbnail_queue", None)
+    if thumbnail_queue:
+        from orc_api.utils.thumbnails import thumbnail_worker
+
+        for video_id, file in thumbnail_queue.items():
+            thumbnail_worker.submit(session.get_bind(), video_id, file)
+
+
+@event.listens_for(orm.Session, "after_rollback")
+def discard_thumbnails_listener(session):
+    """Discard videos of a rolled back transaction."""
+    session.info.pop("thumbnail_queue", None)
 
 
 @event.listens_for(Video, "before_delete")
@@ -38,9 +38,13 @@ from orc_api.routers import (
     water_level,
 )
 from orc_api.utils import auth_helpers
+from orc_api.utils.file_reaper import file_reaper
+from orc_api.utils.mjpeg import feed_relays, mjpeg_streams
+from orc_api.utils.query_count import count_queries
 from orc_api.utils.redis_pubsub import redis_pubsub_manager
 from orc_api.utils.startup_checks import check_and_restore_queued_videos
 from orc_api.utils.sys_utils import get_server_timezone_info
+from orc_api.utils.thumbnails import restore_pending_thumbnails, thumbnail_worker
 
 
 @asynccontextmanager
@@ -73,6 +77,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error checking queued videos at startup: {e}")
 
+    # create thumbnails of videos added by processes that stopped before their thumbnails were made
+    try:
+        restore_pending_thumbnails(session)
+    except Exception as e:
+        logger.error(f"Error queueing videos with pending thumbnails: {e}")
+
+    # resume removal of files of deleted videos, interrupted by a restart
+    try:
+        file_reaper.resume()
+    except Exception as e:
+        logger.error(f"Error resuming removal of files of deleted videos: {e}")
+
     try:
         yield
     finally:
@@ -83,6 +99,11 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Error disconnecting Redis pub/sub manager: {e}")
 
+        # files of deleted videos that are not yet removed are left on disk
+        file_reaper.stop(timeout=5)
+        thumbnail_worker.stop(timeout=5)
+        mjpeg_streams.stop(timeout=5)
+        feed_relays.stop(timeout=5)
         session.close()
         logger.info("Shutting down FastAPI server, goodbye!")
 
@@ -96,7 +117,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],# ["*"],
     allow_headers=["*"],  # ["X-PINGOTHER", "Content-Type"],# ["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "X-Next-Cursor", "X-Query-Count"],
 )
 
 
@@ -108,6 +129,17 @@ async def add_csp_header(request, call_next):
     return response
 
 
+@app.middleware("http")
+async def add_query_count_header(request: Request, call_next):
+    """Report the number of SQL statements of a request in the X-Query-Count header."""
+    with count_queries() as query_count:
+        response = await call_next(request)
+    # streamed responses may still query while streaming, these statements are not included
+    response.headers["X-Query-Count"] = str(query_count.count)
+    logger.debug(f"{request.method} {request.url.path}: {query_count.count} SQL statements")
+    return response
+
+
 @app.middleware("http")
 async def auth_middleware(request: Request, call_next):
     """Check if end point requires token verification or not. First validate, then retrieve end point."""
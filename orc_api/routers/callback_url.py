@@ -7,7 +7,12 @@ from fastapi import APIRouter, Depends, Response
 from orc_api import crud
 from orc_api.database import get_db
 from orc_api.db import CallbackUrl, Session
-from orc_api.schemas.callback_url import CallbackUrlCreate, CallbackUrlHealth, CallbackUrlResponse
+from orc_api.schemas.callback_url import (
+    CallbackUrlCreate,
+    CallbackUrlHealth,
+    CallbackUrlResponse,
+    invalidate_callback_url_cache,
+)
 
 router: APIRouter = APIRouter(prefix="/callback_url", tags=["callback_url"])
 
@@ -55,6 +60,7 @@ async def refresh_callback_url_token(db: Session = Depends(get_db)):
 async def delete_callback_url(db: Session = Depends(get_db)):
     """Route for deleting LiveORC callback URL information."""
     crud.callback_url.delete(db)
+    invalidate_callback_url_cache()
     return
 
 
@@ -84,6 +90,7 @@ async def update_callback_url(callback_url: CallbackUrlCreate, db: Session = Dep
             crud.callback_url.update(
                 db, {"retry_timeout": callback_url.retry_timeout, "remote_site_id": callback_url.remote_site_id}
             )
+            invalidate_callback_url_cache()
             return Response(
                 "No user, and/or no password set, so only updated retry timeout and site id.", status_code=200
             )
@@ -113,6 +120,7 @@ async def update_callback_url(callback_url: CallbackUrlCreate, db: Session = Dep
     new_callback_url = CallbackUrl(**new_callback_dict)
     # if site id provided, also check if user has access to site id.
     new_callback_url = crud.callback_url.add(db, new_callback_url)
+    invalidate_callback_url_cache()
     if new_callback_url.remote_site_id is not None:
         callback_response = CallbackUrlResponse.model_validate(new_callback_url)
         r = callback_response.get(f"/api/site/{callback_url.remote_site_id}/")
@@ -122,6 +130,7 @@ async def update_callback_url(callback_url: CallbackUrlCreate, db: Session = Dep
             new_callback_url.remote_site_id = None
             db.commit()
             db.refresh(new_callback_url)
+            invalidate_callback_url_cache()
             # crud.callback_url.add(db, new_callback_url)
 
             return Response(
@@ -1,23 +1,25 @@
 """Time series routers."""
 
 from datetime import datetime
-from io import BytesIO
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
-import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Query  # Requests holds the app
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
 from orc_api import crud
 from orc_api.database import get_db
 from orc_api.db import TimeSeries
+from orc_api.log import logger
 from orc_api.schemas.time_series import (
+    SyncTimeSeriesRequest,
+    TimeSeriesAggregate,
     TimeSeriesCreate,
     TimeSeriesPatch,
     TimeSeriesResponse,
     TimeSeriesResponseWithVideoId,
 )
+from orc_api.utils import queue, time_series_export
 
 router: APIRouter = APIRouter(prefix="/time_series", tags=["time_series"])
 
@@ -43,11 +45,36 @@ async def get_list_time_series(
 ):
     """Retrieve list of time series."""
     list_time_series = crud.time_series.get_list(
-        db, start=start, stop=stop, count=count, desc=desc, video_config_ids=video_config_ids
+        db, start=start, stop=stop, count=count, desc=desc, video_config_ids=video_config_ids, with_video_id=True
     )
     return list_time_series
 
 
+@router.get("/aggregate/", response_model=List[TimeSeriesAggregate], status_code=200)
+async def get_aggregated_time_series(
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    bucket_size: Optional[int] = Query(default=None, ge=1, description="Size of time buckets [s]"),
+    max_points: Optional[int] = Query(default=None, ge=2, description="Maximum number of time buckets"),
+    quantiles: List[float] = Query(default=[0.25, 0.5, 0.75]),
+    video_config_ids: Optional[List[int]] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    """Retrieve time series aggregated in time buckets of a given size, or in at most ``max_points`` buckets."""
+    if bucket_size is None and max_points is None:
+        raise HTTPException(status_code=400, detail="Provide either bucket_size or max_points.")
+    if any(q < 0 or q > 1 for q in quantiles):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1.")
+    if bucket_size is None:
+        bucket_size = crud.time_series.get_bucket_size(
+            db, max_points, start=start, stop=stop, video_config_ids=video_config_ids
+        )
+    rows = crud.time_series.get_aggregates(
+        db, bucket_size, start=start, stop=stop, video_config_ids=video_config_ids, quantiles=quantiles
+    )
+    return [TimeSeriesAggregate.from_row(row, bucket_size, quantiles) for row in rows]
+
+
 @router.get("/{id}/", response_model=TimeSeriesResponse, status_code=200)
 async def get_time_series(id: int, db: Session = Depends(get_db)):
     """Retrieve metadata for a video."""
@@ -72,31 +99,72 @@ async def post_time_series(time_series: TimeSeriesCreate, db: Session = Depends(
     return ts
 
 
+@router.post("/sync/", status_code=200)
+async def sync_time_series(params: SyncTimeSeriesRequest, db: Session = Depends(get_db)):
+    """Sync all unsynced time series records in batches using Celery queue."""
+    site = params.site
+    if site is None:
+        # get the site from the callback url settings
+        url = crud.callback_url.get(db)
+        if url is None or url.remote_site_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="No callback url with site available. Please configure a LiveORC callback url with user "
+                "email/password and a site ID to report on.",
+            )
+        site = url.remote_site_id
+    count = crud.time_series.get_query_unsynced(db, start=params.start, stop=params.stop).count()
+    if count > 0:
+        await queue.sync_time_series(site=site, start=params.start, stop=params.stop, logger=logger)
+    return {"site": site, "count": count}
+
+
 @router.post("/download/", status_code=200)
 async def download(
     start: Optional[datetime] = None,
     stop: Optional[datetime] = None,
     count: Optional[int] = None,
+    format: Literal["csv", "parquet", "arrow", "netcdf"] = "csv",
+    columns: Optional[List[str]] = Query(default=None),
     db: Session = Depends(get_db),
 ):
-    """Retrieve time series from database and create a CSV file."""
-    timeseries = crud.time_series.get_list(db=db, start=start, stop=stop, count=count)
-    if len(timeseries) == 0:
-        raise HTTPException(status_code=404, detail="No videos found in database with selected ids.")
-
-    # Convert time series to DataFrame
-    df = pd.DataFrame([ts.__dict__ for ts in timeseries])
-
-    # Create CSV in memory
-    output = BytesIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-
-    # close database connection
-    db.close()
-
-    return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": 'attachment; filename="time_series.csv"'},
-    )
+    """Retrieve time series from database and stream them as CSV, Parquet, Arrow or NetCDF file.
+
+    Records are read from the database in chunks and written to the response chunk by chunk, so that large
+    selections do not have to fit in memory. Only ``columns`` are exported if provided.
+    """
+    columns = columns or time_series_export.EXPORT_COLUMNS
+    invalid_columns = [column for column in columns if column not in time_series_export.EXPORT_COLUMNS]
+    if invalid_columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown time series columns: {', '.join(invalid_columns)}. Choose from "
+            f"{', '.join(time_series_export.EXPORT_COLUMNS)}.",
+        )
+    if format in ["parquet", "arrow"] and not time_series_export.pyarrow_available:
+        raise HTTPException(
+            status_code=400, detail=f"Format {format} is not available, install ORC-OS with the export extra (pyarrow)."
+        )
+    if crud.time_series.get_query_list(db=db, start=start, stop=stop, count=1).first() is None:
+        raise HTTPException(status_code=404, detail="No time series found in database within selected period.")
+    rows = crud.time_series.get_rows(db=db, columns=columns, start=start, stop=stop, count=count)
+    media_type, extension = time_series_export.FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="time_series.{extension}"'}
+    if format == "netcdf":
+        content = time_series_export.to_netcdf(rows, columns)
+        db.close()
+        return Response(content, media_type=media_type, headers=headers)
+    writers = {
+        "csv": time_series_export.iter_csv,
+        "parquet": time_series_export.iter_parquet,
+        "arrow": time_series_export.iter_arrow,
+    }
+
+    def content():
+        try:
+            yield from writers[format](rows, columns)
+        finally:
+            # close database connection
+            db.close()
+
+    return StreamingResponse(content(), media_type=media_type, headers=headers)
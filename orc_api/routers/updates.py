@@ -299,7 +299,8 @@ async def do_update(tag_name, backup_distribution=False):
                     )
 
             # copy back the database
-            shutil.copyfile(backup_db_path, db_path)
+            if backup_db:
+                orc_api.db.backup_database(backup_db_path, db_path)
             raise Exception(f"Failed to update to new version with error: {str(e)}. Rolled back to previous version.")
 
         except subprocess.CalledProcessError as rollback_error:
@@ -315,7 +316,9 @@ async def do_update(tag_name, backup_distribution=False):
     # make sure the backup of the database is side-by-side with the original so that in case of failure it can be
     # easily moved back.
     backup_db_path = os.path.join(os.path.split(db_path)[0], "orc_api_backup.db")
-    db_engine = orc_api.db.sqlite_engine
+    db_engine = orc_api.db.database_url
+    # a database server (e.g. PostgreSQL) is shared with other nodes, and is backed up by its administrator
+    backup_db = orc_api.db.is_sqlite(db_engine)
     api_update_success = False  # start with false, if successful, will be set to true
     update_success = True  # will be made False during exception
 
@@ -368,10 +371,11 @@ async def do_update(tag_name, backup_distribution=False):
                 shutil.copytree(package_dir, os.path.join(backup_dir, "orc_api_backup"), dirs_exist_ok=True)
 
             # backup the database before migration
-            time.sleep(1)
-            await modify_state_update_event(True, "Backing up database...")
-            # copy database side-by-side with original for easier rollback
-            shutil.copyfile(db_path, backup_db_path)
+            if backup_db:
+                time.sleep(1)
+                await modify_state_update_event(True, "Backing up database...")
+                # copy database side-by-side with original for easier rollback
+                orc_api.db.backup_database(db_path, backup_db_path)
 
             # Create another temporary directory for the update
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -5,10 +5,9 @@ import mimetypes
 import os
 import traceback  # only used in DEV_MODE
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from zipfile import ZIP_DEFLATED
 
-import cv2
 import zipstream
 from fastapi import (  # Requests holds the app
     APIRouter,
@@ -18,6 +17,7 @@ from fastapi import (  # Requests holds the app
     HTTPException,
     Query,
     Request,
+    Response,
     UploadFile,
     WebSocket,
 )
@@ -26,9 +26,9 @@ from sqlalchemy.orm import Session
 from starlette.websockets import WebSocketDisconnect
 
 # Directory to save uploaded files
-from orc_api import DEV_MODE, UPLOAD_DIRECTORY, crud
+from orc_api import DEV_MODE, INCOMING_DIRECTORY, UPLOAD_DIRECTORY, crud
 from orc_api.database import get_db
-from orc_api.db import SyncStatus, VideoStatus
+from orc_api.db import SyncStatus, ThumbnailStatus, VideoStatus
 from orc_api.log import logger
 from orc_api.routers.ws.video import WSVideoMsg, WSVideoState
 from orc_api.schemas.video import (
@@ -36,14 +36,18 @@ from orc_api.schemas.video import (
     DownloadVideosRequest,
     SyncVideosRequest,
     VideoListResponse,
+    VideoMedia,
     VideoPatch,
     VideoResponse,
 )
-from orc_api.schemas.video_config import VideoConfigResponse
+from orc_api.schemas.video_config import get_video_config_summaries
 from orc_api.utils import queue, websockets
-from orc_api.utils.image import get_frame_count, get_frame_from_cap, yield_frames_from_fn
+from orc_api.utils.file_reaper import file_reaper
+from orc_api.utils.frames import frame_reader
+from orc_api.utils.mjpeg import VideoFileSource, mjpeg_streams
 from orc_api.utils.redis_pubsub import get_redis_pubsub_manager
 from orc_api.utils.states import SyncRunStatus, VideoRunStatus
+from orc_api.utils.thumbnails import THUMBNAIL_SIZES
 
 router: APIRouter = APIRouter(prefix="/video", tags=["video"])
 
@@ -76,6 +80,16 @@ def get_video_record(db: Session, id: int) -> VideoResponse:
     return VideoResponse.model_validate(video_rec)
 
 
+def get_video_media(db: Session, video: VideoResponse) -> VideoMedia:
+    """Get metadata of the video file, probed and stored first for videos stored without metadata."""
+    if video.media is None:
+        media = crud.video.update_media(db, video.id, video.get_video_file(base_path=UPLOAD_DIRECTORY))
+        if media is None:
+            raise HTTPException(status_code=500, detail="Metadata of video file could not be read.")
+        video.media = VideoMedia.model_validate(media)
+    return video.media
+
+
 # helpers
 async def zip_generator(files, base_path):
     """Async generator to stream the zip file content."""
@@ -92,13 +106,17 @@ async def zip_generator(files, base_path):
 
 
 @router.get("/{id}/thumbnail/", response_class=FileResponse, status_code=200)
-async def get_thumbnail(id: int, db: Session = Depends(get_db)):
-    """Retrieve a thumbnail for a video."""
+async def get_thumbnail(id: int, size: str = "thumb", db: Session = Depends(get_db)):
+    """Retrieve a thumbnail for a video, the small list thumbnail or a larger size (e.g. "preview")."""
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Thumbnail size must be one of {', '.join(THUMBNAIL_SIZES)}.")
     video = get_video_record(db, id)
     if not video.thumbnail:
+        if video.thumbnail_status == ThumbnailStatus.PENDING:
+            raise HTTPException(status_code=404, detail="Video record is found, but thumbnail is not yet created.")
         raise HTTPException(status_code=404, detail="Video record is found, but thumbnail is not found.")
     # Determine the MIME type of the file
-    file_path = video.get_thumbnail(base_path=UPLOAD_DIRECTORY)
+    file_path = video.get_thumbnail(base_path=UPLOAD_DIRECTORY, size=size)
 
     # close database to prevent overflow issues when calling many thumbnail files
     db.close()
@@ -135,30 +153,18 @@ async def get_frame(id: int, frame_nr: int, rotate: Optional[int] = None, db: Se
 
     # prevent unnecessarily long database connection, close!
     db.close()
-    # open video
-    cap = cv2.VideoCapture(file_path)
-    # Read the frame
-    # check if video has proper metadata
-    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-    if frame_count <= 0 and frame_nr < 900:  # 900 is a reasonable maximum limit, about 30 seconds of video at 30 fps
-        # read frames until the selected one (slow but needed for videos with improper metadata!)
-        for _ in range(frame_nr):
-            success, _ = cap.read()
-            if not success:
-                raise HTTPException(status_code=500, detail="Failed to read frame")
-    else:
-        # set to frame, if frame_nr very large, attempt to read anyway, likely it will return the 0 frame
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_nr)
-
-    success, io_buf = get_frame_from_cap(cap, rotate)
-
-    if not success:
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Video file not found on local data store.")
+    try:
+        # decoding is done outside of the event loop, repeated and nearby frames are served from caches
+        jpeg = await asyncio.to_thread(frame_reader.get_frame_jpeg, file_path, frame_nr, rotate, key=id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IOError:
         raise HTTPException(status_code=500, detail="Failed to read frame")
-
-    # Clean up
-    cap.release()
-    # Return the frame as a streaming response
-    return StreamingResponse(io_buf, media_type="image/jpeg")
+    return Response(content=jpeg, media_type="image/jpeg")
 
 
 @router.get("/{id}/stream/")  # , response_class=FileResponse, status_code=200)
@@ -167,13 +173,22 @@ async def get_stream(
     start_frame: Optional[int] = None,
     end_frame: Optional[int] = None,
     rotate: Optional[int] = None,
+    quality: Optional[int] = Query(default=None, ge=1, le=100),
+    max_width: Optional[int] = Query(default=None, ge=0),
+    max_fps: Optional[float] = Query(default=None, ge=0),
     db: Session = Depends(get_db),
     request: Request = None,
 ):
-    """Retrieve frames with repetition from video."""
+    """Retrieve frames with repetition from video.
+
+    Frames are read and encoded in a thread shared by all viewers of the same video with the same options. JPEG
+    quality, maximum width and maximum frame rate default to the stream settings of the device.
+    """
     # convert into schema and return data
     if start_frame is None:
         start_frame = 0
+    if rotate not in [None, 90, 180, 270]:
+        raise HTTPException(status_code=400, detail="Rotation must be None, 90, 180 or 270 degrees")
     video = get_video_record(db, id)
     if not video.file:
         raise HTTPException(status_code=404, detail="Video record is found, but video file is not found.")
@@ -182,45 +197,58 @@ async def get_stream(
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Video file not found on local data store.")
     if end_frame is None:
-        end_frame = get_frame_count(file_path)
+        end_frame = get_video_media(db, video).frame_count
 
     # prevent unnecessarily long database connection, close!
     db.close()
-
-    async def frame_generator():
-        for frame in yield_frames_from_fn(file_path, rotate, start_frame, end_frame):
-            if await request.is_disconnected():
-                logger.info(f"Client disconnected while streaming frames for video {id}. Stopping generator.")
-                break
-            yield frame
-
-    return StreamingResponse(frame_generator(), media_type="multipart/x-mixed-replace; boundary=frame")
+    options = {"quality": quality, "max_width": max_width, "max_fps": max_fps}
+    frames = mjpeg_streams.stream(
+        (file_path, start_frame, end_frame),
+        lambda: VideoFileSource(file_path, start_frame=start_frame, end_frame=end_frame),
+        request=request,
+        rotate=rotate,
+        **{k: v for k, v in options.items() if v is not None},
+    )
+    return StreamingResponse(frames, media_type="multipart/x-mixed-replace; boundary=frame")
 
 
 @router.get("/", response_model=List[VideoListResponse], status_code=200)
 async def get_list_video(
+    response: Response,
     start: Optional[datetime] = None,
     stop: Optional[datetime] = None,
     status: Optional[Union[VideoStatus, int]] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
     first: Optional[int] = None,
     count: Optional[int] = None,
     db: Session = Depends(get_db),
 ):
-    """Retrieve list of videos."""
+    """Retrieve list of videos.
+
+    Videos are returned from last to first. For paging, prefer ``cursor`` over ``first``: when ``count`` is provided
+    and the page is full, the ``X-Next-Cursor`` response header holds the cursor to retrieve the next page.
+    """
     if isinstance(status, int):
         try:
             status = VideoStatus(status)
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid status value '{status}'.")
+    if cursor is not None:
+        if first is not None:
+            raise HTTPException(status_code=400, detail="Cannot combine 'cursor' with 'first'.")
+        try:
+            cursor_timestamp, cursor_id = cursor.rsplit(",", 1)
+            cursor = (datetime.fromisoformat(cursor_timestamp), int(cursor_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor value '{cursor}'.")
 
-    list_videos = crud.video.get_list(db, start=start, stop=stop, status=status, first=first, count=count)
-    unique_video_configs = set([v.video_config_id for v in list_videos if v.video_config_id is not None])
-    video_configs = {v: VideoConfigResponse.model_validate(crud.video_config.get(db, v)) for v in unique_video_configs}
-    video_list_responses = [
-        VideoListResponse.from_orm_model(video, video_configs[video.video_config_id] if video.video_config_id else None)
-        for video in list_videos
-    ]
-    return video_list_responses
+    rows = crud.video.get_list_rows(db, start=start, stop=stop, status=status, cursor=cursor, first=first, count=count)
+    video_configs = get_video_config_summaries(
+        db, set([row.video_config_id for row in rows if row.video_config_id is not None])
+    )
+    if count is not None and len(rows) == count:
+        response.headers["X-Next-Cursor"] = f"{rows[-1].timestamp.isoformat()},{rows[-1].id}"
+    return [VideoListResponse.from_row(row, video_configs.get(row.video_config_id)) for row in rows]
 
 
 @router.get("/count/", response_model=int, status_code=200)
@@ -262,17 +290,8 @@ async def get_video(id: int, db: Session = Depends(get_db)):
 async def get_video_end_frame(id: int, db: Session = Depends(get_db)):
     """Retrieve the end frame of a video."""
     video = get_video_record(db, id)
-    # open video
-    file_path = video.get_video_file(base_path=UPLOAD_DIRECTORY)
-
-    # close db connection
-    db.close()
-    # open video
-    return get_frame_count(file_path)
-    # cap = cv2.VideoCapture(file_path)
-    # # check amount of frames
-    # frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    # return frame_count
+    # stored at ingestion, only older videos are probed
+    return get_video_media(db, video).frame_count
 
 
 @router.delete("/{id}/", status_code=204, response_model=None)
@@ -292,7 +311,7 @@ async def patch_video(id: int, video: dict, db: Session = Depends(get_db)):
 
 @router.post("/delete/", status_code=204, response_model=None)
 async def delete_list_videos(request: DeleteVideosRequest, db: Session = Depends(get_db)):
-    """Delete a list of videos."""
+    """Delete a list of videos, their files are removed in the background (see /video/delete/progress/)."""
     start = request.start
     stop = request.stop
     try:
@@ -302,6 +321,12 @@ async def delete_list_videos(request: DeleteVideosRequest, db: Session = Depends
     return None
 
 
+@router.get("/delete/progress/", response_model=Dict[str, int], status_code=200)
+async def get_delete_progress():
+    """Get progress of the removal of files of deleted videos, which happens in the background."""
+    return file_reaper.progress()
+
+
 @router.get("/{id}/play/", response_class=StreamingResponse, status_code=206)
 async def play_video(id: int, range: str = Header(None), db: Session = Depends(get_db)):
     """Retrieve a video file and stream it to the client."""
@@ -430,6 +455,31 @@ async def upload_video(
     return VideoResponse.model_validate(video_instance)
 
 
+@router.post("/local/", response_model=VideoResponse, status_code=201)
+async def add_local_video(
+    file_path: str = Form(...),
+    timestamp: datetime = Form(...),
+    video_config_id: Optional[int] = Form(None),
+    move: bool = Form(True),
+    db: Session = Depends(get_db),
+):
+    """Add a video file that is already available on the server, without uploading it.
+
+    The file must be located in the incoming directory, relative paths are relative to the incoming directory. The
+    file is moved (or linked if ``move`` is false) into the upload directory, without copying where possible.
+    """
+    abs_file_path = os.path.realpath(os.path.join(INCOMING_DIRECTORY, file_path))
+    incoming_directory = os.path.realpath(INCOMING_DIRECTORY)
+    if os.path.commonpath([abs_file_path, incoming_directory]) != incoming_directory:
+        raise HTTPException(status_code=400, detail=f"File {file_path} is not located in the incoming directory.")
+    if not os.path.isfile(abs_file_path):
+        raise HTTPException(status_code=404, detail=f"File {file_path} not found.")
+    video_instance = crud.video.create_from_file(
+        db=db, file_path=abs_file_path, timestamp=timestamp, video_config_id=video_config_id, move=move
+    )
+    return VideoResponse.model_validate(video_instance)
+
+
 @router.post("/download/", status_code=200, response_class=StreamingResponse)
 async def download_videos(request: DownloadVideosRequest, db: Session = Depends(get_db)):
     """Retrieve files from server and create a streaming zip towards the client."""
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 
 from orc_api import crud
 from orc_api.database import get_db
-from orc_api.schemas.video_config import VideoConfigResponse, VideoConfigUpdate
+from orc_api.schemas.video_config import VideoConfigResponse, VideoConfigUpdate, get_video_config_response
 
 router: APIRouter = APIRouter(prefix="/video_config", tags=["video_config"])
 
@@ -16,7 +16,7 @@ router: APIRouter = APIRouter(prefix="/video_config", tags=["video_config"])
 async def get_list_video_config(db: Session = Depends(get_db)):
     """Retrieve list of video configs."""
     list_videos = crud.video_config.get_list(db)
-    return list_videos
+    return [get_video_config_response(video_config) for video_config in list_videos]
 
 
 @router.get("/{id}/", response_model=VideoConfigResponse, status_code=200)
@@ -25,7 +25,7 @@ async def get_video_config(id: int, db: Session = Depends(get_db)):
     video_config = crud.video_config.get(db=db, id=id)
     if not video_config:
         raise HTTPException(status_code=404, detail="VideoConfig not found.")
-    return video_config
+    return get_video_config_response(video_config)
 
 
 @router.delete("/{id}/", status_code=204, response_model=None)
@@ -1,49 +1,34 @@
 """Router for video streaming endpoints."""
 
+import asyncio
+from typing import Optional
+
 import cv2
-from fastapi import APIRouter, Request, Response
+from fastapi import APIRouter, Query, Request, Response
 from fastapi.responses import StreamingResponse
 
+from orc_api.utils.mjpeg import feed_relays
+
 router: APIRouter = APIRouter(prefix="/video_stream", tags=["video_stream"])
 
 
 @router.get("/feed/", response_class=StreamingResponse, description="Get video stream from user-defined URL")
-async def video_feed(request: Request, video_url: str):
-    """Stream video from a user-defined URL."""
-
-    async def generate_frames():
-        if not video_url:
-            raise ValueError("No video URL provided")
-        cap = cv2.VideoCapture(video_url)
-        print(f"VIDEO URL IS: {video_url}")
-        if not cap.isOpened():
-            # return Response("Unable to open RTSP stream", status_code=500)
-            raise RuntimeError("Unable to open RTSP stream")
-
-        try:
-            from collections import deque
-
-            frame_buffer = deque(maxlen=10)  # Adjust maxlen based on desired buffer size
-            while True:
-                if await request.is_disconnected():
-                    break
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_buffer.append(frame)
-                # Encode the frame as JPEG
-                _, buffer = cv2.imencode(".jpg", frame_buffer.pop())
-
-                # Yield the frame as part of an MJPEG stream
-                yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + buffer.tobytes() + b"\r\n")
-                # Add a small delay to avoid overloading the server, probably not required.
-                # await asyncio.sleep(0.03)
-        finally:
-            print("Releasing the video capture object")
-            cap.release()
-            del cap
-
-    return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+async def video_feed(
+    request: Request,
+    video_url: str,
+    quality: Optional[int] = Query(default=None, ge=1, le=100),
+    max_width: Optional[int] = Query(default=None, ge=0),
+    max_fps: Optional[float] = Query(default=None, ge=0),
+):
+    """Stream video from a user-defined URL.
+
+    All viewers of the same URL share one connection to the camera, and each frame is encoded once per combination of
+    options of the viewers.
+    """
+    if not video_url:
+        raise ValueError("No video URL provided")
+    frames = feed_relays.stream(video_url, request=request, quality=quality, max_width=max_width, max_fps=max_fps)
+    return StreamingResponse(frames, media_type="multipart/x-mixed-replace; boundary=frame")
 
 
 @router.head(
@@ -51,15 +36,18 @@ async def video_feed(request: Request, video_url: str):
 )
 async def check_video_feed(response: Response, video_url: str):
     """Check if the video feed is available as HEAD end point."""
-    print(f"VIDEO URL IS: {video_url}")
     if not video_url:
         raise ValueError("No video URL provided")
+    # a relayed feed is available without opening another connection to the camera
+    if feed_relays.is_open(video_url) or await asyncio.to_thread(is_feed_available, video_url):
+        return Response("Video feed is available", status_code=200)
+    return Response("Unable to open RTSP stream", status_code=500)
+
+
+def is_feed_available(video_url: str) -> bool:
+    """Check if a video feed can be opened."""
+    cap = cv2.VideoCapture(video_url)
     try:
-        cap = cv2.VideoCapture(video_url)
-        if not cap.isOpened():
-            return Response("Unable to open RTSP stream", status_code=500)
-        else:
-            return Response("Video feed is available", status_code=200)
+        return cap.isOpened()
     finally:
         cap.release()
-        del cap
@@ -6,9 +6,8 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from orc_api import crud
 from orc_api.db.base import SyncStatus
-from orc_api.schemas.callback_url import CallbackUrlResponse
+from orc_api.schemas.callback_url import get_callback_url
 
 
 # Default fields of Pydantic model for responses of Remote models
@@ -22,7 +21,7 @@ class RemoteModel(BaseModel):
 
     def sync_remote(self, session: Session, endpoint: str, data=None, json=None, files=None, timeout=5):
         """Send remote updates to LiveORC API."""
-        callback_url = CallbackUrlResponse.model_validate(crud.callback_url.get(session))
+        callback_url = get_callback_url(session)
         if callback_url is None:
             raise ValueError("No callback URL configured. Please ensure you first gain access to a LiveORC API.")
         # get all callback functionalities in place.
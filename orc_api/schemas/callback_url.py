@@ -11,10 +11,14 @@ from fastapi import HTTPException
 from pydantic import AnyHttpUrl, BaseModel, ConfigDict, Field
 from sqlalchemy.orm import Session
 
-from orc_api import crud
+from orc_api import CALLBACK_URL_CACHE_TTL, crud
 from orc_api import db as models
 from orc_api.database import get_session
 from orc_api.log import logger
+from orc_api.utils.http_session import get_http_session
+
+# callback URL of the current process, reused (with its tokens) by subsequent requests, see get_callback_url
+_callback_url_cache = {"callback_url": None, "loaded_at": 0.0}
 
 
 def dynamic_retry(timeout, retry_delay=5.0):
@@ -112,7 +116,7 @@ class CallbackUrlResponse(CallbackUrlBase):
         """Refresh tokens and store them in the database."""
         url = urljoin(str(self.url), "/api/token/refresh/")
         data = {"refresh": self.token_refresh}
-        response = requests.post(url, data=data, timeout=5)
+        response = get_http_session().post(url, data=data, timeout=5)
         if response.status_code == 200:
             # store new tokens
             self.token_access = response.json().get("access")
@@ -134,6 +138,8 @@ class CallbackUrlResponse(CallbackUrlBase):
         # serialize url
         new_callback_url["url"] = str(new_callback_url["url"])
         crud.callback_url.add(db, models.CallbackUrl(**new_callback_url))
+        # subsequent requests continue with the new tokens
+        invalidate_callback_url_cache()
 
     def get(
         self,
@@ -146,18 +152,24 @@ class CallbackUrlResponse(CallbackUrlBase):
         if self.token_expiration < datetime.now():
             # first get a new token
             self.get_set_refresh_tokens()
-        return requests.get(url, json=data, headers=self.headers, timeout=5)
+        return get_http_session().get(url, json=data, headers=self.headers, timeout=5)
 
-    def patch(self, endpoint, json=None, data=None, files=None, timeout=5, delay_retry=5):
-        """Perform PATCH request on end point with optional data and files."""
+    def patch(self, endpoint, json=None, data=None, files=None, timeout=5, delay_retry=5, headers=None):
+        """Perform PATCH request on end point with optional data, files and extra headers."""
         data = {} if data is None else data
         files = {} if files is None else files
         url = urljoin(str(self.url), endpoint)
         if self.token_expiration < datetime.now():
             # first get a new token
             self.get_set_refresh_tokens()
-        return requests.patch(
-            url, headers=self.headers, data=data, json=json, files=files, timeout=timeout, allow_redirects=True
+        return get_http_session().patch(
+            url,
+            headers={**self.headers, **(headers or {})},
+            data=data,
+            json=json,
+            files=files,
+            timeout=timeout,
+            allow_redirects=True,
         )
 
     def post(self, endpoint, data=None, json=None, files=None, timeout=5):
@@ -169,14 +181,14 @@ class CallbackUrlResponse(CallbackUrlBase):
         if self.token_expiration < datetime.now():
             # first get a new token
             self.get_set_refresh_tokens()
-        return requests.post(url, headers=self.headers, json=json, data=data, files=files, timeout=timeout)
+        return get_http_session().post(url, headers=self.headers, json=json, data=data, files=files, timeout=timeout)
 
     def get_online_status(self):
         """Check if the callback URL is online and the token is valid, return health parameters."""
         try:
             # Check if server is reachable
             api_endpoint = urljoin(str(self.url), "/api")
-            health_response = requests.get(api_endpoint, timeout=5)  # Adjust timeout as needed
+            health_response = get_http_session().get(api_endpoint, timeout=5)  # Adjust timeout as needed
             server_online = health_response.status_code == 200
 
             if not server_online:
@@ -249,10 +261,35 @@ class CallbackUrlCreate(CallbackUrlBase):
         """Get tokens for the callback URL using email/password."""
         url = urljoin(str(self.url), "/api/token/")
         data = {"email": self.user, "password": self.password}
-        response = requests.post(url, data=data, timeout=5)
+        response = get_http_session().post(url, data=data, timeout=5)
         return response
 
 
+def get_callback_url(session: Session) -> Optional[CallbackUrlResponse]:
+    """Get the callback URL, reusing the last one read in this process for CALLBACK_URL_CACHE_TTL seconds.
+
+    Syncing many records then does not read and validate the callback URL for each record, and tokens refreshed by one
+    record are used by the next records. The callback URL is read again when its access token expired, as another
+    process may already have refreshed it.
+    """
+    cached = _callback_url_cache["callback_url"]
+    if (
+        cached is not None
+        and time.time() - _callback_url_cache["loaded_at"] < CALLBACK_URL_CACHE_TTL
+        and cached.token_expiration > datetime.now()
+    ):
+        return cached
+    rec = crud.callback_url.get(session)
+    callback_url = CallbackUrlResponse.model_validate(rec) if rec else None
+    _callback_url_cache.update(callback_url=callback_url, loaded_at=time.time())
+    return callback_url
+
+
+def invalidate_callback_url_cache():
+    """Read the callback URL from the database again at the next request, e.g. after it was changed."""
+    _callback_url_cache.update(callback_url=None, loaded_at=0.0)
+
+
 class CallbackUrlHealth(BaseModel):
     """Response model for callback URL health, not linked to database."""
 
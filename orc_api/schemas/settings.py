@@ -2,18 +2,24 @@
 
 import os
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import UploadFile
+import redis
 from pydantic import BaseModel, ConfigDict, Field, computed_field, model_validator
 from typing_extensions import Self
 
-from orc_api import INCOMING_DIRECTORY, TMP_DIRECTORY, crud
+from orc_api import INCOMING_DIRECTORY, INCOMING_STABLE_WINDOW, TMP_DIRECTORY, crud
 from orc_api.database import get_session
 from orc_api.schemas.video import VideoResponse
-from orc_api.schemas.video_config import VideoConfigResponse
+from orc_api.schemas.video_config import get_video_config_response
 from orc_api.utils import disk_management, queue, sys_utils
 
+redis_client = redis.from_url(os.getenv("ORC_CELERY_BROKER_URL", "redis://localhost:6379/0"), socket_connect_timeout=2)
+# observations of files in the incoming folder, shared by scans in all worker processes through Redis
+stability_tracker = disk_management.FileStabilityTracker(window=INCOMING_STABLE_WINDOW, redis_client=redis_client)
+# claims of files in the incoming folder, so that the watcher and scans do not ingest the same file simultaneously
+file_claims = disk_management.FileClaims(redis_client=redis_client)
+
 
 # Pydantic model for responses
 class SettingsBase(BaseModel):
@@ -63,7 +69,7 @@ class SettingsResponse(SettingsBase):
         """Return the VideoConfigResponse."""
         with get_session() as session:
             vc = crud.video_config.get(db=session, id=self.video_config_id)
-            return VideoConfigResponse.model_validate(vc) if vc else None
+            return get_video_config_response(vc) if vc else None
 
     @property
     def file_format(self):
@@ -114,56 +120,79 @@ class SettingsResponse(SettingsBase):
             self.sample_file = os.path.join(INCOMING_DIRECTORY, self.file_format)
         return self
 
-    async def check_new_videos(self, path_incoming: str, start_time: Optional[float], logger):
-        """Check for new videos in incoming folder, add to database and queue if ready to run."""
+    @property
+    def video_suffix(self) -> str:
+        """Return the file suffix of video files following the filename template."""
+        return self.video_file_fmt.split(".")[-1]
+
+    async def check_new_videos(self, path_incoming: str, start_time: Optional[float], logger) -> List[str]:
+        """Check for new videos in incoming folder, add to database and queue if ready to run.
+
+        Returns the files that are not yet stable, but may be in a next scan within ``INCOMING_STABLE_WINDOW``.
+        """
         # check the incoming folder
         if self.reboot_after:
             sys_utils.reboot_after_time(start_time=start_time, timeout=max(self.reboot_after, 300))
 
-        file_paths = disk_management.scan_folder(path_incoming, self.video_file_fmt.split(".")[-1])
+        file_paths = disk_management.scan_folder(path_incoming, suffix=self.video_suffix)
+        # files that are not being written into or zero-bytes, following observations in earlier scans
+        file_paths = stability_tracker.observe(file_paths)
+        await self.ingest_videos(file_paths, logger)
+        return stability_tracker.pending()
+
+    async def ingest_videos(self, file_paths: List[str], logger):
+        """Add completed video files to the database and queue them if ready to run.
+
+        Files that are claimed by another task (e.g. the watcher and a scan picking up the same file), or that no
+        longer exist (e.g. already ingested by an earlier scan) are skipped.
+        """
+        claimed = [file_path for file_path in file_paths if file_claims.claim(file_path)]
+        try:
+            await self._ingest_claimed_videos(claimed, logger)
+        finally:
+            for file_path in claimed:
+                file_claims.release(file_path)
+
+    async def _ingest_claimed_videos(self, file_paths: List[str], logger):
+        """Add claimed video files to the database and queue them, see ingest_videos."""
+        files = []
         for file_path in file_paths:
-            # each file is checked if it is not yet in the queue and not
-            # being written into or zero-bytes
-            if (
-                os.path.isfile(file_path)
-                and not disk_management.is_file_size_changing(file_path)
-                and os.path.getsize(file_path) > 0
-            ):
-                # first move the file to a temporary location
-                tmp_file = os.path.join(TMP_DIRECTORY, os.path.split(file_path)[1])
-                os.makedirs(os.path.split(tmp_file)[0], exist_ok=True)
-                os.rename(file_path, tmp_file)
-                try:
-                    timestamp = disk_management.get_timestamp(
-                        tmp_file,
-                        parse_from_fn=self.parse_dates_from_file,
-                        fn_fmt=self.video_file_fmt,
-                    )
-                except Exception as e:
-                    message = f"Could not get a logical timestamp from file {file_path}. Reason: {e}"
-                    logger.error(message)
-                    raise ValueError(message)
-                logger.info(
-                    f"Found file: {file_path} with timestamp {timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')}, "
-                    f"adding to database."
-                )
-                # Add a new record for the provided file, first only timestamp
-                file = UploadFile(filename=os.path.split(tmp_file)[1], file=open(tmp_file, "rb"))
-                with get_session() as session:
-                    video_instance = await crud.video.create_from_upload(
-                        db=session, file=file, timestamp=timestamp, video_config_id=self.video_config_id
-                    )
-                    video_response = VideoResponse.model_validate(video_instance)
-                # move video to queue
-                video_response = await queue.process_video(
-                    session=session,
-                    video=video_response,
-                    logger=logger,
-                    shutdown_after_task=self.shutdown_after_task if self.shutdown_after_task else False,
-                    priority=1,  # highest priority for tasks that are initiated from daemon settings
+            if not os.path.isfile(file_path):
+                continue
+            try:
+                timestamp = disk_management.get_timestamp(
+                    file_path,
+                    parse_from_fn=self.parse_dates_from_file,
+                    fn_fmt=self.video_file_fmt,
                 )
-                # whatever happens, remove the file if not successful, prevent clogging
-                os.remove(tmp_file)
+            except Exception as e:
+                logger.error(f"Could not get a logical timestamp from file {file_path}. Reason: {e}")
+                # move the file out of the way, prevent clogging
+                disk_management.move_file(file_path, os.path.join(TMP_DIRECTORY, os.path.split(file_path)[1]))
+                continue
+            logger.info(
+                f"Found file: {file_path} with timestamp {timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')}, "
+                f"adding to database."
+            )
+            files.append((file_path, timestamp))
+        if len(files) == 0:
+            return
+        # Add new records for all files in one go
+        with get_session() as session:
+            video_instances = crud.video.create_from_files(
+                db=session, files=files, video_config_id=self.video_config_id, skip_missing=True
+            )
+            if len(video_instances) == 0:
+                return
+            video_responses = [VideoResponse.model_validate(video_instance) for video_instance in video_instances]
+            # move videos to queue
+            await queue.process_videos(
+                session=session,
+                videos=video_responses,
+                logger=logger,
+                shutdown_after_task=self.shutdown_after_task if self.shutdown_after_task else False,
+                priority=1,  # highest priority for tasks that are initiated from daemon settings
+            )
 
 
 class SettingsCreate(SettingsBase):
@@ -1,13 +1,34 @@
 """Pydantic models for time series."""
 
-from datetime import datetime
-from typing import Optional
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, computed_field, model_validator
 from sqlalchemy.orm import Session
 
-from orc_api import crud
+from orc_api import TIME_SERIES_SYNC_CHUNK_SIZE, crud
+from orc_api.db.base import SyncStatus
 from orc_api.schemas.base import RemoteModel
+from orc_api.schemas.callback_url import get_callback_url
+
+# fields of time series records posted to LiveORC
+SYNC_FIELDS = {
+    "timestamp",
+    "h",
+    "q_raw",
+    "q_05",
+    "q_25",
+    "q_50",
+    "q_75",
+    "q_95",
+    "v_av",
+    "v_bulk",
+    "wetted_surface",
+    "wetted_perimeter",
+    "fraction_velocimetry",
+    "misc",
+}
 
 
 # Pydantic model for responses
@@ -83,32 +104,17 @@ class TimeSeriesResponse(TimeSeriesBase, RemoteModel):
         else:
             return None
 
+    def get_sync_data(self) -> dict:
+        """Get the fields of the time series record posted to LiveORC."""
+        return self.model_dump(exclude_unset=True, include=SYNC_FIELDS, mode="json")
+
     def sync_remote(self, session: Session, site: int):
         """Send the time series record to LiveORC API.
 
         Recipes belong to an institute, hence also the institute ID is required.
         """
         endpoint = f"/api/site/{site}/timeseries/"
-        data = self.model_dump(
-            exclude_unset=True,
-            include={
-                "timestamp",
-                "h",
-                "q_raw",
-                "q_05",
-                "q_25",
-                "q_50",
-                "q_75",
-                "q_95",
-                "v_av",
-                "v_bulk",
-                "wetted_surface",
-                "wetted_perimeter",
-                "fraction_velocimetry",
-                "misc",
-            },
-            mode="json",
-        )
+        data = self.get_sync_data()
 
         # sync remotely with the updated data, following the LiveORC end point naming
         response_data = super().sync_remote(session=session, endpoint=endpoint, json=data)
@@ -130,6 +136,53 @@ class TimeSeriesResponseWithVideoId(TimeSeriesResponse):
     video_id: Optional[int] = Field(default=None, description="Connected video ID", exclude=False)
 
 
+class AggregateStatistics(BaseModel):
+    """Statistics of a variable of time series within a time bucket."""
+
+    min: Optional[float] = Field(default=None, description="Minimum value within the bucket")
+    mean: Optional[float] = Field(default=None, description="Mean value within the bucket")
+    max: Optional[float] = Field(default=None, description="Maximum value within the bucket")
+    quantiles: Dict[str, Optional[float]] = Field(
+        default_factory=dict, description="Values per requested quantile within the bucket, keyed by the quantile"
+    )
+
+
+class TimeSeriesAggregate(BaseModel):
+    """Aggregated time series within a time bucket."""
+
+    timestamp: datetime = Field(description="Start of the time bucket.")
+    count: int = Field(description="Number of time series records within the bucket.")
+    h: AggregateStatistics = Field(description="Statistics of water levels [m]")
+    q_50: AggregateStatistics = Field(description="Statistics of median streamflow [m3/s]")
+
+    @classmethod
+    def from_row(cls, row, bucket_size: int, quantiles: List[float]) -> "TimeSeriesAggregate":
+        """Create a TimeSeriesAggregate from a row of ``crud.time_series.get_aggregates``."""
+        data = row._asdict()
+        stats = {
+            var: AggregateStatistics(
+                min=data[f"{var}_min"],
+                mean=data[f"{var}_mean"],
+                max=data[f"{var}_max"],
+                quantiles={str(q): data[f"{var}_q{i}"] for i, q in enumerate(quantiles)},
+            )
+            for var in ["h", "q_50"]
+        }
+        return cls(
+            timestamp=datetime(1970, 1, 1) + timedelta(seconds=row.bucket * bucket_size),
+            count=row.count,
+            **stats,
+        )
+
+
+class SyncTimeSeriesRequest(BaseModel):
+    """Request body schema for syncing time series."""
+
+    start: Optional[datetime] = None
+    stop: Optional[datetime] = None
+    site: Optional[int] = None
+
+
 class TimeSeriesPatch(TimeSeriesResponse):
     """Patch model for a time series.
 
@@ -138,3 +191,111 @@ class TimeSeriesPatch(TimeSeriesResponse):
 
     id: Optional[int] = Field(description="TimeSeries ID", default=None)
     timestamp: Optional[datetime] = Field(default=None)
+
+
+def _sync_time_series_records(
+    session: Session, time_series: List[TimeSeriesResponse], site: int, logger: logging.Logger
+) -> int:
+    """Sync time series records one by one, marking records that fail, and return the number of synced records."""
+    synced = 0
+    for ts in time_series:
+        try:
+            ts.sync_remote(session=session, site=site)
+            synced += 1
+        except Exception as e:
+            logger.error(f"Could not sync time series {ts.id} ({ts.timestamp}): {e}")
+            crud.time_series.update_sync_status(session, [ts.id], SyncStatus.FAILED)
+    return synced
+
+
+def _json_or_none(r):
+    """Get the JSON body of a response, None if the body is not valid JSON."""
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+
+def sync_time_series_batch(
+    session: Session,
+    site: int,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    chunk_size: int = TIME_SERIES_SYNC_CHUNK_SIZE,
+    logger: logging.Logger = logging.getLogger(__name__),
+) -> dict:
+    """Sync all time series records that are not synced yet (LOCAL, UPDATED, FAILED) with LiveORC in chunks.
+
+    New records of a chunk are posted as a list in one request, and the returned remote ids are stored in one
+    transaction. Records that already exist remotely are patched one by one. If LiveORC does not accept the list of
+    records of a chunk (4xx status), or does not return one record per posted record, the records of that chunk are
+    posted one by one instead, so that invalid records are isolated and remote ids are stored correctly. A server
+    error stops the sync, leaving the remaining records for a next sync.
+
+    Parameters
+    ----------
+    session : Session
+        database session
+    site : int
+        remote site ID
+    start, stop : datetime, optional
+        only sync records within start and stop
+    chunk_size : int, optional
+        number of records per request
+    logger : logging.Logger, optional
+        logger instance
+
+    Returns
+    -------
+    dict
+        number of "synced" and "failed" records
+
+    """
+    callback_url = get_callback_url(session)
+    if callback_url is None:
+        raise ValueError("No callback URL configured. Please ensure you first gain access to a LiveORC API.")
+    endpoint = f"/api/site/{site}/timeseries/"
+    synced = 0
+    failed = 0
+    after_id = None
+    while True:
+        chunk = crud.time_series.get_query_unsynced(
+            session, start=start, stop=stop, after_id=after_id, count=chunk_size
+        ).all()
+        if not chunk:
+            break
+        after_id = chunk[-1].id
+        chunk = [TimeSeriesResponse.model_validate(ts) for ts in chunk]
+        existing = [ts for ts in chunk if ts.remote_id is not None]
+        new = [ts for ts in chunk if ts.remote_id is None]
+        n_synced = _sync_time_series_records(session, existing, site, logger)
+        if new:
+            r = callback_url.post(endpoint=endpoint, json=[ts.get_sync_data() for ts in new], timeout=30)
+            response_data = _json_or_none(r) if r.status_code in [200, 201] else None
+            if isinstance(response_data, list) and len(response_data) == len(new):
+                # LiveORC returns the records in the order they were posted
+                crud.time_series.update_remote_ids(session, {ts.id: item["id"] for ts, item in zip(new, response_data)})
+                n_synced += len(new)
+            elif r.status_code in [200, 201]:
+                shape = f"a list of {len(response_data)} records" if isinstance(response_data, list) else "no list"
+                logger.warning(
+                    f"LiveORC accepted {len(new)} time series records at once, but returned {shape}, so remote ids "
+                    f"cannot be matched, syncing records one by one."
+                )
+                n_synced += _sync_time_series_records(session, new, site, logger)
+            elif 400 <= r.status_code < 500:
+                logger.warning(
+                    f"LiveORC did not accept {len(new)} time series records at once (status code {r.status_code}), "
+                    f"syncing records one by one."
+                )
+                n_synced += _sync_time_series_records(session, new, site, logger)
+            else:
+                crud.time_series.update_sync_status(session, [ts.id for ts in new], SyncStatus.FAILED)
+                synced += n_synced
+                failed += len(chunk) - n_synced
+                logger.error(f"Syncing time series stopped, LiveORC responded with status code {r.status_code}.")
+                break
+        synced += n_synced
+        failed += len(chunk) - n_synced
+        logger.info(f"Synced {synced} time series records to site {site}, {failed} failed.")
+    return {"synced": synced, "failed": failed}
@@ -11,20 +11,37 @@ from typing import Optional
 import numpy as np
 import redis
 import xarray as xr
-from pydantic import BaseModel, ConfigDict, Field, computed_field
+from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
 from pyorc.service import velocity_flow_subprocess
 from sqlalchemy.orm import Session
 
-from orc_api import crud, timeout_before_shutdown
+from orc_api import UPLOAD_CHUNK_SIZE, VIDEO_WORKERS, crud, timeout_before_shutdown
 from orc_api import db as models
 from orc_api.database import get_session
 from orc_api.db import Video
 from orc_api.log import logger, setuplog
 from orc_api.schemas.base import RemoteModel
+from orc_api.schemas.callback_url import get_callback_url
 from orc_api.schemas.time_series import TimeSeriesResponse
-from orc_api.schemas.video_config import VideoConfigBase, VideoConfigResponse, VideoConfigUpdate
-from orc_api.utils.image import get_frame_count, get_height_width
+from orc_api.schemas.video_config import (
+    VideoConfigBase,
+    VideoConfigResponse,
+    VideoConfigSummary,
+    VideoConfigUpdate,
+    get_video_config_response,
+)
+from orc_api.utils import chunked_upload
+from orc_api.utils.admission import (
+    apply_thread_budget,
+    estimate_job_memory,
+    get_recipe_frame_count,
+    memory_admission,
+    thread_budget,
+    video_jobs,
+)
+from orc_api.utils.image import probe_video
 from orc_api.utils.states import SyncRunStatus, VideoRunStatus
+from orc_api.utils.thumbnails import get_thumbnail_file
 
 
 # Pydantic model for responses
@@ -36,6 +53,17 @@ class VideoBase(BaseModel):
     video_config: Optional[VideoConfigBase] = Field(description="Video configuration.", default=None)
 
 
+class VideoMedia(BaseModel):
+    """Metadata of a video file, probed at ingestion."""
+
+    frame_count: int = Field(description="Number of frames.")
+    fps: Optional[float] = Field(default=None, description="Frames per second.")
+    width: int = Field(description="Width of frames [px].")
+    height: int = Field(description="Height of frames [px].")
+    codec: Optional[str] = Field(default=None, description="FourCC code of the video codec.")
+    duration: Optional[float] = Field(default=None, description="Duration of the video [s].")
+
+
 class VideoListResponse(BaseModel):
     """Lightweight response schema for the video list."""
 
@@ -80,6 +108,42 @@ class VideoListResponse(BaseModel):
             remote_id=video.remote_id,
         )
 
+    @classmethod
+    def from_row(cls, row, video_config: Optional[VideoConfigSummary] = None) -> "VideoListResponse":
+        """Create a VideoListResponse from a row of ``crud.video.get_list_rows`` and a video config summary."""
+        time_series = None
+        if row.time_series_id is not None:
+            # time series columns are prefixed with ts_, the video is the one of this row
+            time_series_data = {key[3:]: value for key, value in row._asdict().items() if key.startswith("ts_")}
+            time_series = TimeSeriesResponse.model_validate({**time_series_data, "video_id": row.id})
+        video_config_data = None
+        allowed = False
+        if video_config is not None:
+            video_config_data = {
+                "id": video_config.id,
+                "name": video_config.name,
+                "sample_video_id": video_config.sample_video_id,
+                "ready_to_run": video_config.ready_to_run,
+            }
+            # same logic as _calculate_allowed_to_run, but using the summary only
+            if video_config.sample_video_id == row.id and video_config.h_ref is not None:
+                allowed = True
+            elif time_series is not None and time_series.h:
+                allowed = True
+            else:
+                allowed = video_config.has_cross_section_wl
+        return cls(
+            id=row.id,
+            file=row.file,
+            timestamp=row.timestamp,
+            video_config=video_config_data,
+            allowed_to_run=allowed,
+            time_series=time_series,
+            status=row.status,
+            sync_status=row.sync_status,
+            remote_id=row.remote_id,
+        )
+
     @staticmethod
     def _calculate_allowed_to_run(
         video: "models.Video",
@@ -117,12 +181,24 @@ class VideoResponse(VideoBase, RemoteModel):
     file: Optional[str] = Field(default=None, description="File name of the video.")
     image: Optional[str] = Field(default=None, description="Image file name of the video.")
     thumbnail: Optional[str] = Field(default=None, description="Thumbnail file name of the video.")
+    media: Optional[VideoMedia] = Field(default=None, description="Metadata of the video file.")
+    thumbnail_status: Optional[models.ThumbnailStatus] = Field(
+        default=None, description="Whether thumbnails of the video are pending, created or failed."
+    )
     status: Optional[models.VideoStatus] = Field(default=models.VideoStatus.NEW, description="Status of the video.")
     time_series: Optional[TimeSeriesResponse] = Field(default=None, description="Time series attached to video.")
     time_series_id: Optional[int] = Field(default=None, description="ID of time series attached to video.")
     video_config: Optional[VideoConfigResponse] = Field(description="Video configuration.", default=None)
     model_config = ConfigDict(from_attributes=True)
 
+    @field_validator("video_config", mode="before")
+    @classmethod
+    def get_cached_video_config(cls, value):
+        """Reuse cached validation of video config records."""
+        if isinstance(value, models.VideoConfig):
+            return get_video_config_response(value)
+        return value
+
     @property
     def ready_to_run(self):
         """Must be called by AP scheduler to check if video is ready to run."""
@@ -192,20 +268,27 @@ class VideoResponse(VideoBase, RemoteModel):
             video_db = crud.video.update(db=db, id=self.id, video=video_dict)
         return VideoResponse.model_validate(video_db)
 
+    def get_media(self, base_path: str) -> VideoMedia:
+        """Get metadata of video file, probed from the file only if not stored at ingestion."""
+        if self.media is None:
+            self.media = VideoMedia.model_validate(probe_video(self.get_video_file(base_path=base_path)))
+        return self.media
+
     def dims(self, base_path: str) -> tuple[int, int]:
         """Get dimensions of video file."""
+        media = self.get_media(base_path=base_path)
         if (
             self.video_config
             and self.video_config.camera_config
             and self.video_config.camera_config.rotation in [90, 270]
         ):
             # flip the dims
-            return tuple(reversed(get_height_width(self.get_video_file(base_path=base_path))))
-        return get_height_width(self.get_video_file(base_path=base_path))
+            return media.width, media.height
+        return media.height, media.width
 
     def frame_count(self, base_path: str) -> int:
         """Get number of frames in video file."""
-        return get_frame_count(self.get_video_file(base_path=base_path))
+        return self.get_media(base_path=base_path).frame_count
 
     def ready_to_sync(self, site=None):
         """Check if video can be synced or not.
@@ -243,7 +326,22 @@ class VideoResponse(VideoBase, RemoteModel):
             return True, "Ready"
 
     def run(self, base_path: str, prefix: str = "", shutdown_after_task: bool = False):
-        """Run video."""
+        """Run video, and shut down the device afterwards if requested and no other videos are running."""
+        video_jobs.start()
+        try:
+            self._run(base_path=base_path, prefix=prefix)
+        finally:
+            # shutdown if this is set, also after an error, but only when the last running video has finished
+            if video_jobs.finish(shutdown=shutdown_after_task):
+                logger.info(f"Shutdown triggered by daemon. Shutting down in {timeout_before_shutdown} seconds.")
+                time.sleep(timeout_before_shutdown)
+                logger.info("Shutting down after daemon task...Bye bye :-)")
+                subprocess.call("sudo shutdown -h now", shell=True)
+            elif shutdown_after_task:
+                logger.info("Shutdown postponed until other running videos have finished.")
+
+    def _run(self, base_path: str, prefix: str = ""):
+        """Run video and store the results."""
         # update state first
         with get_session() as session:
             try:
@@ -300,14 +398,13 @@ class VideoResponse(VideoBase, RemoteModel):
                 # remove any crs info if present
                 cameraconfig.pop("crs", None)
                 # get the rotated/translated cross-section
-                cross = self.video_config.cross_section_rt.features
-                # remove any crs info if present
-                cross.pop("crs", None)
+                # remove any crs info if present, the transformed cross section itself may be shared
+                cross = {k: v for k, v in self.video_config.cross_section_rt.features.items() if k != "crs"}
                 # if h_a is not available and a cross section is available, make cross section file for water level
                 if h_a is None and self.video_config.cross_section_wl:
-                    cross_wl = self.video_config.cross_section_wl_rt.features
+                    features_wl = self.video_config.cross_section_wl_rt.features
                     # remove any crs info if present
-                    cross_wl.pop("crs", None)
+                    cross_wl = {k: v for k, v in features_wl.items() if k != "crs"}
                 else:
                     cross_wl = None
                 # get the recipe with any required fields filled
@@ -337,18 +434,31 @@ class VideoResponse(VideoBase, RemoteModel):
                 )
                 # make a new logger for the subprocess
                 fn_log = self.get_log_file(base_path=base_path)
-                logger_sub = setuplog(name="pyorc", path=fn_log, append=False)
-                res = velocity_flow_subprocess(
-                    recipe=recipe,
-                    videofile=videofile,
-                    cameraconfig=cameraconfig,
-                    prefix=prefix,
-                    output=output,
-                    h_a=h_a,
-                    cross=cross,
-                    cross_wl=cross_wl,
-                    logger=logger_sub,
-                )
+                # a logger per video, as several videos may run concurrently in threads of this process
+                logger_sub = setuplog(name=f"pyorc.{self.id}", path=fn_log, append=False)
+                try:
+                    # with several videos running concurrently, each pyorc process gets its share of the CPUs and is
+                    # only started when enough memory is available
+                    apply_thread_budget(thread_budget(VIDEO_WORKERS))
+                    frame_count = get_recipe_frame_count(recipe, self.frame_count(base_path=base_path))
+                    memory = estimate_job_memory(cameraconfig["width"], cameraconfig["height"], frame_count)
+                    with memory_admission.admit(memory):
+                        res = velocity_flow_subprocess(
+                            recipe=recipe,
+                            videofile=videofile,
+                            cameraconfig=cameraconfig,
+                            prefix=prefix,
+                            output=output,
+                            h_a=h_a,
+                            cross=cross,
+                            cross_wl=cross_wl,
+                            logger=logger_sub,
+                        )
+                finally:
+                    # close the log file of the video
+                    for handler in logger_sub.handlers[:]:
+                        logger_sub.removeHandler(handler)
+                        handler.close()
 
                 if res.returncode != 0:
                     raise Exception(
@@ -401,13 +511,6 @@ class VideoResponse(VideoBase, RemoteModel):
                     timeout=timeout,
                 )
 
-            # shutdown if this is set
-            if shutdown_after_task:
-                logger.info(f"Shutdown triggered by daemon. Shutting down in {timeout_before_shutdown} seconds.")
-                time.sleep(timeout_before_shutdown)
-                logger.info("Shutting down after daemon task...Bye bye :-)")
-                subprocess.call("sudo shutdown -h now", shell=True)
-            # only do a raise after the shutdown has been done, to avoid not shutting down at all.
             if self.status == models.VideoStatus.ERROR:
                 raise Exception("Error running video, VideoStatus set to ERROR.")
 
@@ -483,7 +586,10 @@ class VideoResponse(VideoBase, RemoteModel):
                     data["time_series"] = self.time_series.remote_id  # only if time series is available
                 # make a dict for files to send
                 files = {}
-                if sync_file_required:
+                if sync_file_required and self._upload_in_chunks(base_path=base_path):
+                    # large videos are uploaded in resumable chunks first, the record refers to the upload
+                    data["upload"] = self._upload_video_file(session=session, base_path=base_path, site=site)
+                elif sync_file_required:
                     files["file"] = (self.file, open(self.get_video_file(base_path=base_path), "rb"))
                 if sync_image_required:
                     files["image"] = (self.image, open(self.get_image_file(base_path=base_path), "rb"))
@@ -512,7 +618,8 @@ class VideoResponse(VideoBase, RemoteModel):
                     r = crud.video.update(
                         session,
                         id=self.id,
-                        video=update_video.serialize_for_db(),  # model_dump(exclude_unset=True, exclude_none=True)
+                        # model_dump(exclude_unset=True, exclude_none=True), a chunked upload is finished
+                        video={**update_video.serialize_for_db(), "upload_id": None, "upload_offset": 0},
                     )
                     logger.info(f"Syncing to remote site {site} successful.")
                     self._publish_status(
@@ -546,6 +653,36 @@ class VideoResponse(VideoBase, RemoteModel):
             _ = crud.video.update(session, id=self.id, video={"sync_status": models.SyncStatus.FAILED})
             logger.exception("Traceback: ")
 
+    def _upload_in_chunks(self, base_path: str) -> bool:
+        """Check if the video file is large enough to upload it in resumable chunks."""
+        return 0 < UPLOAD_CHUNK_SIZE < os.path.getsize(self.get_video_file(base_path=base_path))
+
+    def _upload_video_file(self, session: Session, base_path: str, site: int) -> str:
+        """Upload the video file in resumable chunks, continuing an earlier interrupted upload, and return its id."""
+        callback_url = get_callback_url(session)
+        if callback_url is None:
+            raise ValueError("No callback URL configured. Please ensure you first gain access to a LiveORC API.")
+        file_path = self.get_video_file(base_path=base_path)
+        size = os.path.getsize(file_path)
+        progress = {"percentage": -1}
+
+        def save_state(upload_id, offset):
+            # persist after each chunk, so that bytes confirmed by LiveORC are never sent again
+            crud.video.update(session, id=self.id, video={"upload_id": upload_id, "upload_offset": offset})
+            percentage = int(100 * offset / size) // 10 * 10
+            if percentage > progress["percentage"]:
+                progress["percentage"] = percentage
+                self._publish_status(
+                    message=f"Uploading video to remote site {site}: {percentage}%",
+                    sync_status=SyncRunStatus.SYNCING,
+                    channel="video_sync_status",
+                )
+
+        logger.debug(f"Uploading video {self.id} - {self.file} in chunks to remote site {site}.")
+        return chunked_upload.upload_file(
+            callback_url, file_path, upload_id=crud.video.get(session, id=self.id).upload_id, save_state=save_state
+        )
+
     def sync_remote_wrapper(
         self, base_path: str, site: int, sync_file: bool = True, sync_image: bool = True, timeout: float = 150
     ):
@@ -576,11 +713,13 @@ class VideoResponse(VideoBase, RemoteModel):
         fn = os.path.join(self.get_path(base_path=base_path), "pyorc.log")
         return fn
 
-    def get_thumbnail(self, base_path: str):
-        """Get thumbnail file name."""
+    def get_thumbnail(self, base_path: str, size: str = "thumb"):
+        """Get thumbnail file name, of the small thumbnail or of another size (e.g. "preview")."""
         if self.thumbnail is None:
             return None
-        return os.path.join(base_path, self.thumbnail)
+        if size == "thumb":
+            return os.path.join(base_path, self.thumbnail)
+        return os.path.join(base_path, get_thumbnail_file(self.file, size))
 
     def get_video_file(self, base_path: str):
         """Get video file name."""
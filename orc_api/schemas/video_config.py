@@ -2,26 +2,36 @@
 
 import copy
 import json
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
 
 import geopandas as gpd
 import numpy as np
 from fastapi import HTTPException
-from pydantic import BaseModel, ConfigDict, Field, computed_field, conlist, model_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, computed_field, conlist, model_validator
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 
 from orc_api import crud
 from orc_api.db import SyncStatus, VideoConfig
+from orc_api.log import logger
 from orc_api.schemas.base import RemoteModel
-from orc_api.schemas.callback_url import CallbackUrlResponse
+from orc_api.schemas.callback_url import get_callback_url
 from orc_api.schemas.camera_config import CameraConfigResponse, CameraConfigUpdate
 from orc_api.schemas.cross_section import CrossSectionResponseCameraConfig
 from orc_api.schemas.recipe import RecipeResponse, RecipeUpdate
+from orc_api.utils.cache import LRUCache
 
 # only import for type checking on run time, preventing circular imports
 if TYPE_CHECKING:
     pass
 
+# summaries are keyed by (id, updated_at of video config, updated_at of camera config)
+video_config_summary_cache = LRUCache(maxsize=256)
+# transformed cross sections are keyed by the cache key of their video config record, see _video_config_cache_key
+cross_section_rt_cache = LRUCache(maxsize=32)
+# validated video configs are keyed by (id, updated_at) of the video config and each of its children
+video_config_cache = LRUCache(maxsize=32)
+
 
 # for all functions here, get the request object
 def _rodrigues_to_matrix(rvec):
@@ -45,14 +55,33 @@ def _rodrigues_to_matrix(rvec):
     return R
 
 
-def _rotate_translate_cross_section(cross_section, rvec, tvec):
-    # Ensure rvec and tvec are numpy arrays
-    rvec = np.array(rvec, dtype=np.float64)
-    tvec = np.array(tvec, dtype=np.float64)
+def _transform_point_features(features: dict, rotation_matrix: np.ndarray, tvec: np.ndarray) -> Optional[dict]:
+    """Rotate and translate GeoJSON point features around their mean, directly on the coordinates.
 
-    # Convert rotation vector to rotation matrix using Rodrigues' formula
-    rotation_matrix = _rodrigues_to_matrix(rvec)
-    # Transform the features
+    Returns None if the features are not all 3D points, so that the caller can fall back on a GeoDataFrame.
+    """
+    feature_list = features.get("features", [])
+    if len(feature_list) == 0:
+        return None
+    for feature in feature_list:
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point" or len(geometry.get("coordinates", [])) != 3:
+            return None
+    points = np.array([feature["geometry"]["coordinates"] for feature in feature_list], dtype=np.float64)
+    # rotate around the mean, translate and add the original mean
+    points_mean = points.mean(axis=0)
+    transformed_points = (points - points_mean) @ rotation_matrix.T + tvec + points_mean
+    return {
+        **features,
+        "features": [
+            {**feature, "geometry": {"type": "Point", "coordinates": point}}
+            for feature, point in zip(feature_list, transformed_points.tolist())
+        ],
+    }
+
+
+def _transform_gdf_features(cross_section, rotation_matrix: np.ndarray, tvec: np.ndarray) -> dict:
+    """Rotate and translate cross section features around their mean through a GeoDataFrame."""
     gdf = copy.deepcopy(cross_section.gdf)
     geoms = gdf.geometry
     x, y, z = geoms.x.values, geoms.y.values, geoms.z.values
@@ -66,12 +95,33 @@ def _rotate_translate_cross_section(cross_section, rvec, tvec):
     transformed_points += np.array([x_mean, y_mean, z_mean])
     new_geoms = gpd.points_from_xy(transformed_points[:, 0], transformed_points[:, 1], transformed_points[:, 2])
     gdf.geometry = new_geoms
-    geo_dict = json.loads(gdf.to_json())
-    # make a new VideoConfig
-    cross_new = cross_section.model_dump(exclude=["features"])
-    cross_new["features"] = geo_dict
-    cross_new["camera_config"] = cross_section.camera_config
-    return CrossSectionResponseCameraConfig(**cross_new)
+    return json.loads(gdf.to_json())
+
+
+def _rotate_translate_cross_section(cross_section, rvec, tvec, key: Optional[tuple] = None):
+    """Rotate and translate a cross section, taken from the cache if a key of the stored records is given.
+
+    Transforms from the cache are shared and must not be altered.
+    """
+    cross_rt = None if key is None else cross_section_rt_cache.get(key)
+    if cross_rt is None:
+        # Ensure rvec and tvec are numpy arrays
+        rvec = np.array(rvec, dtype=np.float64)
+        tvec = np.array(tvec, dtype=np.float64)
+        # Convert rotation vector to rotation matrix using Rodrigues' formula
+        rotation_matrix = _rodrigues_to_matrix(rvec)
+        # Transform the features
+        geo_dict = _transform_point_features(cross_section.features, rotation_matrix, tvec)
+        if geo_dict is None:
+            geo_dict = _transform_gdf_features(cross_section, rotation_matrix, tvec)
+        # make a new VideoConfig
+        cross_new = cross_section.model_dump(exclude=["features", "camera_config"])
+        cross_new["features"] = geo_dict
+        cross_new["camera_config"] = cross_section.camera_config
+        cross_rt = CrossSectionResponseCameraConfig(**cross_new)
+        if key is not None:
+            cross_section_rt_cache.set(key, cross_rt)
+    return cross_rt
 
 
 class VideoConfigBase(BaseModel):
@@ -110,6 +160,24 @@ class VideoConfigBase(BaseModel):
     sample_video_id: Optional[int] = Field(
         default=None, description="Video ID containing reference information such as GCPs"
     )
+    # cache key of the records the instance is validated from, see _video_config_cache_key, and transformed cross
+    # sections of the instance. Both are reset when a field is assigned.
+    _cache_key: Optional[tuple] = PrivateAttr(default=None)
+    _cross_sections_rt: Dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    def __setattr__(self, name, value):
+        """Set a field, and forget derived transforms, which may depend on it."""
+        super().__setattr__(name, value)
+        if name in type(self).model_fields and self.__pydantic_private__ is not None:
+            self._cache_key = None
+            self._cross_sections_rt = {}
+
+    def _get_cross_section_rt(self, name: str, cross_section, rvec, tvec):
+        """Get a transformed cross section, computed once per instance and shared between equal records."""
+        if name not in self._cross_sections_rt:
+            key = None if self._cache_key is None else (self._cache_key, name)
+            self._cross_sections_rt[name] = _rotate_translate_cross_section(cross_section, rvec, tvec, key=key)
+        return self._cross_sections_rt[name]
 
     @model_validator(mode="after")
     def match_crs(cls, v):
@@ -145,7 +213,7 @@ class VideoConfigBase(BaseModel):
         if not self.cross_section or not hasattr(self.cross_section, "features"):
             return None
             # raise ValueError("cross_section or its features are not defined.")
-        return _rotate_translate_cross_section(self.cross_section, self.rvec, self.tvec)
+        return self._get_cross_section_rt("cross_section", self.cross_section, self.rvec, self.tvec)
 
     @computed_field
     @property
@@ -157,7 +225,7 @@ class VideoConfigBase(BaseModel):
         if not self.cross_section_wl or not hasattr(self.cross_section_wl, "features"):
             return None
             # raise ValueError("cross_section_wl or its features are not defined.")
-        return _rotate_translate_cross_section(self.cross_section_wl, self.rvec_wl, self.tvec_wl)
+        return self._get_cross_section_rt("cross_section_wl", self.cross_section_wl, self.rvec_wl, self.tvec_wl)
 
     @property
     def recipe_transect_filled(self):
@@ -237,7 +305,7 @@ class VideoConfigResponse(VideoConfigRemote):
             self.camera_config_id = self.camera_config.id
         if self.recipe.sync_status != SyncStatus.SYNCED:
             # first sync/update recipe, we need the institute belonging to the site
-            callback_url = CallbackUrlResponse.model_validate(crud.callback_url.get(session))
+            callback_url = get_callback_url(session)
             r = callback_url.get_site(site_id=site)
             if r.status_code != 200:
                 raise HTTPException(
@@ -379,3 +447,104 @@ class VideoConfigUpdate(VideoConfigResponse):
         default=None, description="Associated CameraConfig object (if available)."
     )
     recipe: Optional[RecipeUpdate] = Field(None, description="Associated Recipe object (if available).")
+
+
+class VideoConfigSummary(BaseModel):
+    """Light-weight summary of a video configuration derived from raw database columns.
+
+    Used for listing videos, so that no camera configuration or cross-section geometry has to be validated. The
+    readiness checks mirror ``VideoConfigBase.allowed_to_run`` and ``CameraConfigInteraction.allowed_to_run``.
+    """
+
+    id: int = Field(description="Video configuration ID")
+    name: str = Field(description="Named description of the video configuration.")
+    sample_video_id: Optional[int] = Field(default=None, description="Video ID containing reference information.")
+    ready_to_run: bool = Field(default=False, description="Flag to indicate if the video config is ready to run.")
+    h_ref: Optional[float] = Field(default=None, description="Reference water level of the camera configuration.")
+    has_cross_section_wl: bool = Field(default=False, description="Flag for presence of a water level cross section.")
+
+    @classmethod
+    def from_row(cls, row) -> "VideoConfigSummary":
+        """Create a summary from a row returned by ``crud.video_config.get_summary_rows``."""
+        data = row.camera_config_data or {}
+        gcps = data.get("gcps") or {}
+        # camera position/rotation, focal length, distortion and bbox are only derived when these are available
+        camera_ready = all(
+            data.get(key) is not None for key in ["rvec", "tvec", "camera_matrix", "dist_coeffs", "bbox"]
+        )
+        ready_to_run = (
+            row.camera_config_id is not None
+            and row.recipe_id is not None
+            and row.cross_section_id is not None
+            and camera_ready
+        )
+        return cls(
+            id=row.id,
+            name=row.name,
+            sample_video_id=row.sample_video_id,
+            ready_to_run=ready_to_run,
+            h_ref=gcps.get("h_ref") if gcps.get("dst") else None,
+            has_cross_section_wl=row.cross_section_wl_id is not None,
+        )
+
+
+def get_video_config_summaries(db: Session, ids: Iterable[int]) -> Dict[int, VideoConfigSummary]:
+    """Get summaries of video configs by id, reusing cached summaries of unchanged video and camera configs."""
+    ids = list(set(ids))
+    if len(ids) == 0:
+        return {}
+    summaries = {}
+    for row in crud.video_config.get_summary_rows(db, ids):
+        key = (row.id, row.updated_at, row.camera_config_updated_at)
+        summary = video_config_summary_cache.get(key)
+        if summary is None:
+            summary = VideoConfigSummary.from_row(row)
+            video_config_summary_cache.set(key, summary)
+        summaries[row.id] = summary
+    return summaries
+
+
+def _video_config_cache_key(video_config: VideoConfig) -> Optional[tuple]:
+    """Get the cache key of a video config record, or None if the record (or one of its children) cannot be cached.
+
+    Any change to the video config, camera config, recipe or cross sections renews the ``updated_at`` stamp of the
+    changed record, and therefore invalidates the key. Records that are not yet persisted, or have unflushed
+    changes, are not cached.
+    """
+    records = [
+        video_config,
+        video_config.camera_config,
+        video_config.recipe,
+        video_config.cross_section,
+        video_config.cross_section_wl,
+    ]
+    key = []
+    for record in records:
+        if record is None:
+            key.append(None)
+            continue
+        state = inspect(record)
+        if not state.persistent or state.modified:
+            return None
+        key.append((record.id, record.updated_at))
+    return tuple(key)
+
+
+def get_video_config_response(video_config: VideoConfig) -> VideoConfigResponse:
+    """Get a validated VideoConfigResponse of a video config record, reusing a cached validation where possible.
+
+    Validation derives camera poses, bounding boxes and cross-section perspectives, which is expensive. The
+    same few video configs are validated over and over again, hence validated instances are cached per process.
+    A deep copy of the cached instance is returned, so that callers may freely alter the returned instance.
+    """
+    key = _video_config_cache_key(video_config)
+    if key is None:
+        return VideoConfigResponse.model_validate(video_config)
+    response = video_config_cache.get(key)
+    if response is None:
+        response = VideoConfigResponse.model_validate(video_config)
+        # transformed cross sections are cached by the same key
+        response._cache_key = key
+        video_config_cache.set(key, response)
+    logger.debug(f"Video config cache: {video_config_cache.stats}")
+    return response.model_copy(deep=True)
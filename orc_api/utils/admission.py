@@ -0,0 +1,191 @@
+"""CPU and memory admission control for running several videos concurrently."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import psutil
+
+from orc_api.log import logger
+
+# environment variables read by OpenMP, numba and BLAS libraries to limit their thread pools
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "NUMBA_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]
+
+# conservative memory use of pyorc per pixel per frame (raw frames, grayscale float frames and projected frames)
+BYTES_PER_PIXEL_FRAME = 12
+# memory use of a pyorc process that does not depend on the video size (interpreter, libraries)
+BASE_MEMORY_JOB = 500 * 1024**2
+
+
+def thread_budget(workers: int, cpu_count: Optional[int] = None) -> int:
+    """Get the number of threads each of the concurrently running video jobs may use.
+
+    Parameters
+    ----------
+    workers : int
+        Number of video jobs running concurrently.
+    cpu_count : int, optional
+        Number of available CPUs, derived from the system if not provided.
+
+    Returns
+    -------
+    int
+        Number of threads per job (at least 1).
+
+    """
+    if cpu_count is None:
+        cpu_count = os.cpu_count() or 1
+    return max(1, cpu_count // max(1, workers))
+
+
+def apply_thread_budget(threads: int):
+    """Pin the thread pools of OpenMP, numba and BLAS of processes started from this process.
+
+    pyorc runs in a subprocess that inherits the environment, so that each job gets its own thread budget and
+    concurrently running jobs do not oversubscribe the CPUs.
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+
+def estimate_job_memory(width: int, height: int, frame_count: int) -> int:
+    """Estimate the peak memory in bytes of processing a video with pyorc.
+
+    Parameters
+    ----------
+    width : int
+        Width of the video frames in pixels.
+    height : int
+        Height of the video frames in pixels.
+    frame_count : int
+        Number of frames processed, following the start and end frame of the recipe.
+
+    Returns
+    -------
+    int
+        Estimated peak memory [bytes].
+
+    """
+    return BASE_MEMORY_JOB + width * height * max(frame_count, 0) * BYTES_PER_PIXEL_FRAME
+
+
+def get_recipe_frame_count(recipe: dict, frame_count: int) -> int:
+    """Get the number of frames processed following the start and end frame of a recipe."""
+    video = recipe.get("video") or {}
+    start_frame = video.get("start_frame") or 0
+    end_frame = video.get("end_frame")
+    if end_frame is None or end_frame > frame_count:
+        end_frame = frame_count
+    return max(end_frame - start_frame, 0)
+
+
+class MemoryAdmission:
+    """Admit jobs only when enough memory is available for their estimated peak memory.
+
+    Memory of admitted jobs is reserved until they finish, as their real memory use grows only gradually. Memory
+    that jobs already use is no longer available according to the system, so only the part of the reservations that
+    is not yet in use is subtracted from the available memory. One job is always admitted when no other jobs are
+    running, so that a job larger than the available memory still runs (as it would when running videos one by one).
+
+    Parameters
+    ----------
+    reserve : int, optional
+        Memory [bytes] that is kept free for the operating system and other services (default 256 MB).
+    poll_interval : float, optional
+        Interval [s] for checking again if memory has become available (default 5 s).
+
+    """
+
+    def __init__(self, reserve: int = 256 * 1024**2, poll_interval: float = 5.0):
+        """Initialize the admission controller without running jobs."""
+        self.reserve = reserve
+        self.poll_interval = poll_interval
+        self.reserved = 0
+        self.running = 0
+        self._condition = threading.Condition()
+
+    def jobs_memory(self) -> int:
+        """Return memory [bytes] in use by running jobs, i.e. by the (pyorc) child processes of this process."""
+        memory = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                memory += child.memory_info().rss
+            except psutil.Error:
+                # the process ended in the meantime
+                pass
+        return memory
+
+    def available(self) -> int:
+        """Return memory [bytes] that can be given to new jobs."""
+        # memory in use by jobs is already missing from the available memory of the system
+        not_in_use = max(0, self.reserved - self.jobs_memory()) if self.reserved else 0
+        return psutil.virtual_memory().available - self.reserve - not_in_use
+
+    def acquire(self, memory: int, timeout: Optional[float] = None) -> bool:
+        """Wait until a job with the estimated memory [bytes] can be admitted and reserve its memory.
+
+        Returns False if the job could not be admitted within ``timeout`` seconds.
+        """
+        start = time.time()
+        with self._condition:
+            while self.running > 0 and self.available() < memory:
+                if timeout is not None and time.time() - start > timeout:
+                    return False
+                logger.info(
+                    f"Waiting for {memory / 1024**3:.2f} GB of memory to become available, {self.running} jobs running."
+                )
+                self._condition.wait(self.poll_interval)
+            self.reserved += memory
+            self.running += 1
+            return True
+
+    def release(self, memory: int):
+        """Release memory [bytes] reserved by a finished job and wake up waiting jobs."""
+        with self._condition:
+            self.reserved -= memory
+            self.running -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, memory: int):
+        """Run a block of code as a job with estimated memory [bytes] once it is admitted."""
+        self.acquire(memory)
+        try:
+            yield
+        finally:
+            self.release(memory)
+
+
+# one admission controller per worker process, shared by all jobs running in its threads
+memory_admission = MemoryAdmission()
+
+
+class JobTracker:
+    """Count jobs in progress, so that a shutdown requested by a job is postponed until the last job has finished."""
+
+    def __init__(self):
+        """Initialize without jobs in progress."""
+        self.running = 0
+        self.shutdown_requested = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Register a started job."""
+        with self._lock:
+            self.running += 1
+
+    def finish(self, shutdown: bool = False) -> bool:
+        """Register a finished job, returns True if it is the last job and a shutdown was requested by any job."""
+        with self._lock:
+            self.running -= 1
+            self.shutdown_requested = self.shutdown_requested or shutdown
+            if self.running > 0 or not self.shutdown_requested:
+                return False
+            self.shutdown_requested = False
+            return True
+
+
+# videos in progress in this worker process, all videos run in threads of one process
+video_jobs = JobTracker()
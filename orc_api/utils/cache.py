@@ -0,0 +1,65 @@
+"""Process-local caching utilities."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters.
+
+    Keys should contain everything the cached value depends on (e.g. record ids and their ``updated_at`` stamps),
+    so that stale entries are never hit and simply age out of the cache.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries kept in the cache (default 128).
+
+    """
+
+    def __init__(self, maxsize: int = 128):
+        """Initialize an empty cache."""
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return cached value for key and mark it as most recently used, or default if not available."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entry if the cache is full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size of the cache."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
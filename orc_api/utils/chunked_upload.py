@@ -0,0 +1,172 @@
+"""Resumable chunked upload of video files to LiveORC.
+
+Large video files are sent in chunks, so that a broken connection only requires resending the chunk in flight.
+The upload follows this protocol on LiveORC:
+
+* ``POST /api/upload/`` with json ``{"filename": ..., "size": ...}`` starts an upload and returns its ``id``.
+* ``GET /api/upload/{id}/`` returns the number of bytes received so far as ``offset``.
+* ``PATCH /api/upload/{id}/`` with header ``Content-Range: bytes <start>-<end>/<size>`` appends a chunk and returns
+  the new ``offset``. An ``offset`` different from the chunk start is answered with 409 and the expected ``offset``.
+  Chunks may be gzip compressed, indicated with ``Content-Encoding: gzip``; ranges always refer to the bytes of the
+  original file. PATCH is not retried by the HTTP session on errors, so that the offset is always checked before a
+  chunk is sent again.
+
+The video record is then created with the ``upload`` id instead of the file. Upload id and offset are stored through
+``save_state`` after each chunk, so that an interrupted upload continues where it stopped, also after a reboot.
+"""
+
+import gzip
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+import requests
+
+from orc_api import UPLOAD_CHUNK_RETRIES, UPLOAD_CHUNK_SIZE, UPLOAD_COMPRESSION
+from orc_api.utils.http_session import RETRY_STATUS_CODES
+
+UPLOAD_ENDPOINT = "/api/upload/"
+
+logger = logging.getLogger(__name__)
+
+
+class UploadExpiredError(Exception):
+    """The upload is unknown to LiveORC, e.g. because it expired."""
+
+
+class ChunkError(Exception):
+    """A chunk was not accepted due to a temporary problem and can be sent again."""
+
+
+def _offset_from_response(r: requests.Response) -> int:
+    return int(r.json()["offset"])
+
+
+def create_upload(callback_url, filename: str, size: int) -> str:
+    """Start a new upload on LiveORC and return its id."""
+    r = callback_url.post(UPLOAD_ENDPOINT, json={"filename": filename, "size": size})
+    if r.status_code not in [200, 201]:
+        raise ValueError(f"Starting upload failed with status code {r.status_code}, detail: {r.text}")
+    return str(r.json()["id"])
+
+
+def get_upload_offset(callback_url, upload_id: str) -> int:
+    """Get the number of bytes of an upload received by LiveORC."""
+    r = callback_url.get(f"{UPLOAD_ENDPOINT}{upload_id}/")
+    if r.status_code == 404:
+        raise UploadExpiredError(f"Upload {upload_id} is unknown to LiveORC.")
+    if r.status_code != 200:
+        raise ChunkError(f"Getting offset of upload {upload_id} failed with status code {r.status_code}")
+    return _offset_from_response(r)
+
+
+def send_chunk(
+    callback_url, upload_id: str, chunk: bytes, start: int, size: int, compress: bool = False, timeout: float = 60
+) -> int:
+    """Send one chunk of a file, starting at byte ``start``, and return the offset confirmed by LiveORC."""
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "Content-Range": f"bytes {start}-{start + len(chunk) - 1}/{size}",
+    }
+    if compress:
+        chunk = gzip.compress(chunk, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    r = callback_url.patch(f"{UPLOAD_ENDPOINT}{upload_id}/", data=chunk, headers=headers, timeout=timeout)
+    if r.status_code in [200, 201, 202, 409]:
+        # 409: LiveORC expects another offset, e.g. after a response to an earlier chunk got lost
+        return _offset_from_response(r)
+    if r.status_code == 404:
+        raise UploadExpiredError(f"Upload {upload_id} is unknown to LiveORC.")
+    if r.status_code in RETRY_STATUS_CODES or r.status_code >= 500:
+        raise ChunkError(f"Chunk at offset {start} failed with status code {r.status_code}")
+    raise ValueError(f"Chunk at offset {start} rejected with status code {r.status_code}, detail: {r.text}")
+
+
+def upload_file(
+    callback_url,
+    path: str,
+    upload_id: Optional[str] = None,
+    save_state: Optional[Callable[[Optional[str], int], None]] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    compress: bool = UPLOAD_COMPRESSION,
+    retries: int = UPLOAD_CHUNK_RETRIES,
+    backoff: float = 2.0,
+    timeout: float = 60,
+) -> str:
+    """Upload a file in chunks to LiveORC, continuing an earlier upload if possible.
+
+    Parameters
+    ----------
+    callback_url : CallbackUrlResponse
+        callback URL of LiveORC
+    path : str
+        path to the file
+    upload_id : str, optional
+        id of an earlier, unfinished upload of the same file
+    save_state : callable, optional
+        called with the upload id and confirmed offset after each chunk, to persist the upload state
+    chunk_size : int, optional
+        number of bytes of the file per chunk
+    compress : bool, optional
+        gzip compress chunks before sending
+    retries : int, optional
+        maximum number of subsequent failed attempts to send a chunk
+    backoff : float, optional
+        backoff factor [s], attempts wait backoff * 2 ** (attempt - 1) seconds
+    timeout : float, optional
+        timeout [s] of each request
+
+    Returns
+    -------
+    str
+        id of the completed upload
+
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be larger than zero.")
+    save_state = save_state or (lambda *args: None)
+    size = os.path.getsize(path)
+    offset = 0
+    if upload_id is not None:
+        try:
+            offset = get_upload_offset(callback_url, upload_id)
+            logger.info(f"Resuming upload {upload_id} of {path} at {offset} of {size} bytes.")
+        except UploadExpiredError:
+            upload_id = None
+    if upload_id is None:
+        upload_id = create_upload(callback_url, os.path.basename(path), size)
+        offset = 0
+    save_state(upload_id, offset)
+    attempt = 0
+    with open(path, "rb") as f:
+        while offset < size:
+            f.seek(offset)
+            chunk = f.read(chunk_size)
+            try:
+                new_offset = send_chunk(
+                    callback_url, upload_id, chunk, offset, size, compress=compress, timeout=timeout
+                )
+            except (requests.ConnectionError, requests.Timeout, ChunkError) as e:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                logger.warning(f"Chunk of upload {upload_id} failed ({e}), attempt {attempt} of {retries} retries.")
+                time.sleep(backoff * 2 ** (attempt - 1))
+                try:
+                    # the chunk may have arrived while its response got lost
+                    offset = get_upload_offset(callback_url, upload_id)
+                    save_state(upload_id, offset)
+                except (requests.ConnectionError, requests.Timeout, ChunkError):
+                    pass
+                continue
+            if new_offset > offset:
+                attempt = 0
+            elif new_offset == offset:
+                # no progress, e.g. the chunk was lost
+                attempt += 1
+                if attempt > retries:
+                    raise ChunkError(f"Upload {upload_id} makes no progress at offset {offset}.")
+            offset = new_offset
+            save_state(upload_id, offset)
+    return upload_id
@@ -1,5 +1,8 @@
 """Disk management utilities."""
 
+import errno
+import json
+import logging
 import os
 import shutil
 import time
@@ -7,6 +10,11 @@ from datetime import datetime
 
 import numpy as np
 
+# Linux ioctl request for cloning a file as copy-on-write
+FICLONE = 0x40049409
+
+logger = logging.getLogger(__name__)
+
 
 # functions to manage that disk space remains below a threshold
 def get_free_space(path_dir):
@@ -85,33 +93,227 @@ def get_timestamp(
     return timestamp
 
 
-def is_file_size_changing(fn, delay=1):
-    """Check if the file size changes over a certain amount of time.
+class FileStabilityTracker:
+    """Detect files that are no longer written into from observations in subsequent scans, without waiting.
 
-    Can be used to check if a file is being written into by another process.
+    The size and modification time of each scanned file are remembered together with the time they were first seen.
+    A file is stable once its size and modification time did not change during ``window`` seconds. As files are only
+    observed during scans, a new file is accepted in the first scan at least ``window`` seconds after it was last seen
+    changing. Modification times alone cannot be used, as these may be preserved from the source by the transfer
+    (e.g. ``scp -p``).
+
+    Observations are kept in a Redis hash, so that they survive between tasks running in different worker processes,
+    or in memory of the current process if Redis is not provided or not available.
 
     Parameters
     ----------
-    fn : str
+    window : float, optional
+        time [s] a file must be unchanged before it is stable (default 2 s)
+    redis_client : redis.Redis, optional
+        client for storing observations in Redis
+    key : str, optional
+        name of the Redis hash with observations (default "incoming:stability")
+
+    """
+
+    def __init__(self, window: float = 2.0, redis_client=None, key: str = "incoming:stability"):
+        """Initialize the tracker without observations."""
+        self.window = window
+        self.redis_client = redis_client
+        self.key = key
+        self._memory = {}
+
+    def load(self) -> dict:
+        """Get observations as dict of path: (size, mtime_ns, first seen)."""
+        if self.redis_client is not None:
+            try:
+                return {
+                    (fn.decode() if isinstance(fn, bytes) else fn): tuple(json.loads(obs))
+                    for fn, obs in self.redis_client.hgetall(self.key).items()
+                }
+            except Exception:
+                logger.debug("Could not load file observations from Redis, using memory instead.", exc_info=True)
+        return dict(self._memory)
+
+    def save(self, observations: dict):
+        """Replace all observations."""
+        self._memory = dict(observations)
+        if self.redis_client is not None:
+            try:
+                pipe = self.redis_client.pipeline()
+                pipe.delete(self.key)
+                if observations:
+                    pipe.hset(self.key, mapping={fn: json.dumps(obs) for fn, obs in observations.items()})
+                pipe.execute()
+            except Exception:
+                logger.debug("Could not store file observations in Redis.", exc_info=True)
+
+    def observe(self, fns, now=None):
+        """Register the current size and modification time of files and return the files that are stable.
+
+        Parameters
+        ----------
+        fns : list
+            paths to all files found in the scan, observations of files not in the list are dropped
+        now : float, optional
+            current time [s since epoch], defaults to the system time
+
+        Returns
+        -------
+        list
+            paths to files that exist, are not empty and did not change during the window
+
+        """
+        now = time.time() if now is None else now
+        previous = self.load()
+        observations = {}
+        stable = []
+        for fn in fns:
+            try:
+                stat = os.stat(fn)
+            except FileNotFoundError:
+                continue
+            size, mtime = stat.st_size, stat.st_mtime_ns
+            obs = previous.get(fn)
+            if obs is None or obs[0] != size or obs[1] != mtime:
+                obs = (size, mtime, now)
+            elif size > 0 and now - obs[2] >= self.window:
+                stable.append(fn)
+            observations[fn] = obs
+        self.save(observations)
+        return stable
+
+    def pending(self, now=None):
+        """Return files that changed less than ``window`` seconds ago, i.e. that may become stable in a next scan.
+
+        Files that are unchanged for longer (e.g. empty files that are never written into) are not pending, so that
+        they do not keep triggering new scans.
+        """
+        now = time.time() if now is None else now
+        return [fn for fn, obs in self.load().items() if now - obs[2] < self.window]
+
+
+class FileClaims:
+    """Claim files for exclusive processing, so that tasks picking up the same file at the same time do not collide.
+
+    Claims are kept as Redis keys that are only set when not yet existing, so that only one task in any worker process
+    obtains a claim, or in memory of the current process if Redis is not provided or not available. Claims expire
+    after ``ttl`` seconds, so that files claimed by a task that crashed are picked up again.
+
+    Parameters
+    ----------
+    redis_client : redis.Redis, optional
+        client for storing claims in Redis
+    prefix : str, optional
+        prefix of the Redis keys with claims (default "incoming:claim:")
+    ttl : int, optional
+        time [s] after which claims expire (default 3600 s)
+
+    """
+
+    def __init__(self, redis_client=None, prefix: str = "incoming:claim:", ttl: int = 3600):
+        """Initialize without claims."""
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._memory = {}
+
+    def claim(self, name, ttl=None) -> bool:
+        """Claim a file (or any other named resource), returns False if it is already claimed."""
+        ttl = self.ttl if ttl is None else ttl
+        if self.redis_client is not None:
+            try:
+                return bool(self.redis_client.set(self.prefix + name, os.getpid(), nx=True, px=max(1, int(ttl * 1000))))
+            except Exception:
+                logger.debug("Could not claim in Redis, using memory instead.", exc_info=True)
+        now = time.monotonic()
+        if self._memory.get(name, 0) > now:
+            return False
+        self._memory[name] = now + ttl
+        return True
+
+    def release(self, name):
+        """Release a claim."""
+        self._memory.pop(name, None)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(self.prefix + name)
+            except Exception:
+                logger.debug("Could not release claim in Redis.", exc_info=True)
+
+
+def copy_file_chunked(src, dst, chunk_size=1024 * 1024):
+    """Copy a file in chunks (default 1 MB), without loading it in memory entirely."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        shutil.copyfileobj(fsrc, fdst, chunk_size)
+
+
+def reflink_file(src, dst):
+    """Clone a file as copy-on-write (e.g. on btrfs or xfs), so that no data is copied.
+
+    Raises OSError if the filesystem or platform does not support this.
+    """
+    import fcntl  # not available on all platforms
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+
+
+def transfer_file(src, dst, move=True):
+    """Transfer a file to a new location, copying its data only when there is no other way.
+
+    Copying multi-hundred MB videos doubles I/O time and write wear of e.g. SD-cards. Therefore, when moving, the
+    file is renamed (atomic within one filesystem). When the source must be kept, a hard link is made or the file is
+    cloned as copy-on-write. A chunked copy is only made if these are not possible, e.g. across filesystems.
+
+    Parameters
+    ----------
+    src : str
         path to file
-    delay : float, optional
-        amount of delay time (sec) to check if file size changes (default 1)
+    dst : str
+        path to destination file, parent directories are created if needed
+    move : bool, optional
+        if set (default), the source file is removed, otherwise the source file is kept
 
     Returns
     -------
-    bool
-        True (False) if file does (not) change
+    str
+        method used for the transfer, one of "rename", "link", "reflink" or "copy"
 
     """
-    if not (os.path.isfile(fn)):
-        raise IOError(f"File {fn} does not exist")
-    # check if file is being written into, by checking changes in file size over a delay
-    size1 = os.path.getsize(fn)
-    time.sleep(delay)
-    if size1 != os.path.getsize(fn):
-        return True
-    else:
-        return False
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if move:
+        try:
+            os.rename(src, dst)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        copy_file_chunked(src, dst)
+        os.remove(src)
+        return "copy"
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        pass
+    try:
+        reflink_file(src, dst)
+        return "reflink"
+    except (OSError, ImportError):
+        pass
+    copy_file_chunked(src, dst)
+    return "copy"
+
+
+def move_file(src, dst):
+    """Move a file without copying its data where possible, see ``transfer_file``."""
+    return transfer_file(src, dst, move=True)
 
 
 def scan_folder(incoming, clean_empty_dirs=True, suffix=None):
@@ -0,0 +1,154 @@
+"""Background removal of directories of deleted records, in batches and at a limited rate.
+
+Removing the files of many videos takes long, in particular on SD cards. Records are therefore deleted in one
+statement, and their directories are handed to the file reaper, which removes them in a daemon thread, so that
+requests and database transactions do not wait for the disk. Queued directories are also written to a journal file,
+so that their removal is resumed after a restart, instead of leaving them on disk without record.
+"""
+
+import collections
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from orc_api import FILE_REAPER_BATCH_SIZE, FILE_REAPER_JOURNAL, FILE_REAPER_RATE
+from orc_api.log import logger
+
+
+class FileReaper:
+    """Remove directories in a daemon thread, in batches and at a limited rate.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        number of directories removed before progress is logged and the rate limit is applied
+    rate : float, optional
+        maximum number of directories removed per second (0 means no limit)
+    journal : str, optional
+        file in which queued directories are kept until all are removed, to resume removal after a restart
+
+    """
+
+    def __init__(self, batch_size: int = 20, rate: float = 0, journal: Optional[str] = None):
+        """Initialize the reaper, the thread is started when directories are submitted."""
+        self.batch_size = max(1, batch_size)
+        self.rate = rate
+        self.journal = journal
+        self.pending = collections.deque()
+        self.submitted = 0
+        self.removed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, paths: Iterable[str]) -> int:
+        """Queue directories for removal and start the reaper thread if needed, returns the number queued."""
+        return self._enqueue(list(paths), write_journal=True)
+
+    def resume(self) -> int:
+        """Queue directories left in the journal by an earlier process, returns the number queued."""
+        if self.journal is None or not os.path.isfile(self.journal):
+            return 0
+        with open(self.journal) as f:
+            paths = list(dict.fromkeys(line.rstrip("\n") for line in f if line.strip()))
+        if paths:
+            logger.info(f"Resuming removal of {len(paths)} directories of deleted records.")
+        # the paths are already in the journal
+        return self._enqueue(paths, write_journal=False)
+
+    def _write_journal(self, paths: List[str]):
+        """Append directories to the journal, flushed to disk before the removal starts."""
+        with open(self.journal, "a") as f:
+            f.writelines(f"{path}\n" for path in paths)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _enqueue(self, paths: List[str], write_journal: bool) -> int:
+        """Queue directories for removal and start the reaper thread if needed."""
+        with self._lock:
+            if paths and write_journal and self.journal is not None:
+                try:
+                    self._write_journal(paths)
+                except OSError as e:
+                    logger.warning(f"Could not write directories to remove to {self.journal}: {e}")
+            self.pending.extend(paths)
+            self.submitted += len(paths)
+            if paths and (self._thread is None or not self._thread.is_alive()):
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name="file-reaper", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return len(paths)
+
+    def progress(self) -> Dict[str, int]:
+        """Get the number of submitted, removed, failed and still pending directories."""
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "removed": self.removed,
+                "failed": self.failed,
+                "pending": len(self.pending),
+            }
+
+    def reap_batch(self) -> int:
+        """Remove one batch of pending directories, returns the number of directories handled."""
+        with self._lock:
+            batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+        removed = failed = 0
+        for path in batch:
+            try:
+                # directories that are already gone count as removed
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove {path}: {e}")
+                failed += 1
+        with self._lock:
+            self.removed += removed
+            self.failed += failed
+            if batch and not self.pending and self.journal is not None:
+                # all queued directories are handled, nothing to resume
+                try:
+                    os.remove(self.journal)
+                except FileNotFoundError:
+                    pass
+        return len(batch)
+
+    def run(self):
+        """Remove pending directories until stopped."""
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            tic = time.monotonic()
+            n = self.reap_batch()
+            if n == 0:
+                # wake up regularly to check if the reaper is stopped
+                self._wakeup.wait(timeout=1.0)
+                continue
+            progress = self.progress()
+            logger.info(
+                f"Removed files of {progress['removed']} of {progress['submitted']} deleted records, "
+                f"{progress['pending']} pending, {progress['failed']} failed."
+            )
+            if self.rate > 0:
+                self._stop.wait(max(0.0, n / self.rate - (time.monotonic() - tic)))
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the reaper thread, pending directories remain queued until submitting restarts the thread."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        pending = self.progress()["pending"]
+        if pending:
+            resume = ", removal resumes after a restart" if self.journal is not None else ""
+            logger.warning(
+                f"File reaper stopped with {pending} directories of deleted records not yet removed{resume}."
+            )
+
+
+file_reaper = FileReaper(batch_size=FILE_REAPER_BATCH_SIZE, rate=FILE_REAPER_RATE, journal=FILE_REAPER_JOURNAL)
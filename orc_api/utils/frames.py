@@ -0,0 +1,248 @@
+"""Retrieval of single video frames as JPEG, e.g. for scrubbing through a video in the camera configuration.
+
+Opening a video and seeking to a frame decodes all frames from the previous keyframe onwards, and videos without a
+frame count in their metadata cannot be seeked at all. Three structures make repeated requests cheap:
+
+- a frame index per video file, stored next to the video, with the number of frames and the keyframes. It is
+  built once by reading the packets of the video without decoding them.
+- a pool of open video captures, with the frame at which they are positioned, so that a request for a next frame
+  only decodes the frames in between.
+- a cache of encoded JPEG frames, keyed by video, frame and rotation.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from orc_api import CAPTURE_POOL_SIZE, FRAME_CACHE_SIZE
+from orc_api.log import logger
+from orc_api.utils.cache import LRUCache
+
+ROTATIONS = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+
+def get_frame_index_file(fn: str) -> str:
+    """Get file name of the frame index of a video file."""
+    return f"{os.path.splitext(fn)[0]}_frames.json"
+
+
+def build_frame_index(fn: str) -> Dict:
+    """Build the frame index of a video file from its packets, without decoding frames.
+
+    Parameters
+    ----------
+    fn : str
+        path to video file
+
+    Returns
+    -------
+    dict
+        number of frames (``frame_count``), frame numbers of keyframes (``keyframes``), and whether the video can be
+        seeked by frame number (``seekable``, only if the frame count is available in the metadata)
+
+    """
+    cap = cv2.VideoCapture(fn, cv2.CAP_FFMPEG)
+    try:
+        seekable = cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+        # read encoded packets instead of decoded frames
+        raw = cap.set(cv2.CAP_PROP_FORMAT, -1)
+        frame_count = 0
+        keyframes = []
+        while cap.grab():
+            if not raw or cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(frame_count)
+            frame_count += 1
+    finally:
+        cap.release()
+    if not raw:
+        # keyframes are unknown, every frame is treated as a keyframe, so that seeking is preferred
+        logger.debug(f"Keyframes of {fn} could not be read, the video capture backend does not read raw packets.")
+    return {"frame_count": frame_count, "keyframes": keyframes, "seekable": seekable}
+
+
+def write_frame_index(fn: str) -> Dict:
+    """Build the frame index of a video file and store it next to the video file."""
+    frame_index = build_frame_index(fn)
+    with open(get_frame_index_file(fn), "w") as f:
+        json.dump(frame_index, f)
+    return frame_index
+
+
+def read_frame_index(fn: str) -> Dict:
+    """Read the frame index of a video file, built and stored first if not yet available or older than the video."""
+    index_file = get_frame_index_file(fn)
+    if os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(fn):
+        with open(index_file, "r") as f:
+            return json.load(f)
+    return write_frame_index(fn)
+
+
+class CapturePool:
+    """Pool of open video captures, each with the number of the frame that is read next.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        maximum number of idle captures kept open, the least recently used capture is released first
+
+    """
+
+    def __init__(self, maxsize: int = 4):
+        """Initialize an empty pool."""
+        self.maxsize = maxsize
+        self._idle: "OrderedDict[int, Tuple[str, cv2.VideoCapture, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, fn: str, frame_nr: int = 0) -> Tuple[cv2.VideoCapture, int]:
+        """Take a capture of a video file out of the pool, preferably one positioned at or just before ``frame_nr``.
+
+        Returns
+        -------
+        cv2.VideoCapture, int
+            capture and the number of the frame that it reads next, a new capture if none is available
+
+        """
+        with self._lock:
+            candidates = [(key, pos) for key, (name, _, pos) in self._idle.items() if name == fn]
+            if candidates:
+                before = [c for c in candidates if c[1] <= frame_nr]
+                key, _ = max(before, key=lambda c: c[1]) if before else candidates[0]
+                _, cap, pos = self._idle.pop(key)
+                return cap, pos
+        return cv2.VideoCapture(fn), 0
+
+    def release(self, fn: str, cap: cv2.VideoCapture, pos: int):
+        """Return a capture to the pool, with the number of the frame that it reads next."""
+        with self._lock:
+            self._idle[id(cap)] = (fn, cap, pos)
+            while len(self._idle) > self.maxsize:
+                _, (_, old_cap, _) = self._idle.popitem(last=False)
+                old_cap.release()
+
+    def clear(self):
+        """Release all idle captures."""
+        with self._lock:
+            for _, cap, _ in self._idle.values():
+                cap.release()
+            self._idle.clear()
+
+
+class FrameReader:
+    """Read single frames of video files as JPEG, using frame indexes, a capture pool and a JPEG cache.
+
+    Parameters
+    ----------
+    cache_size : int, optional
+        maximum number of JPEG frames kept in the cache
+    pool_size : int, optional
+        maximum number of idle video captures kept open
+
+    """
+
+    def __init__(self, cache_size: int = 64, pool_size: int = 4):
+        """Initialize reader with empty caches."""
+        self.cache = LRUCache(maxsize=cache_size)
+        self.frame_indexes = LRUCache(maxsize=max(pool_size, 16))
+        self.pool = CapturePool(maxsize=pool_size)
+
+    def get_frame_index(self, fn: str) -> Dict:
+        """Get the frame index of a video file, kept in memory after reading it once."""
+        key = (fn, os.path.getmtime(fn))
+        frame_index = self.frame_indexes.get(key)
+        if frame_index is None:
+            frame_index = read_frame_index(fn)
+            self.frame_indexes.set(key, frame_index)
+        return frame_index
+
+    @staticmethod
+    def _keyframe_between(keyframes: List[int], start: int, stop: int) -> bool:
+        """Check if there is a keyframe after frame ``start`` and at or before frame ``stop``."""
+        return any(start < k <= stop for k in keyframes)
+
+    def read_frame(self, fn: str, frame_nr: int):
+        """Read a decoded frame from a video file, decoding as few frames as possible.
+
+        Raises
+        ------
+        IndexError
+            if the frame is not available in the video
+        IOError
+            if the frame is available, but cannot be decoded
+
+        """
+        frame_index = self.get_frame_index(fn)
+        if not 0 <= frame_nr < frame_index["frame_count"]:
+            raise IndexError(f"Frame {frame_nr} is not available, video has {frame_index['frame_count']} frames")
+        cap, pos = self.pool.acquire(fn, frame_nr)
+        try:
+            if frame_index["seekable"] and (
+                pos > frame_nr or self._keyframe_between(frame_index["keyframes"], pos, frame_nr)
+            ):
+                # seeking decodes from the last keyframe, which is less than reading on from the current frame
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_nr)
+                pos = frame_nr
+            elif pos > frame_nr:
+                # videos without frame count cannot be seeked, reading starts again at the first frame
+                cap.release()
+                cap, pos = cv2.VideoCapture(fn), 0
+            # skip frames without converting them
+            while pos < frame_nr and cap.grab():
+                pos += 1
+            success, frame = cap.read()
+        except Exception:
+            cap.release()
+            raise
+        if not success:
+            cap.release()
+            raise IOError(f"Frame {frame_nr} could not be read from {fn}")
+        self.pool.release(fn, cap, frame_nr + 1)
+        return frame
+
+    def get_frame_jpeg(self, fn: str, frame_nr: int, rotate: Optional[int] = None, key=None) -> bytes:
+        """Get a frame of a video file as JPEG, rotated if requested, from the cache if available.
+
+        Parameters
+        ----------
+        fn : str
+            path to video file
+        frame_nr : int
+            number of frame, starting at 0
+        rotate : int, optional
+            rotation of the frame, 90, 180 or 270 degrees clockwise
+        key : hashable, optional
+            key of the video in the cache, e.g. the video id, the file name and modification time are always added
+
+        Returns
+        -------
+        bytes
+            JPEG encoded frame
+
+        Raises
+        ------
+        ValueError
+            if the rotation is not supported
+        IndexError
+            if the frame is not available in the video
+        IOError
+            if the frame is available, but cannot be decoded
+
+        """
+        if rotate is not None and rotate not in ROTATIONS:
+            raise ValueError("Rotation must be None, 90, 180 or 270 degrees")
+        cache_key = (key, fn, os.path.getmtime(fn), frame_nr, rotate)
+        jpeg = self.cache.get(cache_key)
+        if jpeg is None:
+            frame = self.read_frame(fn, frame_nr)
+            if rotate is not None:
+                frame = cv2.rotate(frame, ROTATIONS[rotate])
+            _, buffer = cv2.imencode(".jpg", frame)
+            jpeg = buffer.tobytes()
+            self.cache.set(cache_key, jpeg)
+        return jpeg
+
+
+frame_reader = FrameReader(cache_size=FRAME_CACHE_SIZE, pool_size=CAPTURE_POOL_SIZE)
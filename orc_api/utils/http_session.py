@@ -0,0 +1,94 @@
+"""Pooled HTTP session for communication with LiveORC."""
+
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from orc_api import HTTP_BACKOFF, HTTP_POOL_SIZE, HTTP_RETRIES
+
+# HTTP status codes that indicate a temporary problem of the server or a proxy in between
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_retry(retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF) -> Retry:
+    """Get the retry policy of HTTP requests.
+
+    Failed connections are retried for all methods, as the request was not sent yet. Read errors and temporary
+    server errors are only retried for idempotent methods, so that POST requests never create duplicate records.
+
+    Parameters
+    ----------
+    retries : int, optional
+        maximum number of retries of a request
+    backoff : float, optional
+        backoff factor [s], retries wait backoff * 2 ** (retry - 1) seconds
+
+    """
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        # return the last response instead of raising, so that callers handle status codes as before
+        raise_on_status=False,
+    )
+
+
+def create_http_session(
+    pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF
+) -> requests.Session:
+    """Create an HTTP session that keeps connections alive in a pool, with retries and backoff.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        maximum number of connections kept alive per host
+    retries : int, optional
+        maximum number of retries of a request
+    backoff : float, optional
+        backoff factor [s] between retries
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=get_retry(retries, backoff))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Get the HTTP session shared by all threads of the current process.
+
+    Connections are reused between requests, so that subsequent requests to LiveORC do not repeat the TCP and TLS
+    handshakes. A new session is made in forked processes, as connections cannot be shared between processes.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = create_http_session()
+                _session_pid = pid
+    return _session
+
+
+def close_http_session():
+    """Close the HTTP session of the current process and its connections."""
+    global _session, _session_pid
+    with _lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
@@ -1,20 +1,45 @@
 """Image utilities for NodeORC API."""
 
-import io
+from typing import Dict, Tuple
 
 import cv2
-from fastapi import HTTPException
 from PIL import Image
 
 
 def create_thumbnail(image_path: str, size=(50, 50)) -> Image:
     """Create thumbnail for image."""
+    return create_thumbnails(image_path, {"thumbnail": size})["thumbnail"]
+
+
+def create_thumbnails(image_path: str, sizes: Dict[str, Tuple[int, int]]) -> Dict[str, Image.Image]:
+    """Create thumbnails of several sizes from the first frame of a video or image, decoded only once.
+
+    Parameters
+    ----------
+    image_path : str
+        path to video or image file
+    sizes : dict
+        maximum (width, height) of thumbnails by name, the aspect ratio is kept
+
+    Returns
+    -------
+    dict
+        thumbnails by name
+
+    """
     cap = cv2.VideoCapture(image_path)
     res, image = cap.read()
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    img = Image.fromarray(image)
-    img.thumbnail(size, Image.LANCZOS)
-    return img
+    cap.release()
+    if not res:
+        raise ValueError(f"Could not read a frame from {image_path}")
+    img = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    thumbnails = {}
+    # resize from large to small, so that each thumbnail is resampled from the smallest image still large enough
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        img = img.copy()
+        img.thumbnail(size, Image.LANCZOS)
+        thumbnails[name] = img
+    return thumbnails
 
 
 def get_height_width(fn):
@@ -34,12 +59,10 @@ def get_frame_count(fn):
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     # if frame_count is negative, try to find out how many frames are available by reading all
     if frame_count < 0:
-        ret = True
+        # count encoded packets instead of decoding frames, where supported by the backend
+        cap.set(cv2.CAP_PROP_FORMAT, -1)
         n = 0
-        while ret:
-            ret, img = cap.read()
-            if not ret:
-                break
+        while cap.grab():
             n += 1
         # remove one frame just to make sure
         frame_count = n - 1
@@ -48,49 +71,38 @@ def get_frame_count(fn):
     return frame_count
 
 
-def get_frame_from_cap(cap, rotate):
-    """Get frame from video."""
-    success, frame = cap.read()
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to read frame")
-
-    # Validate and apply rotation if specified
-    if rotate is not None:
-        if rotate not in [90, 180, 270]:
-            raise HTTPException(status_code=400, detail="Rotation must be None, 90, 180 or 270 degrees")
-        if rotate == 90:
-            frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-        elif rotate == 180:
-            frame = cv2.rotate(frame, cv2.ROTATE_180)
-        elif rotate == 270:
-            frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+def probe_video(fn) -> Dict:
+    """Probe metadata of a video file, without decoding frames if the metadata contains the frame count.
 
-    # Convert the frame to jpg format
-    _, buffer = cv2.imencode(".jpg", frame)
-    return success, io.BytesIO(buffer.tobytes())
+    Parameters
+    ----------
+    fn : str
+        path to video file
 
+    Returns
+    -------
+    dict
+        ``frame_count``, ``fps``, ``width``, ``height``, ``codec`` (FourCC) and ``duration`` [s] of the video
 
-def yield_frames_from_fn(fn, rotate, start_frame, end_frame):
-    """Yield frames from video."""
+    """
     cap = cv2.VideoCapture(fn)
     try:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-        current_frame = start_frame
-        while True:
-            # while current_frame <= end_frame:
-            success, io_buf = get_frame_from_cap(cap, rotate)
-            if not success:
-                break
-            io_buf.seek(0)
-            yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + io_buf.read() + b"\r\n")
-            current_frame += 1
-            if current_frame == end_frame:
-                # reset entirely. This is needed because files without metadata may not properly rewind!
-                cap.release()
-                del cap
-                cap = cv2.VideoCapture(fn)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-                current_frame = start_frame
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video {fn}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     finally:
         cap.release()
-        del cap
+    if frame_count <= 0:
+        frame_count = get_frame_count(fn)
+    return {
+        "frame_count": frame_count,
+        "fps": fps if fps > 0 else None,
+        "width": width,
+        "height": height,
+        "codec": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip("\x00 ") or None,
+        "duration": frame_count / fps if fps > 0 else None,
+    }
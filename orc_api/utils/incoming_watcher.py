@@ -0,0 +1,284 @@
+"""Event-driven watcher of the incoming folder, submitting new video files as soon as they are complete."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from orc_api.log import logger
+from orc_api.utils import disk_management
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+EVENT_STRUCT = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """Report files in a folder (recursively) that are closed after writing or moved into the folder.
+
+    Uses Linux inotify through libc, so that no process wakes up while the folder is idle. A file is only reported
+    when its writer closed it, or when it was moved into the folder as a whole, so no stability check is needed.
+
+    Parameters
+    ----------
+    path : str
+        folder to watch
+
+    """
+
+    def __init__(self, path: str):
+        """Initialize the inotify instance and watch the folder and its subfolders."""
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self.watches: Dict[int, str] = {}
+        self.path = path
+        self.add_watch_recursive(path)
+
+    def add_watch(self, path: str):
+        """Watch a single folder."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {path}: {os.strerror(errno)}")
+        self.watches[wd] = path
+
+    def add_watch_recursive(self, path: str):
+        """Watch a folder and all its subfolders."""
+        for root, _, _ in os.walk(path):
+            self.add_watch(root)
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        """Wait at most ``timeout`` seconds for events and return paths of completed files."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + EVENT_STRUCT.size <= len(data):
+            wd, mask, _, name_len = EVENT_STRUCT.unpack_from(data, offset)
+            offset += EVENT_STRUCT.size
+            name = os.fsdecode(data[offset : offset + name_len].rstrip(b"\0"))
+            offset += name_len
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            folder = self.watches.get(wd)
+            if folder is None or not name:
+                continue
+            full_path = os.path.join(folder, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # new subfolder, files in there are reported too. Files written before the watch is in place are
+                    # found by the regular rescan of the incoming folder.
+                    try:
+                        self.add_watch_recursive(full_path)
+                    except OSError as e:
+                        logger.warning(f"Cannot watch new folder {full_path}: {e}")
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                paths.append(full_path)
+        return paths
+
+    def close(self):
+        """Close the inotify instance, removing all watches."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingBackend:
+    """Report files in a folder (recursively) once their size and modification time stopped changing.
+
+    Fallback for platforms or filesystems without inotify (e.g. network mounts). Stability of files is determined
+    from subsequent polls by an in-memory ``disk_management.FileStabilityTracker``, so that a file is reported as soon
+    as it did not change over one poll interval, without sleeping on each file.
+
+    Parameters
+    ----------
+    path : str
+        folder to watch
+    poll_interval : float, optional
+        interval [s] between scans of the folder (default 5 s)
+
+    """
+
+    def __init__(self, path: str, poll_interval: float = 5.0):
+        """Initialize the polling backend, files already in the folder are reported once stable."""
+        self.path = path
+        self.poll_interval = poll_interval
+        self.tracker = disk_management.FileStabilityTracker(window=poll_interval)
+        self.reported: Dict[str, Tuple] = {}
+        self._last_poll: Optional[float] = None
+
+    def scan(self) -> List[str]:
+        """Get the paths of all files in the folder."""
+        return [os.path.join(root, f) for root, _, files in os.walk(self.path) for f in files]
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        """Wait for the next poll (at most ``timeout`` seconds) and return paths of files that became stable."""
+        if self._last_poll is not None:
+            wait = self._last_poll + self.poll_interval - time.monotonic()
+            if timeout is not None:
+                wait = min(wait, timeout)
+            if wait > 0:
+                time.sleep(wait)
+                if time.monotonic() < self._last_poll + self.poll_interval:
+                    return []
+        self._last_poll = time.monotonic()
+        stable = self.tracker.observe(self.scan(), now=self._last_poll)
+        observations = self.tracker.load()
+        # stable files are only reported once, until they change again
+        paths = [fn for fn in stable if self.reported.get(fn) != observations[fn]]
+        self.reported = {fn: observations[fn] for fn in stable}
+        return paths
+
+    def close(self):
+        """Stop polling (no resources to release)."""
+        pass
+
+
+class IncomingWatcher:
+    """Watch the incoming folder and submit batches of completed video files.
+
+    Events are debounced per file: a file is only submitted when no new events arrived for it during ``debounce``
+    seconds, so that e.g. files uploaded in several write sessions are submitted once. All files that are due are
+    submitted together in one call of ``callback``.
+
+    Parameters
+    ----------
+    path : str
+        incoming folder
+    callback : callable
+        called with a list of paths of completed files
+    suffix : str, optional
+        only submit files with this suffix (e.g. "mp4")
+    debounce : float, optional
+        time [s] without new events before a file is submitted (default 2 s)
+    poll_interval : float, optional
+        interval [s] between scans when inotify is not available (default 5 s)
+    use_inotify : bool, optional
+        use inotify (True), polling (False), or inotify if available (None, default)
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        callback: Callable[[List[str]], None],
+        suffix: Optional[str] = None,
+        debounce: float = 2.0,
+        poll_interval: float = 5.0,
+        use_inotify: Optional[bool] = None,
+    ):
+        """Initialize the watcher, events are only read once started."""
+        self.path = path
+        self.callback = callback
+        self.suffix = suffix
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.pending: Dict[str, float] = {}
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def open_backend(self):
+        """Open the inotify backend, or the polling backend if inotify is not available or not requested."""
+        if self.use_inotify is not False:
+            try:
+                self.backend = InotifyBackend(self.path)
+                logger.info(f"Watching {self.path} for new videos with inotify.")
+                return self.backend
+            except (OSError, AttributeError) as e:
+                if self.use_inotify:
+                    raise
+                logger.warning(f"inotify not available ({e}), polling {self.path} every {self.poll_interval} s.")
+        self.backend = PollingBackend(self.path, poll_interval=self.poll_interval)
+        return self.backend
+
+    def matches(self, path: str) -> bool:
+        """Check if a path has the expected suffix."""
+        return self.suffix is None or path.endswith(self.suffix)
+
+    def add_events(self, paths: List[str], now: Optional[float] = None):
+        """Register events of completed files, restarting their debounce time."""
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            if self.matches(path):
+                self.pending[path] = now
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Remove and return pending files without events during the debounce time, if they exist and are not empty."""
+        now = time.monotonic() if now is None else now
+        due = [path for path, t in self.pending.items() if now - t >= self.debounce]
+        for path in due:
+            del self.pending[path]
+        return [path for path in due if os.path.isfile(path) and os.path.getsize(path) > 0]
+
+    def next_timeout(self, now: Optional[float] = None) -> Optional[float]:
+        """Get the time [s] until the first pending file is due, or None when nothing is pending."""
+        if not self.pending:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self.pending.values()) + self.debounce - now)
+
+    def step(self, timeout: Optional[float] = None):
+        """Read events during at most ``timeout`` seconds and submit the files that are due."""
+        next_timeout = self.next_timeout()
+        if next_timeout is not None:
+            timeout = next_timeout if timeout is None else min(timeout, next_timeout)
+        self.add_events(self.backend.read(timeout))
+        due = self.pop_due()
+        if due:
+            try:
+                self.callback(due)
+            except Exception as e:
+                logger.error(f"Could not submit new videos {due}: {e}", exc_info=True)
+
+    def run(self):
+        """Watch the folder until stopped."""
+        if self.backend is None:
+            self.open_backend()
+        try:
+            while not self._stop.is_set():
+                # wake up regularly to check if the watcher is stopped
+                self.step(timeout=1.0)
+        finally:
+            self.backend.close()
+
+    def start(self):
+        """Watch the folder in a daemon thread."""
+        self.open_backend()
+        self._thread = threading.Thread(target=self.run, name="incoming-watcher", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop watching and wait for the watcher thread to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
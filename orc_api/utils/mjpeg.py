@@ -0,0 +1,634 @@
+"""MJPEG streaming of video files and camera feeds, with frames read and encoded outside of the event loop.
+
+Reading, rotating and encoding a frame blocks for tens of milliseconds. Each stream therefore has a thread that reads
+and encodes frames, and hands them to an asyncio queue per viewer. Viewers with the same options share one encoder:
+
+- video files are read by a producer per file and options, which is stopped when the last viewer leaves.
+- camera feeds are read by a relay per URL, because cameras often allow only one or two connections. Each frame is
+  decoded once, and encoded once per combination of options of the viewers. A relay without viewers is closed after
+  ``ORC_FEED_IDLE_TIMEOUT`` seconds.
+
+Queues of viewers are small: a viewer that cannot keep up skips frames instead of delaying other viewers. Producers of
+video files pause while no viewer has room for a next frame, relays of camera feeds keep reading the feed, so that it
+does not lag behind, but only decode and encode frames when a viewer has room for them.
+"""
+
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
+
+import cv2
+from fastapi import Request
+
+from orc_api import FEED_IDLE_TIMEOUT, STREAM_JPEG_QUALITY, STREAM_MAX_FPS, STREAM_MAX_WIDTH
+from orc_api.log import logger
+from orc_api.utils.frames import ROTATIONS
+
+# header of each frame in a multipart MJPEG response
+FRAME_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+
+
+def encode_jpeg(frame, rotate: Optional[int] = None, quality: int = 80, max_width: int = 0) -> bytes:
+    """Encode a frame as JPEG, rotated and downscaled if requested.
+
+    Parameters
+    ----------
+    frame : np.ndarray
+        decoded frame
+    rotate : int, optional
+        rotation of the frame, 90, 180 or 270 degrees clockwise
+    quality : int, optional
+        JPEG quality, from 1 to 100
+    max_width : int, optional
+        maximum width of the frame after rotation [px], larger frames are downscaled (0 means full size)
+
+    Returns
+    -------
+    bytes
+        JPEG encoded frame
+
+    """
+    if rotate is not None:
+        if rotate not in ROTATIONS:
+            raise ValueError("Rotation must be None, 90, 180 or 270 degrees")
+        frame = cv2.rotate(frame, ROTATIONS[rotate])
+    if max_width and frame.shape[1] > max_width:
+        height = max(1, round(frame.shape[0] * max_width / frame.shape[1]))
+        frame = cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+    success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not success:
+        raise ValueError("Frame could not be encoded as JPEG")
+    return buffer.tobytes()
+
+
+class VideoFileSource:
+    """Frames of a video file, repeated from ``start_frame`` up to ``end_frame``."""
+
+    live = False
+
+    def __init__(self, fn: str, start_frame: int = 0, end_frame: Optional[int] = None):
+        """Initialize the source, the video file is opened by the producer."""
+        self.fn = fn
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.cap = None
+        self.pos = start_frame
+
+    def open(self):
+        """Open the video file at the start frame."""
+        self.close()
+        self.cap = cv2.VideoCapture(self.fn)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Unable to open video {self.fn}")
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        self.pos = self.start_frame
+
+    def grab(self) -> bool:
+        """Go to the next frame, returns False if it cannot be read."""
+        if self.end_frame is not None and self.pos >= self.end_frame:
+            # reopen entirely, files without metadata may not properly rewind
+            self.open()
+        self.pos += 1
+        return self.cap.grab()
+
+    def retrieve(self):
+        """Decode the current frame."""
+        success, frame = self.cap.retrieve()
+        return frame if success else None
+
+    def close(self):
+        """Release the video file."""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class FeedSource:
+    """Frames of a live video feed, e.g. an IP camera stream."""
+
+    live = True
+
+    def __init__(self, url: str):
+        """Initialize the source, the feed is opened by the relay."""
+        self.url = url
+        self.cap = None
+
+    def open(self):
+        """Open the feed."""
+        self.cap = cv2.VideoCapture(self.url)
+        if not self.cap.isOpened():
+            raise RuntimeError("Unable to open video feed")
+
+    def grab(self) -> bool:
+        """Read the next frame from the feed, returns False if the feed has ended."""
+        return self.cap.grab()
+
+    def retrieve(self):
+        """Decode the last read frame."""
+        success, frame = self.cap.retrieve()
+        return frame if success else None
+
+    def close(self):
+        """Release the feed."""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class Viewer:
+    """Queue of encoded frames for one viewer of a stream, ``None`` marks the end of the stream."""
+
+    def __init__(self, encoder: "Encoder", loop: asyncio.AbstractEventLoop):
+        """Initialize an empty queue, filled from the thread of the encoder."""
+        self.encoder = encoder
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        # frames handed to the queue and not yet taken, guarded by the encoder
+        self.pending = 0
+
+    async def get(self) -> Optional[bytes]:
+        """Wait for the next encoded frame."""
+        jpeg = await self.queue.get()
+        self.encoder.frame_taken(self)
+        return jpeg
+
+
+class Encoder:
+    """Encode frames with one set of options and hand them to its viewers.
+
+    Parameters
+    ----------
+    rotate : int, optional
+        rotation of frames, 90, 180 or 270 degrees clockwise
+    quality : int, optional
+        JPEG quality, from 1 to 100
+    max_width : int, optional
+        maximum width of frames [px] (0 means full size)
+    max_fps : float, optional
+        maximum number of frames per second (0 means no limit)
+    buffer_size : int, optional
+        maximum number of frames waiting in the queue of a viewer
+
+    """
+
+    def __init__(
+        self,
+        rotate: Optional[int] = None,
+        quality: int = 80,
+        max_width: int = 0,
+        max_fps: float = 0,
+        buffer_size: int = 2,
+    ):
+        """Initialize the encoder without viewers."""
+        self.rotate = rotate
+        self.quality = quality
+        self.max_width = max_width
+        self.max_fps = max_fps
+        self.buffer_size = max(1, buffer_size)
+        self.viewers: List[Viewer] = []
+        self.frames = 0
+        self.next_time = time.monotonic()
+        self._room = threading.Condition()
+
+    def add_viewer(self, loop: asyncio.AbstractEventLoop) -> Viewer:
+        """Add a viewer, receiving frames on the given event loop."""
+        viewer = Viewer(self, loop)
+        with self._room:
+            self.viewers.append(viewer)
+            self._room.notify_all()
+        return viewer
+
+    def remove_viewer(self, viewer: Viewer) -> int:
+        """Remove a viewer, returns the number of remaining viewers."""
+        with self._room:
+            if viewer in self.viewers:
+                self.viewers.remove(viewer)
+            self._room.notify_all()
+            return len(self.viewers)
+
+    def frame_taken(self, viewer: Viewer):
+        """Make room in the queue of a viewer for a next frame."""
+        with self._room:
+            viewer.pending = max(0, viewer.pending - 1)
+            self._room.notify_all()
+
+    def has_room(self) -> bool:
+        """Check if any viewer has room for a next frame."""
+        with self._room:
+            return any(viewer.pending < self.buffer_size for viewer in self.viewers)
+
+    def due(self, now: float) -> bool:
+        """Check if a next frame is due within the frame rate cap."""
+        return now >= self.next_time
+
+    def encode(self, frame) -> bytes:
+        """Encode a frame with the options of the encoder."""
+        return encode_jpeg(frame, rotate=self.rotate, quality=self.quality, max_width=self.max_width)
+
+    def _send(self, viewer: Viewer, jpeg: Optional[bytes]):
+        try:
+            viewer.loop.call_soon_threadsafe(viewer.queue.put_nowait, jpeg)
+        except RuntimeError:
+            # the event loop of the viewer is closed
+            pass
+
+    def publish(self, jpeg: bytes) -> int:
+        """Hand an encoded frame to all viewers with room for it, returns the number of viewers."""
+        with self._room:
+            viewers = [viewer for viewer in self.viewers if viewer.pending < self.buffer_size]
+            for viewer in viewers:
+                viewer.pending += 1
+                self._send(viewer, jpeg)
+        self.frames += 1
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        self.next_time = max(self.next_time + interval, time.monotonic() - interval)
+        return len(viewers)
+
+    def end(self):
+        """End the stream for all viewers."""
+        with self._room:
+            for viewer in self.viewers:
+                self._send(viewer, None)
+
+
+class MJPEGProducer(Encoder):
+    """Read and encode frames of a video file in a daemon thread, for all viewers with the same options.
+
+    Parameters
+    ----------
+    source : VideoFileSource
+        source of frames
+    on_close : callable, optional
+        called with the producer when its thread ends
+    **options
+        options of the encoder, see ``Encoder``
+
+    """
+
+    def __init__(self, source, on_close: Optional[Callable[["MJPEGProducer"], None]] = None, **options):
+        """Initialize the producer, the thread is started with ``start``."""
+        super().__init__(**options)
+        self.source = source
+        self.on_close = on_close
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the producer thread."""
+        self._thread = threading.Thread(target=self.run, name="mjpeg-producer", daemon=True)
+        self._thread.start()
+
+    def _wait_for_room(self) -> bool:
+        """Wait until a viewer has room for a next frame, returns False if the producer is stopped."""
+        with self._room:
+            while not self._stop.is_set() and not self.has_room():
+                # wake up regularly to check if the producer is stopped
+                self._room.wait(timeout=1.0)
+        return not self._stop.is_set()
+
+    def run(self):
+        """Read, encode and publish frames until the source ends or the producer is stopped."""
+        try:
+            self.source.open()
+            while self._wait_for_room() and self.source.grab():
+                if self._stop.wait(max(0.0, self.next_time - time.monotonic())):
+                    break
+                frame = self.source.retrieve()
+                if frame is None:
+                    break
+                self.publish(self.encode(frame))
+        except Exception as e:
+            logger.warning(f"MJPEG stream stopped: {e}")
+        finally:
+            self.source.close()
+            if self.on_close is not None:
+                self.on_close(self)
+            self._stop.set()
+            self.end()
+
+    def is_alive(self) -> bool:
+        """Check if the producer thread is running and not stopped."""
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the producer thread, remaining viewers receive the end of the stream."""
+        self._stop.set()
+        with self._room:
+            self._room.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+class FeedRelay:
+    """Read a camera feed once in a daemon thread, and encode its frames once per combination of options.
+
+    Parameters
+    ----------
+    source : FeedSource
+        camera feed
+    idle_timeout : float, optional
+        seconds that the feed stays open without viewers
+    on_idle : callable, optional
+        called with the relay when it has been idle for ``idle_timeout`` seconds, returns True if the relay is to be
+        closed, otherwise the relay waits for viewers again
+    on_close : callable, optional
+        called with the relay when its thread ends
+
+    """
+
+    def __init__(
+        self,
+        source,
+        idle_timeout: float = 5.0,
+        on_idle: Optional[Callable[["FeedRelay"], bool]] = None,
+        on_close: Optional[Callable[["FeedRelay"], None]] = None,
+    ):
+        """Initialize the relay without encoders, the thread is started with ``start``."""
+        self.source = source
+        self.idle_timeout = idle_timeout
+        self.on_idle = on_idle
+        self.on_close = on_close
+        self.encoders: Dict[Tuple, Encoder] = {}
+        self.frames_read = 0
+        self.frames_decoded = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the relay thread."""
+        self._thread = threading.Thread(target=self.run, name="feed-relay", daemon=True)
+        self._thread.start()
+
+    def add_viewer(self, loop: asyncio.AbstractEventLoop, **options) -> Viewer:
+        """Add a viewer to the encoder with the given options, created first if not yet available."""
+        key = tuple(sorted(options.items()))
+        with self._lock:
+            encoder = self.encoders.get(key)
+            if encoder is None:
+                encoder = self.encoders[key] = Encoder(**options)
+            return encoder.add_viewer(loop)
+
+    def remove_viewer(self, viewer: Viewer) -> int:
+        """Remove a viewer and its encoder if it has no viewers left, returns the number of remaining viewers."""
+        with self._lock:
+            if viewer.encoder.remove_viewer(viewer) == 0:
+                self.encoders = {key: encoder for key, encoder in self.encoders.items() if encoder.viewers}
+            return sum(len(encoder.viewers) for encoder in self.encoders.values())
+
+    def run(self):
+        """Read the feed and publish frames to all encoders, until the feed ends or the relay is closed."""
+        idle_since = None
+        try:
+            self.source.open()
+            while not self._stop.is_set() and self.source.grab():
+                self.frames_read += 1
+                now = time.monotonic()
+                with self._lock:
+                    encoders = list(self.encoders.values())
+                if not encoders:
+                    idle_since = now if idle_since is None else idle_since
+                    if now - idle_since >= self.idle_timeout and (self.on_idle is None or self.on_idle(self)):
+                        break
+                    continue
+                idle_since = None
+                # frames above the frame rate cap, or without room for them, are read but not decoded
+                encoders = [encoder for encoder in encoders if encoder.due(now) and encoder.has_room()]
+                if not encoders:
+                    continue
+                frame = self.source.retrieve()
+                if frame is None:
+                    break
+                self.frames_decoded += 1
+                for encoder in encoders:
+                    encoder.publish(encoder.encode(frame))
+        except Exception as e:
+            logger.warning(f"Camera feed relay stopped: {e}")
+        finally:
+            self.source.close()
+            if self.on_close is not None:
+                self.on_close(self)
+            self._stop.set()
+            with self._lock:
+                for encoder in self.encoders.values():
+                    encoder.end()
+
+    def is_alive(self) -> bool:
+        """Check if the relay thread is running and not closed."""
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Close the feed, remaining viewers receive the end of the stream."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+def _stream_options(rotate, quality, max_width, max_fps) -> Dict:
+    return {
+        "rotate": rotate,
+        "quality": STREAM_JPEG_QUALITY if quality is None else quality,
+        "max_width": STREAM_MAX_WIDTH if max_width is None else max_width,
+        "max_fps": STREAM_MAX_FPS if max_fps is None else max_fps,
+    }
+
+
+async def _stream_viewer(viewer: Viewer, request: Optional[Request], unsubscribe: Callable) -> AsyncIterator[bytes]:
+    """Yield the frames of a viewer as parts of a multipart MJPEG response, until the client disconnects."""
+    try:
+        while True:
+            jpeg = await viewer.get()
+            if jpeg is None:
+                break
+            if request is not None and await request.is_disconnected():
+                logger.info("Client disconnected from MJPEG stream.")
+                break
+            yield FRAME_HEADER + jpeg + b"\r\n"
+    finally:
+        unsubscribe(viewer)
+
+
+class StreamHub:
+    """Shared MJPEG producers of video files by file and options, stopped with their last viewer."""
+
+    def __init__(self):
+        """Initialize without producers."""
+        self.producers: Dict[Hashable, MJPEGProducer] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        key: Hashable,
+        source_factory: Callable[[], object],
+        rotate: Optional[int] = None,
+        quality: Optional[int] = None,
+        max_width: Optional[int] = None,
+        max_fps: Optional[float] = None,
+    ) -> Viewer:
+        """Add a viewer to the producer of a source, started first if not yet running.
+
+        Parameters
+        ----------
+        key : hashable
+            key of the source, e.g. the file name of a video
+        source_factory : callable
+            returns a new source, only called if no producer of the source is running with the same options
+        rotate, quality, max_width, max_fps : optional
+            options of the stream, see ``Encoder``, the stream settings of the device if not given
+
+        Returns
+        -------
+        Viewer
+            queue of encoded frames of the viewer, to be removed with ``unsubscribe``
+
+        """
+        options = _stream_options(rotate, quality, max_width, max_fps)
+        key = (key,) + tuple(options.values())
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            producer = self.producers.get(key)
+            if producer is None or not producer.is_alive():
+                producer = MJPEGProducer(source_factory(), on_close=lambda p: self._discard(key, p), **options)
+                self.producers[key] = producer
+                producer.start()
+            return producer.add_viewer(loop)
+
+    def _discard(self, key: Hashable, producer: MJPEGProducer):
+        with self._lock:
+            if self.producers.get(key) is producer:
+                del self.producers[key]
+
+    def unsubscribe(self, viewer: Viewer):
+        """Remove a viewer, the producer is stopped when it has no viewers left."""
+        with self._lock:
+            if viewer.encoder.remove_viewer(viewer) == 0:
+                viewer.encoder.stop(timeout=0)
+
+    async def stream(
+        self, key: Hashable, source_factory: Callable[[], object], request: Optional[Request] = None, **options
+    ) -> AsyncIterator[bytes]:
+        """Yield the frames of a shared stream as parts of a multipart MJPEG response, until the client disconnects.
+
+        Parameters
+        ----------
+        key : hashable
+            key of the source, see ``subscribe``
+        source_factory : callable
+            returns a new source, see ``subscribe``
+        request : Request, optional
+            request of the viewer, the stream ends when its client is disconnected
+        **options
+            options of the stream, see ``subscribe``
+
+        """
+        viewer = self.subscribe(key, source_factory, **options)
+        async for frame in _stream_viewer(viewer, request, self.unsubscribe):
+            yield frame
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop all producers."""
+        with self._lock:
+            producers = list(self.producers.values())
+        for producer in producers:
+            producer.stop(timeout)
+
+
+class FeedRelayHub:
+    """Relays of camera feeds by URL, one connection per camera, closed when idle.
+
+    Parameters
+    ----------
+    idle_timeout : float, optional
+        seconds that a feed stays open without viewers
+
+    """
+
+    def __init__(self, idle_timeout: float = 5.0):
+        """Initialize without relays."""
+        self.idle_timeout = idle_timeout
+        self.relays: Dict[str, FeedRelay] = {}
+        self._lock = threading.Lock()
+
+    def is_open(self, url: str) -> bool:
+        """Check if a feed is currently relayed."""
+        with self._lock:
+            relay = self.relays.get(url)
+            return relay is not None and relay.is_alive()
+
+    def subscribe(
+        self,
+        url: str,
+        rotate: Optional[int] = None,
+        quality: Optional[int] = None,
+        max_width: Optional[int] = None,
+        max_fps: Optional[float] = None,
+    ) -> Viewer:
+        """Add a viewer to the relay of a feed, opened first if not yet running.
+
+        Parameters
+        ----------
+        url : str
+            URL of the feed
+        rotate, quality, max_width, max_fps : optional
+            options of the stream, see ``Encoder``, the stream settings of the device if not given
+
+        Returns
+        -------
+        Viewer
+            queue of encoded frames of the viewer, to be removed with ``unsubscribe``
+
+        """
+        options = _stream_options(rotate, quality, max_width, max_fps)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            relay = self.relays.get(url)
+            if relay is None or not relay.is_alive():
+                relay = FeedRelay(
+                    FeedSource(url),
+                    idle_timeout=self.idle_timeout,
+                    on_idle=self._close_idle,
+                    on_close=lambda r: self._discard(url, r),
+                )
+                self.relays[url] = relay
+                relay.start()
+            return relay.add_viewer(loop, **options)
+
+    def _close_idle(self, relay: FeedRelay) -> bool:
+        # decided under the lock of the hub, so that no viewer is added to a relay that is being closed
+        with self._lock:
+            if relay.encoders:
+                return False
+            self.relays = {url: r for url, r in self.relays.items() if r is not relay}
+            return True
+
+    def _discard(self, url: str, relay: FeedRelay):
+        with self._lock:
+            if self.relays.get(url) is relay:
+                del self.relays[url]
+
+    def unsubscribe(self, viewer: Viewer):
+        """Remove a viewer, the relay is closed when it has had no viewers for ``idle_timeout`` seconds."""
+        with self._lock:
+            relays = [relay for relay in self.relays.values() if viewer.encoder in relay.encoders.values()]
+        for relay in relays:
+            relay.remove_viewer(viewer)
+        # the stream of a closed relay has already ended
+        viewer.encoder.remove_viewer(viewer)
+
+    async def stream(self, url: str, request: Optional[Request] = None, **options) -> AsyncIterator[bytes]:
+        """Yield the frames of a relayed feed as parts of a multipart MJPEG response, see ``StreamHub.stream``."""
+        viewer = self.subscribe(url, **options)
+        async for frame in _stream_viewer(viewer, request, self.unsubscribe):
+            yield frame
+
+    def stop(self, timeout: Optional[float] = None):
+        """Close all feeds."""
+        with self._lock:
+            relays = list(self.relays.values())
+        for relay in relays:
+            relay.stop(timeout)
+
+
+mjpeg_streams = StreamHub()
+feed_relays = FeedRelayHub(idle_timeout=FEED_IDLE_TIMEOUT)
@@ -0,0 +1,48 @@
+"""Count SQL statements per API request or task, to find code that issues more queries than needed."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCount:
+    """Number of SQL statements executed within a ``count_queries`` context."""
+
+    def __init__(self):
+        """Start counting at zero."""
+        self.count = 0
+
+
+# counter of the current request or task. The counter object itself is mutated, so that statements executed in
+# threads started from the request (e.g. synchronous end points and dependencies) are counted too.
+_query_count: ContextVar[Optional[QueryCount]] = ContextVar("query_count", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    query_count = _query_count.get()
+    if query_count is not None:
+        query_count.count += 1
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """Count the SQL statements executed within the context, on any engine.
+
+    Examples
+    --------
+    >>> with count_queries() as query_count:
+    ...     crud.video.get(db, id=1)
+    >>> query_count.count
+    1
+
+    """
+    query_count = QueryCount()
+    token = _query_count.set(query_count)
+    try:
+        yield query_count
+    finally:
+        _query_count.reset(token)
@@ -3,8 +3,9 @@
 import itertools
 import logging
 from datetime import datetime
-from typing import Optional, Union
+from typing import List, Optional, Union
 
+from celery import group
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
@@ -85,6 +86,72 @@ async def process_video(
     return video
 
 
+async def process_videos(
+    session: Session,
+    videos: List[VideoResponse],
+    logger: logging.Logger = logging.getLogger(__name__),
+    shutdown_after_task: bool = False,
+    priority: int = 0,
+) -> List[VideoPatch]:
+    """Submit several videos for execution at once as one Celery group.
+
+    Videos that are not ready to run are logged and skipped. Statuses of all submitted videos are updated in one
+    transaction.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.Session
+        The database session used to update the videos in the database.
+    videos : list of VideoResponse
+        The videos to be processed.
+    logger : logging.Logger
+        Logger instance.
+    shutdown_after_task : bool, optional
+        if set True, hard-shutdown the device after the task is processed. Requires sudo rights without password.
+    priority : int, optional
+        The lower the priority number, the higher the priority of the task.
+        Used to set Celery task priority if supported.
+
+    Raises
+    ------
+    HTTPException
+        Raised if the videos cannot be submitted.
+
+    Returns
+    -------
+    list of VideoPatch
+        Updated video objects reflecting status changes after successful submission.
+
+    """
+    video_ids = []
+    for video in videos:
+        ready_to_run, msg = video.ready_to_run
+        if ready_to_run:
+            video_ids.append(video.id)
+        else:
+            logger.error(f"Video {video.file} cannot be processed: {msg}")
+    if len(video_ids) == 0:
+        return []
+    logger.info(f"Submitting {len(video_ids)} videos to Celery queue.")
+    try:
+        group(
+            celery_app.signature(
+                "orc_api.tasks.run_video",
+                args=(video_id, shutdown_after_task),
+                priority=priority if priority < 10 else 5,  # Map to Celery priority range
+            )
+            for video_id in video_ids
+        ).apply_async()
+    except Exception as e:
+        logger.error(f"Failed to submit {len(video_ids)} videos for processing: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to process the video submission for processing.")
+    # the tasks are now successfully submitted, update status to queue
+    query = session.query(Video).filter(Video.id.in_(video_ids))
+    query.update({Video.status: VideoStatus.QUEUE}, synchronize_session=False)
+    session.commit()
+    return [VideoPatch.model_validate(rec) for rec in query.all()]
+
+
 async def sync_video(
     session: Session,
     video: VideoResponse,
@@ -208,3 +275,24 @@ async def sync_videos_list(
             )
 
     return videos
+
+
+async def sync_time_series(
+    site: Optional[int] = None,
+    start: Optional[datetime] = None,
+    stop: Optional[datetime] = None,
+    logger: logging.Logger = logging.getLogger(__name__),
+):
+    """Submit all unsynced time series between start and stop for batched synchronization using Celery."""
+    if not site:
+        logger.warning("No site ID provided for time series synchronization. Cannot synchronize.")
+        return
+    try:
+        celery_app.send_task(
+            "orc_api.tasks.sync_time_series",
+            args=(site, start.isoformat() if start else None, stop.isoformat() if stop else None),
+        )
+        logger.info(f"Time series submitted to Celery queue for synchronization to site {site}.")
+    except Exception as e:
+        logger.error(f"Failed to submit time series for synchronization: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to submit time series for synchronization.")
@@ -0,0 +1,179 @@
+"""Concurrent synchronization of batches of videos with LiveORC."""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import redis
+from sqlalchemy.orm import Session
+
+from orc_api import SYNC_RATE_LIMIT, SYNC_WORKERS, crud
+from orc_api import db as models
+from orc_api.schemas.video_config import get_video_config_response
+
+
+class RateLimiter:
+    """Limit the rate of operations (e.g. uploads to a site) over all threads of a process with a token bucket.
+
+    Parameters
+    ----------
+    rate : float
+        maximum number of operations per second, 0 means no limit
+    burst : int, optional
+        number of operations that may start at once after a quiet period (default 1)
+
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Initialize the rate limiter with a full bucket."""
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until an operation may start."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# one rate limiter per remote site, shared by all batches running in this process
+_rate_limiters: Dict[int, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(site: int, rate: float = SYNC_RATE_LIMIT) -> RateLimiter:
+    """Get the rate limiter of a remote site."""
+    with _rate_limiters_lock:
+        if site not in _rate_limiters or _rate_limiters[site].rate != rate:
+            _rate_limiters[site] = RateLimiter(rate)
+        return _rate_limiters[site]
+
+
+def publish_sync_progress(
+    client: redis.Redis, site: int, total: int, done: int, failed: int, channel: str = "video_sync_progress"
+):
+    """Publish progress of a batch sync to Redis for websocket consumers.
+
+    Progress is published on its own channel, as its messages do not have the shape of the status messages of single
+    videos on the "video_sync_status" channel.
+    """
+    payload = {"batch": True, "site": site, "total": total, "done": done, "failed": failed}
+    try:
+        client.publish(channel, json.dumps(payload))
+    except Exception:
+        # Progress publishing should not block syncing.
+        logging.getLogger(__name__).debug("Failed to publish sync progress to Redis.", exc_info=True)
+
+
+def sync_video_configs(
+    session: Session, video_ids: List[int], site: int, logger: logging.Logger = logging.getLogger(__name__)
+) -> List[int]:
+    """Sync the video configs of a batch of videos once, before the videos themselves are synced.
+
+    Video configs, and their camera configs, recipes and cross sections, are often shared by many videos. Syncing
+    them here once avoids that each video of the batch pushes them again. Video configs are read again one by one,
+    so that dependencies already synced with an earlier video config are skipped.
+
+    Returns
+    -------
+    list of int
+        ids of video configs that could not be synced
+
+    """
+    vc_ids = (
+        session.query(models.Video.video_config_id)
+        .filter(models.Video.id.in_(video_ids), models.Video.video_config_id.isnot(None))
+        .distinct()
+        .all()
+    )
+    failed = []
+    for (vc_id,) in sorted(vc_ids):
+        vc = crud.video_config.get(session, id=vc_id)
+        if vc is None or vc.sync_status == models.SyncStatus.SYNCED:
+            continue
+        try:
+            logger.debug(f"Syncing video configuration {vc_id} to remote site {site}.")
+            get_video_config_response(vc).sync_remote(session=session, site=site)
+        except Exception as e:
+            logger.error(f"Could not sync video configuration {vc_id} to remote site {site}: {e}")
+            session.rollback()
+            failed.append(vc_id)
+    return failed
+
+
+def sync_videos_concurrently(
+    video_ids: List[int],
+    site: int,
+    sync_video: Callable[[int], dict],
+    max_workers: int = SYNC_WORKERS,
+    rate: Optional[float] = None,
+    logger: logging.Logger = logging.getLogger(__name__),
+) -> List[dict]:
+    """Sync videos in a bounded pool of threads, limiting the rate at which syncs to the site start.
+
+    Parameters
+    ----------
+    video_ids : list of int
+        ids of videos to sync
+    site : int
+        remote site ID
+    sync_video : callable
+        syncs a single video by id, returning a dict with at least "status" ("ok" or "error")
+    max_workers : int, optional
+        maximum number of videos synced at the same time
+    rate : float, optional
+        maximum number of video syncs started per second on the site, defaults to ORC_SYNC_RATE_LIMIT
+    logger : logging.Logger, optional
+        logger instance
+
+    Returns
+    -------
+    list of dict
+        results of ``sync_video``, in the order of ``video_ids``
+
+    """
+    limiter = get_rate_limiter(site) if rate is None else get_rate_limiter(site, rate)
+    total = len(video_ids)
+    results: Dict[int, dict] = {}
+    failed = 0
+
+    def _sync(video_id):
+        limiter.acquire()
+        return sync_video(video_id)
+
+    # one client for all progress messages of the batch
+    client = redis.from_url(os.getenv("ORC_CELERY_BROKER_URL", "redis://localhost:6379/0"))
+    try:
+        publish_sync_progress(client, site, total=total, done=0, failed=0)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(_sync, video_id): video_id for video_id in video_ids}
+            for future in as_completed(futures):
+                video_id = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"status": "error", "video_id": video_id, "message": str(e)}
+                results[video_id] = result
+                if result.get("status") != "ok":
+                    failed += 1
+                publish_sync_progress(client, site, total=total, done=len(results), failed=failed)
+    finally:
+        client.close()
+    logger.info(f"Synced {total - failed} of {total} videos to site {site}, {failed} failed.")
+    return [results[video_id] for video_id in video_ids]
@@ -0,0 +1,157 @@
+"""Creation of video thumbnails in a background worker.
+
+Decoding a video frame takes long compared to a database transaction. Videos with a new file are therefore queued when
+their transaction is committed, and a worker thread of the process decodes the first frame once, writes thumbnails of
+all sizes and the frame index of the video, and marks the thumbnails of the video as created or failed.
+"""
+
+import os
+import queue
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from orc_api import UPLOAD_DIRECTORY
+from orc_api.db.video import ThumbnailStatus, Video
+from orc_api.log import logger
+from orc_api.utils import frames, image
+
+# maximum (width, height) of thumbnails by name: a small thumbnail for video lists and a preview for video details
+THUMBNAIL_SIZES: Dict[str, Tuple[int, int]] = {
+    "thumb": (50, 50),
+    "preview": (640, 640),
+}
+
+
+def get_thumbnail_file(file: str, size: str = "thumb") -> str:
+    """Get file name of a thumbnail of a video file, relative to the same base path as the video file."""
+    return f"{os.path.splitext(file)[0]}_{size}.jpg"
+
+
+def create_video_thumbnails(file: str, base_path: str = UPLOAD_DIRECTORY) -> str:
+    """Write thumbnails of all sizes of a video file and return the file name of the smallest thumbnail.
+
+    Parameters
+    ----------
+    file : str
+        file name of the video, relative to ``base_path``
+    base_path : str, optional
+        path where video and thumbnail files are stored
+
+    Returns
+    -------
+    str
+        file name of the "thumb" thumbnail, relative to ``base_path``
+
+    """
+    thumbnails = image.create_thumbnails(os.path.join(base_path, file), THUMBNAIL_SIZES)
+    for size, img in thumbnails.items():
+        img.save(os.path.join(base_path, get_thumbnail_file(file, size)), "JPEG")
+    return get_thumbnail_file(file)
+
+
+class ThumbnailWorker:
+    """Create thumbnails of queued videos in a daemon thread, one video at a time."""
+
+    def __init__(self, base_path: str = UPLOAD_DIRECTORY):
+        """Initialize the worker, the thread is started when videos are submitted."""
+        self.base_path = base_path
+        self.queue = queue.Queue()
+        self.queued = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, engine: Engine, video_id: int, file: str) -> bool:
+        """Queue a video for creation of thumbnails, returns False if it is already queued."""
+        with self._lock:
+            if video_id in self.queued:
+                return False
+            self.queued.add(video_id)
+            self.queue.put((engine, video_id, file))
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name="thumbnail-worker", daemon=True)
+                self._thread.start()
+        return True
+
+    def process(self, engine: Engine, video_id: int, file: str) -> ThumbnailStatus:
+        """Create thumbnails and the frame index of one video and store the result in its record."""
+        values = {"thumbnail_status": ThumbnailStatus.DONE}
+        try:
+            values["thumbnail"] = create_video_thumbnails(file, base_path=self.base_path)
+        except Exception as e:
+            logger.warning(f"Could not create thumbnails of video {video_id} - {file}: {e}")
+            values["thumbnail_status"] = ThumbnailStatus.FAILED
+        try:
+            # the frame index is stored next to the video, for fast retrieval of single frames later on
+            frames.write_frame_index(os.path.join(self.base_path, file))
+        except Exception as e:
+            logger.warning(f"Could not create frame index of video {video_id} - {file}: {e}")
+        # a short transaction without ORM events, the file of the video may have changed in the meantime
+        with engine.begin() as conn:
+            conn.execute(update(Video).where(Video.id == video_id, Video.file == file).values(values))
+        return values["thumbnail_status"]
+
+    def run(self):
+        """Create thumbnails of queued videos until stopped."""
+        while not self._stop.is_set():
+            try:
+                # wake up regularly to check if the worker is stopped
+                engine, video_id, file = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self.process(engine, video_id, file)
+            except Exception as e:
+                logger.error(f"Could not store thumbnails of video {video_id}: {e}", exc_info=True)
+            finally:
+                with self._lock:
+                    self.queued.discard(video_id)
+                self.queue.task_done()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued videos are processed, returns False if they are not processed within ``timeout`` s."""
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(lambda: self.queue.unfinished_tasks == 0, timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker thread, queued videos keep their pending state and are queued again when the API starts."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+thumbnail_worker = ThumbnailWorker()
+
+
+def restore_pending_thumbnails(db: Session) -> int:
+    """Queue videos of which thumbnails are still pending, e.g. because the process that added them stopped first.
+
+    Parameters
+    ----------
+    db : Session
+        database session
+
+    Returns
+    -------
+    int
+        number of queued videos
+
+    """
+    videos = (
+        db.query(Video.id, Video.file)
+        .filter(Video.thumbnail_status == ThumbnailStatus.PENDING, Video.file.isnot(None), Video.thumbnail.is_(None))
+        .all()
+    )
+    n = 0
+    for video_id, file in videos:
+        # only if we are 100% sure the video file exists, thumbnails are created
+        if os.path.exists(os.path.join(thumbnail_worker.base_path, file)):
+            n += thumbnail_worker.submit(db.get_bind(), video_id, file)
+    if n:
+        logger.info(f"Queued {n} videos with pending thumbnails.")
+    return n
@@ -0,0 +1,175 @@
+"""Streaming export of time series to CSV, Parquet, Arrow and NetCDF files."""
+
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Sequence
+
+import numpy as np
+import xarray as xr
+from sqlalchemy import DateTime, Float, Integer
+
+from orc_api import db as models
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
+
+# all columns of time series that can be exported, in order of the table
+EXPORT_COLUMNS = [column.key for column in models.TimeSeries.__table__.columns]
+
+# media type and file extension per export format
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "netcdf": ("application/x-netcdf", "nc"),
+}
+
+
+def _chunks(rows: Iterable[Sequence], chunk_size: int) -> Iterator[List[Sequence]]:
+    """Group rows in lists of at most ``chunk_size`` rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _to_value(value):
+    """Convert a database value to a value that can be written to a text or Arrow column."""
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def _column_type(column: str) -> str:
+    """Get the kind of values of a time series column: "datetime", "float", "int" or "str"."""
+    column_type = models.TimeSeries.__table__.columns[column].type
+    if isinstance(column_type, DateTime):
+        return "datetime"
+    if isinstance(column_type, Float):
+        return "float"
+    if isinstance(column_type, Integer):
+        return "int"
+    # Enum, JSON and String columns are exported as text
+    return "str"
+
+
+def iter_csv(rows: Iterable[Sequence], columns: List[str], chunk_size: int = 1000) -> Iterator[bytes]:
+    """Write rows to CSV, yielding the encoded text of each chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows([[_to_value(value) for value in row] for row in chunk])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # header only
+        yield buffer.getvalue().encode()
+
+
+def get_arrow_schema(columns: List[str]):
+    """Get the Arrow schema of the selected time series columns."""
+    arrow_types = {"datetime": pa.timestamp("us"), "float": pa.float64(), "int": pa.int64(), "str": pa.string()}
+    return pa.schema([(column, arrow_types[_column_type(column)]) for column in columns])
+
+
+def _record_batches(rows: Iterable[Sequence], columns: List[str], chunk_size: int):
+    schema = get_arrow_schema(columns)
+    for chunk in _chunks(rows, chunk_size):
+        arrays = [[_to_value(value) for value in values] for values in zip(*chunk)]
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(arrays, schema)], schema=schema
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Writable file that keeps written bytes until they are taken, to stream files written by pyarrow."""
+
+    def __init__(self):
+        """Initialize an empty sink."""
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self) -> bytes:
+        """Return and remove all bytes written so far."""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_parquet(rows: Iterable[Sequence], columns: List[str], chunk_size: int = 10000) -> Iterator[bytes]:
+    """Write rows to a Parquet file with one row group per chunk, yielding the bytes written per chunk."""
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, get_arrow_schema(columns)) as writer:
+        for batch in _record_batches(rows, columns, chunk_size):
+            writer.write_batch(batch)
+            yield sink.take()
+    # footer
+    yield sink.take()
+
+
+def iter_arrow(rows: Iterable[Sequence], columns: List[str], chunk_size: int = 10000) -> Iterator[bytes]:
+    """Write rows to an Arrow IPC stream with one record batch per chunk, yielding the bytes written per chunk."""
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, get_arrow_schema(columns)) as writer:
+        for batch in _record_batches(rows, columns, chunk_size):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def to_netcdf(rows: Iterable[Sequence], columns: List[str]) -> bytes:
+    """Write rows to a NetCDF file.
+
+    NetCDF files cannot be written incrementally through xarray, so the selected columns are collected in numpy
+    arrays first. These are much smaller than ORM records or data frames of all columns.
+    """
+    values = {column: [] for column in columns}
+    for row in rows:
+        for column, value in zip(columns, row):
+            values[column].append(_to_value(value))
+    data_vars = {}
+    for column in columns:
+        column_type = _column_type(column)
+        if column_type == "datetime":
+            array = np.array(
+                [np.datetime64(v) if isinstance(v, datetime) else np.datetime64("NaT") for v in values[column]],
+                dtype="datetime64[us]",
+            )
+        elif column_type in ["float", "int"]:
+            # missing integers (e.g. remote ids) are stored as NaN
+            array = np.array([np.nan if v is None else v for v in values[column]], dtype=float)
+        else:
+            array = np.array(["" if v is None else v for v in values[column]], dtype=str)
+        data_vars[column] = ("index", array)
+    ds = xr.Dataset(data_vars)
+    if "timestamp" in columns:
+        ds = ds.swap_dims({"index": "timestamp"})
+    # scipy writes NetCDF3 files in memory without further dependencies
+    return bytes(ds.to_netcdf(engine="scipy"))
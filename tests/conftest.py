@@ -11,6 +11,7 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from orc_api import db
+from orc_api.schemas.callback_url import invalidate_callback_url_cache
 
 
 @pytest.fixture
@@ -73,15 +74,24 @@ def cross_section(cross_section_file, cam_config):
     #     return json.load(f)
 
 
+# database server to run database tests against, e.g. postgresql://postgres@localhost/orc_test
+TEST_DATABASE_URL = os.getenv("ORC_TEST_DATABASE_URL")
+
+
 @pytest.fixture
 def session_empty(tmpdir):
-    db_path = ":memory:"  # ?cache=shared"
-    # Create an in-memory SQLite database for testing; adjust connection string for other databases
-    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    if TEST_DATABASE_URL:
+        engine = create_engine(TEST_DATABASE_URL)
+    else:
+        db_path = ":memory:"  # ?cache=shared"
+        # Create an in-memory SQLite database for testing
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, poolclass=StaticPool)
     # Create all tables from metadata (assumes models use SQLAlchemy Base)
     db.Base.metadata.create_all(engine)
     Session = scoped_session(sessionmaker(bind=engine))
     session = Session()
+    # do not reuse a callback url of a database of an earlier test
+    invalidate_callback_url_cache()
     try:
         yield session
     finally:
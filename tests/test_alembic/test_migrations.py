@@ -26,9 +26,9 @@ def sqlite_file_db(tmp_path):
 
 @pytest.fixture
 def mock_sqlite_engine(sqlite_file_db):
-    """Mock `orc_api.db.sqlite_engine` to use our test database."""
+    """Mock `orc_api.db.database_url` to use our test database."""
     _, db_path = sqlite_file_db
-    with patch("orc_api.db.sqlite_engine", f"sqlite:///{db_path}"):
+    with patch("orc_api.db.database_url", f"sqlite:///{db_path}"):
         yield db_path
 
 
@@ -60,3 +60,16 @@ def test_alembic_migrations(sqlite_file_db, mock_sqlite_engine):
 
     # Assert that migrations ran without any exception
     assert True, "Alembic migrations applied successfully."
+
+
+@pytest.mark.skipif(not os.getenv("ORC_TEST_DATABASE_URL"), reason="no database server set in ORC_TEST_DATABASE_URL")
+def test_alembic_migrations_database_server():
+    """Test that Alembic migrations run up to head, down to base and up again on a database server."""
+    orc_path = os.path.split(orc_api.__file__)[0]
+    alembic_cfg = Config(os.path.join(orc_path, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(orc_path, "alembic"))
+    alembic_cfg.set_main_option("sqlalchemy.url", os.getenv("ORC_TEST_DATABASE_URL"))
+    command.upgrade(alembic_cfg, "head")
+    command.downgrade(alembic_cfg, "base")
+    command.upgrade(alembic_cfg, "head")
+    command.downgrade(alembic_cfg, "base")
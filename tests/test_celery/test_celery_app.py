@@ -4,7 +4,8 @@ from unittest.mock import MagicMock
 
 import pytest
 
-from orc_api.celery_app import celery_app, configure_beat_schedule
+from orc_api import INCOMING_RESCAN_INTERVAL
+from orc_api.celery_app import _start_incoming_watcher, celery_app, configure_beat_schedule
 
 
 @pytest.fixture
@@ -25,6 +26,7 @@ def test_task_routes_are_configured_per_workload():
     assert routes["orc_api.tasks.sync_videos_batch"]["queue"] == "sync"
     assert routes["orc_api.tasks.run_water_level_job"]["queue"] == "periodic"
     assert routes["orc_api.tasks.run_disk_maintenance_job"]["queue"] == "periodic"
+    assert routes["orc_api.tasks.ingest_videos"]["queue"] == "periodic"
 
 
 def test_configure_beat_schedule_supports_service_sender(mocker, session_context):
@@ -42,6 +44,7 @@ def test_configure_beat_schedule_supports_service_sender(mocker, session_context
         ),
     )
 
+    start_watcher = mocker.patch("orc_api.celery_app._start_incoming_watcher")
     app_mock = MagicMock()
     sender = SimpleNamespace(app=app_mock)
 
@@ -50,3 +53,23 @@ def test_configure_beat_schedule_supports_service_sender(mocker, session_context
     beat_schedule = app_mock.conf.beat_schedule
     assert beat_schedule["run-water-level-job"]["options"]["queue"] == "periodic"
     assert beat_schedule["run-disk-maintenance-job"]["options"]["queue"] == "periodic"
+    # new videos are submitted by the watcher, the folder is only scanned to catch missed files
+    assert beat_schedule["video_check_job"]["schedule"] == INCOMING_RESCAN_INTERVAL
+    start_watcher.assert_called_once_with(app_mock, beat_schedule["video_check_job"])
+
+
+def test_start_incoming_watcher(mocker, tmpdir):
+    watcher_cls = mocker.patch("orc_api.celery_app.IncomingWatcher")
+    app_mock = MagicMock()
+    entry = {"args": (str(tmpdir), {"video_file_fmt": "video_{unix}.mp4"}, 0.0)}
+
+    _start_incoming_watcher(app_mock, entry)
+
+    watcher_cls.return_value.start.assert_called_once_with()
+    assert watcher_cls.call_args.kwargs["suffix"] == "mp4"
+    # completed files are sent to the ingestion task
+    submit = watcher_cls.call_args.kwargs["callback"]
+    submit(["video_1.mp4"])
+    app_mock.send_task.assert_called_once_with(
+        "orc_api.tasks.ingest_videos", args=(["video_1.mp4"], entry["args"][1]), queue="periodic"
+    )
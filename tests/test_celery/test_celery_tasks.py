@@ -1,13 +1,18 @@
+from datetime import datetime
 from unittest.mock import MagicMock
 
+from orc_api import INCOMING_STABLE_WINDOW
 from orc_api.celery_tasks import (
     check_new_videos,
+    ingest_videos,
     run_disk_maintenance_job,
     run_video,
     run_water_level_job,
+    sync_time_series_task,
     sync_video_task,
     sync_videos_batch,
 )
+from orc_api.utils import disk_management
 
 
 def _mock_context_session(db_mock: MagicMock) -> MagicMock:
@@ -111,6 +116,18 @@ def test_check_new_videos_exception_path(mocker):
     assert "Error checking for new videos" in result["message"]
 
 
+def test_ingest_videos_try_path(mocker):
+    settings = MagicMock()
+    mocker.patch("orc_api.celery_tasks.SettingsResponse.model_validate", return_value=settings)
+    wrapper = mocker.patch("orc_api.celery_tasks.async_job_wrapper", return_value=None)
+
+    result = ingest_videos(file_paths=["/incoming/video_1.mp4"], settings_dict={"x": 1})
+
+    assert result == {"status": "ok"}
+    wrapper.assert_called_once()
+    assert wrapper.call_args.args[1]["file_paths"] == ["/incoming/video_1.mp4"]
+
+
 def test_run_video_try_path(mocker):
     db = MagicMock()
     db.get.return_value = MagicMock()
@@ -194,13 +211,17 @@ def test_sync_video_task_exception_path(mocker):
 
 
 def test_sync_videos_batch_delegates_per_video(mocker):
+    results = {
+        1: {"status": "ok", "video_id": 1, "site": 3},
+        2: {"status": "error", "video_id": 2, "message": "Error syncing video 2: mocked failure"},
+    }
+    # videos are synced concurrently, so results are returned per video instead of in order of calls
     sync_task = mocker.patch(
-        "orc_api.celery_tasks.sync_video_task",
-        side_effect=[
-            {"status": "ok", "video_id": 1, "site": 3},
-            {"status": "error", "video_id": 2, "message": "Error syncing video 2: mocked failure"},
-        ],
+        "orc_api.celery_tasks.sync_video_task", side_effect=lambda video_id, **kwargs: results[video_id]
     )
+    mocker.patch("orc_api.celery_tasks.get_session", return_value=_mock_context_session(MagicMock()))
+    sync_video_configs = mocker.patch("orc_api.celery_tasks.sync_executor.sync_video_configs", return_value=[])
+    mocker.patch("orc_api.utils.sync_executor.publish_sync_progress")
 
     result = sync_videos_batch(video_ids=[1, 2], site=3, sync_file=True, sync_image=False)
 
@@ -213,3 +234,53 @@ def test_sync_videos_batch_delegates_per_video(mocker):
         ],
     }
     assert sync_task.call_count == 2
+    sync_video_configs.assert_called_once()
+
+
+def test_sync_videos_batch_failed_video_config(mocker):
+    db = MagicMock()
+    db.query.return_value.filter.return_value.with_entities.return_value.all.return_value = [(2, 7)]
+    mocker.patch("orc_api.celery_tasks.get_session", return_value=_mock_context_session(db))
+    mocker.patch("orc_api.celery_tasks.sync_executor.sync_video_configs", return_value=[7])
+    mocker.patch("orc_api.utils.sync_executor.publish_sync_progress")
+    sync_task = mocker.patch("orc_api.celery_tasks.sync_video_task", return_value={"status": "ok", "video_id": 1})
+
+    result = sync_videos_batch(video_ids=[1, 2], site=3, sync_file=True, sync_image=False)
+
+    # the video with a video config that could not be synced is skipped and marked as failed
+    sync_task.assert_called_once_with(video_id=1, site=3, sync_file=True, sync_image=False)
+    assert result["results"][1] == {
+        "status": "error",
+        "video_id": 2,
+        "message": "Video configuration 7 could not be synced",
+    }
+    db.query.return_value.filter.return_value.update.assert_called_once()
+
+
+def test_sync_time_series_task(mocker):
+    db = MagicMock()
+    mocker.patch("orc_api.celery_tasks.get_session", return_value=_mock_context_session(db))
+    sync_batch = mocker.patch("orc_api.celery_tasks.sync_time_series_batch", return_value={"synced": 10, "failed": 0})
+
+    result = sync_time_series_task(site=1, start="2024-01-01T00:00:00")
+
+    assert result == {"status": "ok", "site": 1, "synced": 10, "failed": 0}
+    assert sync_batch.call_args.kwargs["start"] == datetime(2024, 1, 1)
+    assert sync_batch.call_args.kwargs["stop"] is None
+
+
+def test_check_new_videos_follow_up(mocker):
+    mocker.patch("orc_api.celery_tasks.SettingsResponse.model_validate", return_value=MagicMock())
+    mocker.patch("orc_api.celery_tasks.async_job_wrapper", return_value=["/incoming/video_1.mp4"])
+    mocker.patch("orc_api.celery_tasks.INCOMING_WATCHER", "auto")
+    mocker.patch("orc_api.celery_tasks.file_claims", disk_management.FileClaims())
+    apply_async = mocker.patch("orc_api.celery_tasks.check_new_videos.apply_async")
+
+    # files that are not yet stable are checked again after the stability window, instead of the next full scan
+    assert check_new_videos(path_incoming="/incoming", settings_dict={"x": 1}, start_time=1.2) == {"status": "ok"}
+    apply_async.assert_called_once()
+    assert apply_async.call_args.kwargs["args"] == ("/incoming", {"x": 1}, 1.2)
+    assert apply_async.call_args.kwargs["countdown"] == INCOMING_STABLE_WINDOW
+    # only one follow-up is scheduled at a time
+    check_new_videos(path_incoming="/incoming", settings_dict={"x": 1}, start_time=1.2)
+    apply_async.assert_called_once()
@@ -4,9 +4,14 @@ import subprocess
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import cv2
+import numpy as np
+
+from orc_api import db
 from orc_api.cli import video as cli_video
 from orc_api.cli.service import delete_service, export_service, import_service
 from orc_api.schemas.service import ServiceExportData
+from orc_api.utils import thumbnails
 
 service_data = {
     "service_short_name": "test-service",
@@ -97,3 +102,22 @@ def test_import_list_delete_video(session_config, vid_file):
     assert result_list_after is not None
     assert result_list_after["status"] == "success"
     assert result_list_after["videos"] is None
+
+
+def test_add_video_thumbnails(session_config, tmpdir, monkeypatch):
+    upload_dir = str(tmpdir.mkdir("upload"))
+    monkeypatch.setattr("orc_api.crud.video.UPLOAD_DIRECTORY", upload_dir)
+    monkeypatch.setattr("orc_api.db.video.UPLOAD_DIRECTORY", upload_dir)
+    worker = thumbnails.ThumbnailWorker(base_path=upload_dir)
+    monkeypatch.setattr(thumbnails, "thumbnail_worker", worker)
+    file_path = str(tmpdir.join("video.mp4"))
+    out = cv2.VideoWriter(file_path, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (64, 48))
+    for _ in range(3):
+        out.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    out.release()
+    result = cli_video.add_video(db=session_config, file_path=file_path, timestamp="20240101T120000Z")
+    # thumbnails are created before the command exits, instead of staying pending
+    video = session_config.get(db.Video, result["video_id"])
+    assert video.thumbnail_status == db.ThumbnailStatus.DONE
+    assert os.path.isfile(os.path.join(upload_dir, video.thumbnail))
+    worker.stop(timeout=5)
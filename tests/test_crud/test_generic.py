@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from orc_api import crud
+from orc_api import db as models
+from orc_api.utils.query_count import count_queries
+
+
+@pytest.fixture
+def session_cross_sections(session_config):
+    session_config.add_all([models.CrossSection(name=f"cross section {n}", features={}) for n in range(3)])
+    session_config.commit()
+    # start without any loaded records
+    session_config.expire_all()
+    return session_config
+
+
+@pytest.mark.parametrize("update_returning", [True, False])
+def test_update(session_cross_sections, monkeypatch, update_returning):
+    # older SQLite versions do not support UPDATE ... RETURNING
+    monkeypatch.setattr(session_cross_sections.get_bind().dialect, "update_returning", update_returning)
+    with count_queries() as query_count:
+        cross_section = crud.generic.update(session_cross_sections, models.CrossSection, 2, {"name": "renamed"})
+    assert query_count.count == (1 if update_returning else 2)
+    assert cross_section.name == "renamed"
+    # the update is committed, and the onupdate stamp is set
+    assert cross_section.updated_at is not None
+    assert session_cross_sections.query(models.CrossSection).filter_by(name="renamed").one().id == 2
+    assert crud.generic.update(session_cross_sections, models.CrossSection, 99, {"name": "unknown"}) is None
+
+
+def test_delete_ids(session_cross_sections):
+    with count_queries() as query_count:
+        assert crud.generic.delete_ids(session_cross_sections, models.CrossSection, [1, 3, 99]) == 2
+    assert query_count.count == 1
+    assert [cross_section.id for cross_section in session_cross_sections.query(models.CrossSection).all()] == [2]
+    assert crud.generic.delete_ids(session_cross_sections, models.CrossSection, []) == 0
+
+
+def test_crud_single_queries(session_cross_sections):
+    with count_queries() as query_count:
+        cross_section = crud.cross_section.get(session_cross_sections, id=1)
+        # already loaded in the session
+        assert crud.cross_section.get(session_cross_sections, id=1) is cross_section
+        assert crud.cross_section.get(session_cross_sections, id=99) is None
+    assert query_count.count == 2
+    with count_queries() as query_count:
+        crud.cross_section.update(session_cross_sections, id=1, cross_section={"name": "renamed"})
+        crud.cross_section.delete(session_cross_sections, id=2)
+    assert query_count.count == 2
+    with pytest.raises(ValueError, match="does not exist"):
+        crud.cross_section.update(session_cross_sections, id=2, cross_section={"name": "deleted"})
+    with pytest.raises(ValueError, match="does not exist"):
+        crud.cross_section.delete(session_cross_sections, id=2)
+
+
+def test_delete_video_config_keeps_videos(session_config):
+    video_config = models.VideoConfig(name="config", rvec=[0, 0, 0], tvec=[0, 0, 0])
+    session_config.add(video_config)
+    session_config.commit()
+    video = models.Video(timestamp=datetime(2020, 1, 1), video_config_id=video_config.id)
+    session_config.add(video)
+    session_config.commit()
+    crud.video_config.delete(session_config, id=video_config.id)
+    # the foreign key of the database detaches the video
+    session_config.refresh(video)
+    assert video.video_config_id is None
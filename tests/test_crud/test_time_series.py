@@ -1,7 +1,12 @@
 from datetime import datetime, timedelta
 
+import numpy as np
+import pytest
+from sqlalchemy import event
+
 from orc_api.crud import time_series
-from orc_api.db import TimeSeries, WaterLevelSettings
+from orc_api.db import SyncStatus, TimeSeries, Video, VideoConfig, WaterLevelSettings
+from orc_api.schemas.time_series import TimeSeriesResponseWithVideoId
 
 
 def test_get_time_series_returns_closest_record(session_water_levels):
@@ -36,6 +41,31 @@ def test_get_time_series_within_allowed_dt(session_water_levels):
     assert abs(result.timestamp - target_time).total_seconds() < allowed_dt
 
 
+def test_get_closest_single_query(session_time_series_buckets):
+    session, _ = session_time_series_buckets
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(session.get_bind(), "before_cursor_execute", count_statements)
+    try:
+        # the record at 01:10 is linked to a video, so the closest free record is at 01:20
+        result = time_series.get_closest(session, datetime(2024, 1, 1, 1, 11), allowed_dt=900)
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", count_statements)
+    assert result.timestamp == datetime(2024, 1, 1, 1, 20)
+    assert len(statements) == 1
+    # the first record after the time stamp is found, also when it is later than the other records in the window
+    assert time_series.get_closest(session, datetime(2024, 1, 1, 0, 56)).timestamp == datetime(2024, 1, 1, 1)
+    # records are equally close, the one before is returned
+    assert time_series.get_closest(session, datetime(2024, 1, 1, 0, 5)).timestamp == datetime(2024, 1, 1)
+    assert time_series.get_closest(session, datetime(2024, 1, 1, 3), allowed_dt=6000).timestamp == datetime(
+        2024, 1, 1, 1, 30
+    )
+    assert time_series.get_closest(session, datetime(2024, 1, 1, 3), allowed_dt=600) is None
+
+
 def test_get_new_time_series_from_script(session_water_levels, monkeypatch):
     # there should not be any water level before 2000
     monkeypatch.setattr("orc_api.database.get_session", lambda: session_water_levels)
@@ -46,3 +76,103 @@ def test_get_new_time_series_from_script(session_water_levels, monkeypatch):
     # check if the data is available, a level at date 2000-01-01 should be available
     with_levels = session_water_levels.query(TimeSeries).filter(TimeSeries.timestamp == datetime(2000, 1, 1)).count()
     assert with_levels == 1
+
+
+def test_get_unsynced_update_remote_ids(session_water_levels):
+    records = session_water_levels.query(TimeSeries).order_by(TimeSeries.id).all()
+    records[0].sync_status = SyncStatus.SYNCED
+    records[1].sync_status = SyncStatus.FAILED
+    session_water_levels.commit()
+    # synced records are excluded, chunks continue after the last id of the previous chunk
+    chunk = time_series.get_query_unsynced(session_water_levels, count=3).all()
+    assert [ts.id for ts in chunk] == [r.id for r in records[1:4]]
+    chunk = time_series.get_query_unsynced(session_water_levels, after_id=chunk[-1].id, count=3).all()
+    assert [ts.id for ts in chunk] == [r.id for r in records[4:7]]
+    # remote ids of a chunk are stored at once
+    time_series.update_remote_ids(session_water_levels, {ts.id: ts.id + 100 for ts in chunk})
+    session_water_levels.expire_all()
+    for ts in chunk:
+        assert ts.remote_id == ts.id + 100
+        assert ts.sync_status == SyncStatus.SYNCED
+    time_series.update_sync_status(session_water_levels, [records[2].id], SyncStatus.FAILED)
+    session_water_levels.expire_all()
+    assert records[2].sync_status == SyncStatus.FAILED
+    assert time_series.get_query_unsynced(session_water_levels).count() == len(records) - 4
+
+
+@pytest.fixture
+def session_time_series_buckets(session_config):
+    # a record every 10 minutes, with a missing discharge in every third record
+    start = datetime(2024, 1, 1)
+    records = [
+        TimeSeries(timestamp=start + timedelta(minutes=10 * n), h=float(n), q_50=None if n % 3 == 0 else n * 2.0)
+        for n in range(10)
+    ]
+    session_config.add_all(records)
+    video_config = VideoConfig(name="aggregate")
+    session_config.add(video_config)
+    session_config.commit()
+    video = Video(timestamp=datetime(2023, 1, 1), video_config_id=video_config.id)
+    session_config.add(video)
+    session_config.commit()
+    video.time_series_id = records[7].id
+    session_config.commit()
+    return session_config, video_config.id
+
+
+def test_get_aggregates(session_time_series_buckets):
+    session, _ = session_time_series_buckets
+    quantiles = [0.05, 0.5, 0.95]
+    rows = time_series.get_aggregates(session, 3600, quantiles=quantiles)
+    assert [row.count for row in rows] == [6, 4]
+    # buckets are numbered by hours since 1970-01-01
+    assert rows[0].bucket == (datetime(2024, 1, 1) - datetime(1970, 1, 1)).total_seconds() // 3600
+    assert rows[1].bucket == rows[0].bucket + 1
+    for row, h in zip(rows, [np.arange(6.0), np.arange(6.0, 10.0)]):
+        q_50 = np.array([v * 2.0 for v in h if v % 3 != 0])
+        assert (row.h_min, row.h_mean, row.h_max) == (h.min(), h.mean(), h.max())
+        assert (row.q_50_min, row.q_50_mean, row.q_50_max) == (q_50.min(), q_50.mean(), q_50.max())
+        for i, q in enumerate(quantiles):
+            assert getattr(row, f"h_q{i}") == np.quantile(h, q, method="lower")
+            assert getattr(row, f"q_50_q{i}") == np.quantile(q_50, q, method="lower")
+
+
+def test_get_aggregates_video_config(session_time_series_buckets):
+    session, video_config_id = session_time_series_buckets
+    rows = time_series.get_aggregates(session, 3600, video_config_ids=[video_config_id])
+    assert [(row.count, row.h_max) for row in rows] == [(1, 7.0)]
+    # time series without video
+    rows = time_series.get_aggregates(session, 3600, video_config_ids=[0])
+    assert [row.count for row in rows] == [6, 3]
+
+
+def test_get_bucket_size(session_time_series_buckets):
+    session, _ = session_time_series_buckets
+    # the records span 90 minutes
+    bucket_size = time_series.get_bucket_size(session, max_points=4)
+    assert bucket_size == 1800
+    assert len(time_series.get_aggregates(session, bucket_size)) <= 4
+    assert time_series.get_bucket_size(session, max_points=4, stop=datetime(2024, 1, 1, 3)) == 3600
+    assert time_series.get_bucket_size(session, max_points=4, start=datetime(2025, 1, 1)) == 1
+
+
+def test_get_list_single_query(session_time_series_buckets):
+    session, video_config_id = session_time_series_buckets
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    session.expire_all()
+    event.listen(session.get_bind(), "before_cursor_execute", count_statements)
+    try:
+        records = time_series.get_list(session, video_config_ids=[video_config_id, 0], with_video_id=True)
+        video_ids = [TimeSeriesResponseWithVideoId.model_validate(ts).video_id for ts in records]
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", count_statements)
+    # filtering and video ids of all records are retrieved in one query
+    assert len(statements) == 1
+    assert len(records) == 10
+    assert len([video_id for video_id in video_ids if video_id is not None]) == 1
+    assert len(time_series.get_list(session, video_config_ids=[video_config_id])) == 1
+    assert len(time_series.get_list(session, video_config_ids=[0], count=3)) == 3
@@ -1,7 +1,14 @@
+import os
 from datetime import datetime, timedelta
 
+import cv2
+import numpy as np
+import pytest
+
 from orc_api import db
 from orc_api.crud import video as crud_video
+from orc_api.utils import file_reaper, thumbnails
+from orc_api.utils.query_count import count_queries
 
 
 def test_video_add(session_water_levels, vid_file, monkeypatch):
@@ -59,3 +66,71 @@ def test_video_add_water_level_post_video_large_timediff(session_video, monkeypa
     session_video.commit()
     session_video.refresh(ts_instance)
     assert ts_instance.video is None
+
+
+@pytest.mark.parametrize("delete_returning", [True, False])
+def test_video_delete_start_stop(session_config, tmpdir, monkeypatch, delete_returning):
+    # older SQLite versions do not support DELETE ... RETURNING
+    monkeypatch.setattr(session_config.get_bind().dialect, "delete_returning", delete_returning)
+    monkeypatch.setattr(crud_video, "UPLOAD_DIRECTORY", str(tmpdir))
+    reaper = file_reaper.FileReaper(batch_size=2)
+    monkeypatch.setattr(crud_video, "file_reaper", reaper)
+    timestamps = [datetime(2020, 1, 1) + timedelta(days=n) for n in range(4)]
+    for n, timestamp in enumerate(timestamps):
+        # only the log file is present, so that no thumbnail is made
+        video_dir = tmpdir.mkdir(str(n))
+        video_dir.join("log.txt").write("log")
+        session_config.add(db.Video(timestamp=timestamp, file=os.path.join(str(n), "video.mp4")))
+    session_config.commit()
+    with count_queries() as query_count:
+        n_deleted = crud_video.delete_start_stop(session_config, start=timestamps[1], stop=timestamps[3])
+    assert n_deleted == 2
+    assert query_count.count == (1 if delete_returning else 2)
+    assert [video.timestamp for video in session_config.query(db.Video).order_by(db.Video.timestamp)] == [
+        timestamps[0],
+        timestamps[3],
+    ]
+    # files are removed by the reaper in the background
+    assert reaper.progress()["submitted"] == 2
+    reaper.stop(timeout=5)
+    assert reaper.progress()["removed"] + reaper.progress()["pending"] == 2
+    while reaper.reap_batch():
+        pass
+    assert sorted(os.listdir(tmpdir)) == ["0", "3"]
+
+
+def test_video_create_from_file_stores_media(session_config, tmpdir, monkeypatch):
+    monkeypatch.setattr(crud_video, "UPLOAD_DIRECTORY", str(tmpdir.mkdir("upload")))
+    monkeypatch.setattr(thumbnails.thumbnail_worker, "submit", lambda *args: False)
+    file_path = str(tmpdir.join("video.mp4"))
+    out = cv2.VideoWriter(file_path, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (64, 48))
+    for _ in range(5):
+        out.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    out.release()
+    video = crud_video.create_from_file(session_config, file_path, timestamp=datetime(2020, 1, 1))
+    assert video.media["frame_count"] == 5
+    assert (video.media["height"], video.media["width"], video.media["fps"]) == (48, 64, 25.0)
+    # files that cannot be read as video are stored without metadata
+    tmpdir.join("broken.mp4").write("not a video")
+    video = crud_video.create_from_file(session_config, str(tmpdir.join("broken.mp4")), timestamp=datetime(2020, 1, 2))
+    assert video.media is None
+
+
+def test_video_create_from_files_skip_missing(session_config, tmpdir, monkeypatch):
+    monkeypatch.setattr(crud_video, "UPLOAD_DIRECTORY", str(tmpdir.mkdir("upload")))
+    monkeypatch.setattr(thumbnails.thumbnail_worker, "submit", lambda *args: False)
+    tmpdir.join("video_1.mp4").write("video")
+    files = [
+        (str(tmpdir.join("video_1.mp4")), datetime(2020, 1, 1)),
+        (str(tmpdir.join("gone.mp4")), datetime(2020, 1, 2)),
+    ]
+    # a file that disappeared (e.g. picked up by another task) fails the whole batch by default
+    with pytest.raises(FileNotFoundError):
+        crud_video.create_from_files(session_config, files)
+    assert os.path.isfile(files[0][0])
+    assert session_config.query(db.Video).count() == 0
+    # or is skipped without affecting the other files
+    videos = crud_video.create_from_files(session_config, files, skip_missing=True)
+    assert [v.timestamp for v in videos] == [datetime(2020, 1, 1)]
+    assert session_config.query(db.Video).count() == 1
+    assert not os.path.exists(files[0][0])
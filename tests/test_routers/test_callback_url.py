@@ -198,7 +198,8 @@ def test_get_set_refresh_tokens_success(session_config, mocker, monkeypatch, aut
     mock_response = mocker.MagicMock(spec=Response)
     mock_response.status_code = 200
     mock_response.json.return_value = {"access": "new_access_token", "refresh": "new_refresh_token"}
-    _ = mocker.patch("requests.post", return_value=mock_response)
+    http_session = mocker.patch("orc_api.schemas.callback_url.get_http_session")
+    http_session.return_value.post.return_value = mock_response
     # once token is stored refresh it!
     response = auth_client.get("/api/callback_url/refresh_tokens/")
     assert response.status_code == 200
@@ -1,6 +1,13 @@
 from datetime import datetime, timedelta
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import xarray as xr
 
 from orc_api import db as models
+from orc_api.utils import time_series_export
 
 # get the database connection from general configuration instances
 
@@ -77,3 +84,120 @@ def test_get_patch_post_time_series(auth_client, db_session):
     db_session.query(models.TimeSeries).delete()
     db_session.commit()
     db_session.flush()
+
+
+def test_time_series_query_count(auth_client, db_session):
+    db_session.add(models.TimeSeries(timestamp=datetime(1990, 1, 1), h=20.0))
+    db_session.commit()
+    id = db_session.query(models.TimeSeries.id).filter_by(timestamp=datetime(1990, 1, 1)).scalar()
+    r_get = auth_client.get(f"/api/time_series/{id}/")
+    r_patch = auth_client.patch(f"/api/time_series/{id}/", json={"h": 22.0})
+    assert r_patch.json()["h"] == 22.0
+    # the test database is created within each request, so only compare: the patch only adds the update statement
+    assert int(r_patch.headers["X-Query-Count"]) == int(r_get.headers["X-Query-Count"]) + 1
+
+
+def test_sync_time_series(auth_client, db_session, mocker):
+    sync_time_series = mocker.patch("orc_api.routers.time_series.queue.sync_time_series")
+    db_session.add(models.TimeSeries(timestamp=datetime(2001, 1, 1), h=20.0))
+    db_session.commit()
+    r = auth_client.post("/api/time_series/sync/", json={"site": 1, "start": "2001-01-01T00:00:00"})
+    assert r.status_code == 200
+    assert r.json() == {"site": 1, "count": 1}
+    sync_time_series.assert_called_once()
+    assert sync_time_series.call_args.kwargs["site"] == 1
+
+
+@pytest.fixture
+def time_series_records(db_session):
+    db_session.query(models.TimeSeries).delete()
+    db_session.add_all(
+        [
+            models.TimeSeries(timestamp=datetime(2024, 1, 1) + timedelta(hours=n), h=float(n), q_50=n * 2.0)
+            for n in range(5)
+        ]
+    )
+    db_session.commit()
+    yield
+    db_session.query(models.TimeSeries).delete()
+    db_session.commit()
+
+
+def test_download_time_series_csv(auth_client, time_series_records):
+    r = auth_client.post("/api/time_series/download/", params={"columns": ["timestamp", "h"]})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    lines = r.text.splitlines()
+    assert lines[0] == "timestamp,h"
+    assert len(lines) == 6
+    # last record first
+    assert lines[1] == "2024-01-01 04:00:00,4.0"
+    # all columns by default
+    r = auth_client.post("/api/time_series/download/", params={"count": 2})
+    assert r.text.splitlines()[0].split(",") == time_series_export.EXPORT_COLUMNS
+    assert len(r.text.splitlines()) == 3
+    # unknown columns
+    r = auth_client.post("/api/time_series/download/", params={"columns": ["timestamp", "level"]})
+    assert r.status_code == 400
+    # no records in selected period
+    r = auth_client.post("/api/time_series/download/", params={"start": "2025-01-01T00:00:00"})
+    assert r.status_code == 404
+
+
+def test_download_time_series_netcdf(auth_client, time_series_records):
+    r = auth_client.post(
+        "/api/time_series/download/", params={"format": "netcdf", "columns": ["timestamp", "h", "q_50", "sync_status"]}
+    )
+    assert r.status_code == 200
+    ds = xr.open_dataset(BytesIO(r.content), engine="scipy")
+    assert set(ds.data_vars) == {"h", "q_50", "sync_status"}
+    assert ds.h.values.tolist() == [4.0, 3.0, 2.0, 1.0, 0.0]
+    assert ds.sync_status.values[0] == "LOCAL"
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_download_time_series_arrow(auth_client, time_series_records, format):
+    r = auth_client.post("/api/time_series/download/", params={"format": format, "columns": ["timestamp", "q_50"]})
+    assert r.status_code == 200
+    if format == "parquet":
+        table = pq.read_table(BytesIO(r.content))
+    else:
+        table = pa.ipc.open_stream(r.content).read_all()
+    assert table.column_names == ["timestamp", "q_50"]
+    assert table.column("q_50").to_pylist() == [8.0, 6.0, 4.0, 2.0, 0.0]
+
+
+def test_download_time_series_arrow_chunks():
+    rows = [(datetime(2024, 1, 1) + timedelta(hours=i), float(i)) for i in range(5)]
+    # files are streamed in several record batches
+    content = b"".join(time_series_export.iter_parquet(iter(rows), ["timestamp", "q_50"], chunk_size=2))
+    parquet_file = pq.ParquetFile(BytesIO(content))
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.read().column("q_50").to_pylist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    content = b"".join(time_series_export.iter_arrow(iter(rows), ["timestamp", "q_50"], chunk_size=2))
+    assert len(list(pa.ipc.open_stream(content))) == 3
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_download_time_series_arrow_unavailable(auth_client, time_series_records, format, monkeypatch):
+    monkeypatch.setattr(time_series_export, "pyarrow_available", False)
+    r = auth_client.post("/api/time_series/download/", params={"format": format})
+    assert r.status_code == 400
+
+
+def test_get_aggregated_time_series(auth_client, time_series_records):
+    r = auth_client.get("/api/time_series/aggregate/", params={"bucket_size": 7200, "quantiles": [0.5]})
+    assert r.status_code == 200
+    buckets = r.json()
+    assert [b["timestamp"] for b in buckets] == ["2024-01-01T00:00:00", "2024-01-01T02:00:00", "2024-01-01T04:00:00"]
+    assert [b["count"] for b in buckets] == [2, 2, 1]
+    assert buckets[0]["h"] == {"min": 0.0, "mean": 0.5, "max": 1.0, "quantiles": {"0.5": 0.0}}
+    assert buckets[1]["q_50"]["max"] == 6.0
+    # at most max_points buckets
+    r = auth_client.get("/api/time_series/aggregate/", params={"max_points": 2})
+    assert len(r.json()) <= 2
+    assert sum(b["count"] for b in r.json()) == 5
+    # either a bucket size or maximum number of points is required
+    assert auth_client.get("/api/time_series/aggregate/").status_code == 400
+    r = auth_client.get("/api/time_series/aggregate/", params={"bucket_size": 60, "quantiles": [1.5]})
+    assert r.status_code == 400
@@ -122,13 +122,13 @@ def mock_subprocess_run():
 @pytest.fixture
 def mock_shutil_operations():
     with (
-        patch("shutil.copyfile") as mock_copyfile,
+        patch("orc_api.db.backup_database") as mock_backup_database,
         patch("shutil.copytree") as mock_copytree,
         patch("shutil.rmtree") as mock_rmtree,
         patch("orc_api.routers.updates.clear_directory") as mock_clear_directory,
         patch("orc_api.routers.updates.copy_directory_content") as mock_copy_directory_content,
     ):
-        yield mock_copyfile, mock_copytree, mock_rmtree, mock_clear_directory, mock_copy_directory_content
+        yield mock_backup_database, mock_copytree, mock_rmtree, mock_clear_directory, mock_copy_directory_content
 
 
 @pytest.fixture
@@ -175,7 +175,7 @@ async def test_do_update_success(
 ):
     # Mock success for all operations
     (
-        mock_shutil_copyfile,
+        mock_backup_database,
         mock_shutil_copytree,
         mock_shutil_rmtree,
         mock_clear_directory,
@@ -191,7 +191,7 @@ async def test_do_update_success(
     mock_modify_state_update_event.assert_awaited()
     mock_subprocess_run.assert_called()
     mock_migrate_dbase.assert_called_once()
-    mock_shutil_copyfile.assert_called()
+    mock_backup_database.assert_called()
     mock_shutil_copytree.assert_called()
     # mock_clear_directory.assert_called_once()
     # mock_copy_directory_content.assert_called_once()
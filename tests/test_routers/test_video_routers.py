@@ -102,13 +102,18 @@ def test_video_details_log_delete(auth_client, tmpdir, monkeypatch):
     # let's try to get a thumbnail, frame and play
     r = auth_client.get("/api/video/1/thumbnail/")
     assert r.status_code == 200
+    # previews are only made for thumbnails created from the video file
+    r = auth_client.get("/api/video/1/thumbnail/?size=preview")
+    assert r.status_code == 404
+    r = auth_client.get("/api/video/1/thumbnail/?size=poster")
+    assert r.status_code == 400
     r = auth_client.get("/api/video/1/image/")
     assert r.status_code == 200
     r = auth_client.get("/api/video/1/frame/0")
     assert r.status_code == 200
     # also check 404 on a too high frame
     r = auth_client.get("/api/video/1/frame/1000")
-    assert r.status_code == 500
+    assert r.status_code == 404
     # finally delete video, also check if log file is removed
     r = auth_client.delete("/api/video/1/")
     assert r.status_code == 204
@@ -169,6 +174,28 @@ def test_list_videos_with_time_range(auth_client):
     db_session.flush()
 
 
+def test_delete_videos_with_time_range(auth_client, mocker):
+    db_session = next(get_db_override())
+    submit = mocker.patch("orc_api.crud.video.file_reaper.submit")
+    now = datetime.now()
+    videos = [models.Video(timestamp=now + timedelta(hours=i), file=f"videos/{i}/video.mp4") for i in range(3)]
+    db_session.add_all(videos)
+    db_session.commit()
+
+    response = auth_client.post(
+        "/api/video/delete/", json={"start": now.isoformat(), "stop": (now + timedelta(hours=1)).isoformat()}
+    )
+    assert response.status_code == 204
+    assert db_session.query(models.Video).count() == 2
+    # the directory of the deleted video is removed in the background
+    assert [os.path.basename(path) for path in submit.call_args.args[0]] == ["0"]
+    response = auth_client.get("/api/video/delete/progress/")
+    assert response.status_code == 200
+    assert set(response.json()) == {"submitted", "removed", "failed", "pending"}
+    db_session.query(models.Video).delete()
+    db_session.commit()
+
+
 def test_list_videos_with_status(auth_client):
     db_session = next(get_db_override())
     video1 = models.Video(timestamp=datetime.now(), status=models.video.VideoStatus.NEW)  # code 1
@@ -199,6 +226,65 @@ def test_list_videos_with_pagination(auth_client):
     db_session.flush()
 
 
+def test_list_videos_with_cursor(auth_client):
+    db_session = next(get_db_override())
+    now = datetime.now()
+    # two videos share a timestamp, so that paging must fall back on id
+    videos = [models.Video(timestamp=now + timedelta(hours=i)) for i in [0, 1, 1, 2, 3]]
+    db_session.add_all(videos)
+    db_session.commit()
+
+    ids = []
+    params = {"count": 2}
+    while True:
+        response = auth_client.get("/api/video/", params=params)
+        assert response.status_code == 200
+        ids += [v["id"] for v in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    # all videos returned exactly once, from last to first
+    expected = [v.id for v in sorted(videos, key=lambda v: (v.timestamp, v.id), reverse=True)]
+    assert ids == expected
+    # cursor cannot be combined with first and must be parseable
+    r = auth_client.get("/api/video/", params={"cursor": params["cursor"], "first": 1})
+    assert r.status_code == 400
+    r = auth_client.get("/api/video/", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert "Invalid cursor value" in r.json()["detail"]
+    db_session.query(models.Video).delete()
+    db_session.commit()
+    db_session.flush()
+
+
+def test_add_local_video(auth_client, tmpdir, monkeypatch):
+    incoming_dir = os.path.join(tmpdir, "incoming")
+    upload_dir = os.path.join(tmpdir, "uploads")
+    monkeypatch.setattr("orc_api.routers.video.INCOMING_DIRECTORY", incoming_dir)
+    monkeypatch.setattr("orc_api.crud.video.UPLOAD_DIRECTORY", upload_dir)
+    monkeypatch.setattr("orc_api.db.video.UPLOAD_DIRECTORY", upload_dir)
+    os.makedirs(incoming_dir)
+    out = cv2.VideoWriter(os.path.join(incoming_dir, "video.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (64, 48))
+    for _i in range(5):
+        out.write(np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8))
+    out.release()
+    data = {"file_path": "video.mp4", "timestamp": datetime(2024, 1, 1).isoformat()}
+    r = auth_client.post("/api/video/local/", data=data)
+    assert r.status_code == 201
+    # file is moved, not copied
+    assert not os.path.exists(os.path.join(incoming_dir, "video.mp4"))
+    assert os.path.isfile(os.path.join(upload_dir, r.json()["file"]))
+    # file is no longer there
+    r = auth_client.post("/api/video/local/", data=data)
+    assert r.status_code == 404
+    # files outside the incoming directory are not accepted
+    r = auth_client.post("/api/video/local/", data={**data, "file_path": "../uploads/video.mp4"})
+    assert r.status_code == 400
+    db_session = next(get_db_override())
+    db_session.query(models.Video).delete()
+    db_session.commit()
+
+
 def test_sync_video(auth_client, mocker):
     """Test successful video sync."""
     mocker.patch("orc_api.utils.queue.celery_app.send_task")
@@ -249,10 +335,10 @@ def test_video_stream_status_only(auth_client, tmpdir, monkeypatch, mocker):
     out.release()
 
     # Mock to return just 1 frame quickly
-    def mock_yield_frames(*args, **kwargs):
+    async def mock_stream(*args, **kwargs):
         yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\ndata\r\n"
 
-    mocker.patch("orc_api.routers.video.yield_frames_from_fn", side_effect=mock_yield_frames)
+    stream = mocker.patch("orc_api.routers.video.mjpeg_streams.stream", side_effect=mock_stream)
 
     # check what the latest id is (can depend on earlier run test in the scope of this test file)
     r = auth_client.get("/api/video/")
@@ -262,6 +348,15 @@ def test_video_stream_status_only(auth_client, tmpdir, monkeypatch, mocker):
     r = auth_client.get(f"/api/video/{latest_id}/stream/")
     assert r.status_code == 200
     assert "multipart/x-mixed-replace" in r.headers.get("content-type", "")
+    # options that are not given are left to the stream settings
+    assert stream.call_args.kwargs["rotate"] is None
+    assert "quality" not in stream.call_args.kwargs
+    r = auth_client.get(f"/api/video/{latest_id}/stream/?rotate=45")
+    assert r.status_code == 400
+    # the video was stored without metadata, it is probed once and stored
+    r = auth_client.get(f"/api/video/{latest_id}/frame_count/")
+    assert r.json() == 3
+    assert auth_client.get(f"/api/video/{latest_id}/").json()["media"]["width"] == 640
 
     db_session.query(models.Video).delete()
     db_session.commit()
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from orc_api import crud
+from orc_api.db import CallbackUrl
+from orc_api.schemas import callback_url as callback_url_schemas
+
+
+def _add_callback_url(session, token_expiration):
+    callback_url = CallbackUrl(
+        url="https://example.com",
+        token_refresh_end_point="/api/token/refresh/",
+        token_access="token_access_value",
+        token_refresh="token_refresh_value",
+        token_expiration=token_expiration,
+    )
+    return crud.callback_url.add(session, callback_url)
+
+
+def test_get_callback_url_cached(session_empty, mocker):
+    assert callback_url_schemas.get_callback_url(session_empty) is None
+    _add_callback_url(session_empty, datetime.now() + timedelta(hours=1))
+    callback_url_schemas.invalidate_callback_url_cache()
+    callback_url = callback_url_schemas.get_callback_url(session_empty)
+    assert callback_url.token_access == "token_access_value"
+    # subsequent records reuse the callback url without reading the database
+    get = mocker.patch("orc_api.schemas.callback_url.crud.callback_url.get")
+    assert callback_url_schemas.get_callback_url(session_empty) is callback_url
+    get.assert_not_called()
+
+
+def test_get_callback_url_expired_token(session_empty):
+    _add_callback_url(session_empty, datetime.now() - timedelta(hours=1))
+    callback_url = callback_url_schemas.get_callback_url(session_empty)
+    # another process may have refreshed the tokens in the meantime
+    _add_callback_url(session_empty, datetime.now() + timedelta(hours=1))
+    new_callback_url = callback_url_schemas.get_callback_url(session_empty)
+    assert new_callback_url is not callback_url
+    assert new_callback_url.token_expiration > datetime.now()
+
+
+def test_callback_url_uses_http_session(session_empty, mocker):
+    _add_callback_url(session_empty, datetime.now() + timedelta(hours=1))
+    http = mocker.patch("orc_api.schemas.callback_url.get_http_session")
+    callback_url = callback_url_schemas.get_callback_url(session_empty)
+    callback_url.post("/api/site/1/timeseries/", json={"h": 1.0})
+    callback_url.get("/api/site/1/")
+    assert http.return_value.post.call_args.args[0] == "https://example.com/api/site/1/timeseries/"
+    assert http.return_value.get.call_args.kwargs["headers"] == {"Authorization": "Bearer token_access_value"}
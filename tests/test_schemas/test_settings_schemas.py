@@ -6,21 +6,22 @@ from unittest.mock import MagicMock
 import pytest
 
 from orc_api.schemas.settings import SettingsResponse
+from orc_api.utils import disk_management
 
 
 @pytest.fixture
 def disable_thumbnail_listener():
-    """Temporarily disable the create_thumbnail_listener event."""
+    """Temporarily disable the queue_thumbnail_listener event."""
     from sqlalchemy import event
 
-    from orc_api.db.video import Video, create_thumbnail_listener
+    from orc_api.db.video import Video, queue_thumbnail_listener
 
-    event.remove(Video, "before_insert", create_thumbnail_listener)
-    event.remove(Video, "before_update", create_thumbnail_listener)
+    event.remove(Video, "after_insert", queue_thumbnail_listener)
+    event.remove(Video, "after_update", queue_thumbnail_listener)
     yield
     # re-enable the event listener
-    event.listen(Video, "before_insert", create_thumbnail_listener)
-    event.listen(Video, "before_update", create_thumbnail_listener)
+    event.listen(Video, "after_insert", queue_thumbnail_listener)
+    event.listen(Video, "after_update", queue_thumbnail_listener)
 
 
 @pytest.fixture
@@ -77,7 +78,7 @@ def test_add_sample_filename_unix_timestamp(mock_incoming_directory):
 
 @pytest.mark.asyncio
 async def test_check_new_videos_no_video(mock_incoming_directory, mocker):
-    process_video_mock = mocker.patch("orc_api.utils.queue.process_video")
+    process_video_mock = mocker.patch("orc_api.utils.queue.process_videos")
     settings = SettingsResponse(
         id=1,
         created_at=datetime.now(),
@@ -93,7 +94,7 @@ async def test_check_new_videos_no_video(mock_incoming_directory, mocker):
 async def test_check_new_videos_with_video(
     session_video_config, mock_incoming_directory, mock_tmp_directory, mocker, monkeypatch, disable_thumbnail_listener
 ):
-    def mock_create_thumbnail_listener(mapper, connection, target):
+    def mock_queue_thumbnail_listener(mapper, connection, target):
         return None
 
     # mock for app
@@ -102,8 +103,8 @@ async def test_check_new_videos_with_video(
     app.state.start_time = datetime.now()
 
     monkeypatch.setattr("orc_api.schemas.settings.get_session", lambda: session_video_config)
-    monkeypatch.setattr("orc_api.db.video.create_thumbnail_listener", mock_create_thumbnail_listener)
-    process_video_mock = mocker.patch("orc_api.utils.queue.process_video")
+    monkeypatch.setattr("orc_api.db.video.queue_thumbnail_listener", mock_queue_thumbnail_listener)
+    process_video_mock = mocker.patch("orc_api.utils.queue.process_videos")
 
     settings = SettingsResponse(
         id=1,
@@ -117,5 +118,101 @@ async def test_check_new_videos_with_video(
     os.makedirs(mock_tmp_directory, exist_ok=True)
     with open(os.path.join(mock_incoming_directory, "video_20230101_123456.mp4"), "w") as f:
         f.write("test_video_file")
+    monkeypatch.setattr("orc_api.schemas.settings.stability_tracker", disk_management.FileStabilityTracker(window=0))
+    # first scan only observes the file, second scan finds it unchanged
+    await settings.check_new_videos(path_incoming=mock_incoming_directory, start_time=None, logger=logging)
+    process_video_mock.assert_not_called()
     await settings.check_new_videos(path_incoming=mock_incoming_directory, start_time=None, logger=logging)
     process_video_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_check_new_videos_batch(
+    session_config, mock_incoming_directory, mock_tmp_directory, tmpdir, mocker, monkeypatch, disable_thumbnail_listener
+):
+    upload_dir = os.path.join(tmpdir, "uploads")
+    monkeypatch.setattr("orc_api.crud.video.UPLOAD_DIRECTORY", upload_dir)
+    monkeypatch.setattr("orc_api.schemas.settings.get_session", lambda: session_config)
+    monkeypatch.setattr("orc_api.schemas.settings.stability_tracker", disk_management.FileStabilityTracker(window=0))
+    process_videos_mock = mocker.patch("orc_api.utils.queue.process_videos")
+    settings = SettingsResponse(
+        id=1,
+        created_at=datetime.now(),
+        video_file_fmt="video_{%Y%m%d_%H%M%S}.mp4",
+        parse_dates_from_file=True,
+        reboot_after=False,
+    )
+    os.makedirs(mock_incoming_directory, exist_ok=True)
+    fns = ["video_20230101_123456.mp4", "video_20230101_133456.mp4", "video_wrong_name.mp4", "video_empty.mp4"]
+    for fn in fns[:-1]:
+        with open(os.path.join(mock_incoming_directory, fn), "w") as f:
+            f.write("test_video_file")
+    open(os.path.join(mock_incoming_directory, fns[-1]), "w").close()
+    await settings.check_new_videos(path_incoming=mock_incoming_directory, start_time=None, logger=logging)
+    process_videos_mock.assert_not_called()
+    await settings.check_new_videos(path_incoming=mock_incoming_directory, start_time=None, logger=logging)
+    # both valid videos are submitted together
+    process_videos_mock.assert_called_once()
+    videos = process_videos_mock.call_args.kwargs["videos"]
+    assert sorted(v.timestamp for v in videos) == [datetime(2023, 1, 1, 12, 34, 56), datetime(2023, 1, 1, 13, 34, 56)]
+    for video in videos:
+        assert os.path.isfile(os.path.join(upload_dir, video.file))
+    # file with wrong name is moved out of the way, empty file is left until it is written into
+    assert os.listdir(mock_incoming_directory) == ["video_empty.mp4"]
+    assert os.listdir(mock_tmp_directory) == ["video_wrong_name.mp4"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_videos(
+    session_config, mock_incoming_directory, tmpdir, mocker, monkeypatch, disable_thumbnail_listener
+):
+    upload_dir = os.path.join(tmpdir, "uploads")
+    monkeypatch.setattr("orc_api.crud.video.UPLOAD_DIRECTORY", upload_dir)
+    monkeypatch.setattr("orc_api.schemas.settings.get_session", lambda: session_config)
+    process_videos_mock = mocker.patch("orc_api.utils.queue.process_videos")
+    settings = SettingsResponse(
+        id=1,
+        created_at=datetime.now(),
+        video_file_fmt="video_{%Y%m%d_%H%M%S}.mp4",
+        parse_dates_from_file=True,
+    )
+    os.makedirs(mock_incoming_directory, exist_ok=True)
+    fn = os.path.join(mock_incoming_directory, "video_20230101_123456.mp4")
+    with open(fn, "w") as f:
+        f.write("test_video_file")
+    # files reported by the watcher are ingested without scanning, files that are already gone are skipped
+    await settings.ingest_videos([fn, os.path.join(mock_incoming_directory, "video_20230101_133456.mp4")], logging)
+    videos = process_videos_mock.call_args.kwargs["videos"]
+    assert [v.timestamp for v in videos] == [datetime(2023, 1, 1, 12, 34, 56)]
+    assert not os.path.exists(fn)
+
+
+@pytest.mark.asyncio
+async def test_ingest_videos_claimed(
+    session_config, mock_incoming_directory, tmpdir, mocker, monkeypatch, disable_thumbnail_listener
+):
+    upload_dir = os.path.join(tmpdir, "uploads")
+    monkeypatch.setattr("orc_api.crud.video.UPLOAD_DIRECTORY", upload_dir)
+    monkeypatch.setattr("orc_api.schemas.settings.get_session", lambda: session_config)
+    claims = disk_management.FileClaims()
+    monkeypatch.setattr("orc_api.schemas.settings.file_claims", claims)
+    process_videos_mock = mocker.patch("orc_api.utils.queue.process_videos")
+    settings = SettingsResponse(
+        id=1,
+        created_at=datetime.now(),
+        video_file_fmt="video_{%Y%m%d_%H%M%S}.mp4",
+        parse_dates_from_file=True,
+    )
+    os.makedirs(mock_incoming_directory, exist_ok=True)
+    fns = [os.path.join(mock_incoming_directory, f"video_20230101_1{i}3456.mp4") for i in range(2)]
+    for fn in fns:
+        with open(fn, "w") as f:
+            f.write("test_video_file")
+    # a file that is being ingested by another task (e.g. the watcher) is skipped by a simultaneous scan
+    claims.claim(fns[0])
+    await settings.ingest_videos(fns, logging)
+    videos = process_videos_mock.call_args.kwargs["videos"]
+    assert [v.timestamp for v in videos] == [datetime(2023, 1, 1, 11, 34, 56)]
+    assert os.path.isfile(fns[0])
+    # claims are released after ingestion
+    assert claims.claim(fns[1])
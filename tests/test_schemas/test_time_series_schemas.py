@@ -1,4 +1,9 @@
+import json as json_lib
 import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
 
 import pytest
 from sqlalchemy.orm import Session
@@ -6,7 +11,7 @@ from sqlalchemy.orm import Session
 from orc_api import crud
 from orc_api.db import CallbackUrl, SyncStatus, TimeSeries
 from orc_api.schemas.callback_url import CallbackUrlCreate, CallbackUrlResponse
-from orc_api.schemas.time_series import TimeSeriesResponse
+from orc_api.schemas.time_series import TimeSeriesResponse, sync_time_series_batch
 
 
 @pytest.fixture
@@ -92,3 +97,113 @@ def test_time_series_sync_real_server(session_video_with_config, time_series_res
 
     # now we have access through the temporary database. Let's perform a post.
     _ = time_series_response.sync_remote(session=session_video_with_config, site=1)
+
+
+@pytest.fixture
+def liveorc_server():
+    """Local stand-in of the LiveORC time series end point, accepting single records and lists of records."""
+    state = {"requests": [], "accept_lists": True, "list_response": "list", "next_id": 100}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, status, data):
+            body = json_lib.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _created(self, record):
+            state["next_id"] += 1
+            return {**record, "id": state["next_id"]}
+
+        def do_POST(self):
+            data = json_lib.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            state["requests"].append(("POST", data))
+            if isinstance(data, list):
+                if not state["accept_lists"]:
+                    return self._respond(400, {"detail": "Expected a dictionary"})
+                if state["list_response"] == "dict":
+                    return self._respond(201, {"detail": f"Created {len(data)} records"})
+                return self._respond(201, [self._created(record) for record in data])
+            if data.get("h") is not None and data["h"] < 0:
+                return self._respond(400, {"detail": "Invalid water level"})
+            return self._respond(201, self._created(data))
+
+        def do_PATCH(self):
+            data = json_lib.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            state["requests"].append(("PATCH", data))
+            return self._respond(200, {**data, "id": int(self.path.rstrip("/").split("/")[-1])})
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session_unsynced(session_config, liveorc_server):
+    url, _ = liveorc_server
+    session_config.query(CallbackUrl).update({"url": url})
+    timestamps = [datetime(2024, 1, 1) + timedelta(minutes=5 * i) for i in range(7)]
+    session_config.add_all([TimeSeries(timestamp=t, h=1.0 + i) for i, t in enumerate(timestamps)])
+    session_config.commit()
+    # one record already exists remotely and is updated locally
+    ts = session_config.query(TimeSeries).first()
+    ts.remote_id = 5
+    ts.sync_status = SyncStatus.UPDATED
+    session_config.commit()
+    return session_config
+
+
+def test_sync_time_series_batch(session_unsynced, liveorc_server):
+    _, state = liveorc_server
+    counts = sync_time_series_batch(session_unsynced, site=1, chunk_size=3)
+    assert counts == {"synced": 7, "failed": 0}
+    # one patch of the existing record, and new records in chunks of 3
+    assert [(method, len(data) if isinstance(data, list) else 1) for method, data in state["requests"]] == [
+        ("PATCH", 1),
+        ("POST", 2),
+        ("POST", 3),
+        ("POST", 1),
+    ]
+    records = session_unsynced.query(TimeSeries).order_by(TimeSeries.id).all()
+    assert all(ts.sync_status == SyncStatus.SYNCED for ts in records)
+    assert [ts.remote_id for ts in records] == [5, 101, 102, 103, 104, 105, 106]
+    # nothing left to sync
+    assert sync_time_series_batch(session_unsynced, site=1, chunk_size=3) == {"synced": 0, "failed": 0}
+
+
+def test_sync_time_series_batch_fallback(session_unsynced, liveorc_server):
+    _, state = liveorc_server
+    state["accept_lists"] = False
+    invalid = session_unsynced.query(TimeSeries).order_by(TimeSeries.id.desc()).first()
+    invalid.h = -1.0
+    session_unsynced.commit()
+    # records are synced one by one, invalid records fail without stopping the sync
+    counts = sync_time_series_batch(session_unsynced, site=1, chunk_size=3)
+    assert counts == {"synced": 6, "failed": 1}
+    session_unsynced.expire_all()
+    assert invalid.sync_status == SyncStatus.FAILED
+    assert session_unsynced.query(TimeSeries).filter(TimeSeries.sync_status == SyncStatus.SYNCED).count() == 6
+
+
+def test_sync_time_series_batch_unexpected_response(session_unsynced, liveorc_server):
+    _, state = liveorc_server
+    state["list_response"] = "dict"
+    logger = MagicMock()
+    # remote ids cannot be matched with a 201 without list of records, records are synced one by one instead
+    counts = sync_time_series_batch(session_unsynced, site=1, chunk_size=3, logger=logger)
+    assert counts == {"synced": 7, "failed": 0}
+    assert "returned no list" in logger.warning.call_args.args[0]
+    logger.error.assert_not_called()
+    records = session_unsynced.query(TimeSeries).order_by(TimeSeries.id).all()
+    assert all(ts.sync_status == SyncStatus.SYNCED for ts in records)
+    assert len({ts.remote_id for ts in records}) == 7
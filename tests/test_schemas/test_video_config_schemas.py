@@ -1,12 +1,21 @@
+import json
 import os
 
 import numpy as np
 import pytest
 
 from orc_api import crud
-from orc_api.db import CallbackUrl, SyncStatus
+from orc_api.db import CallbackUrl, CrossSection, SyncStatus, VideoConfig
 from orc_api.schemas.callback_url import CallbackUrlCreate, CallbackUrlResponse
+from orc_api.schemas.cross_section import CrossSectionResponseCameraConfig
 from orc_api.schemas.recipe import RecipeRemote
+from orc_api.schemas.video_config import (
+    VideoConfigResponse,
+    _rotate_translate_cross_section,
+    cross_section_rt_cache,
+    get_video_config_response,
+    video_config_cache,
+)
 
 
 def test_video_config_schema(video_config_response):
@@ -16,6 +25,42 @@ def test_video_config_schema(video_config_response):
     assert "video" in vc.recipe.data
 
 
+def test_video_config_cache(session_config):
+    video_config_cache.clear()
+    vc = VideoConfig(name="cached video config")
+    session_config.add(vc)
+    session_config.commit()
+    vc_response1 = get_video_config_response(vc)
+    vc_response2 = get_video_config_response(vc)
+    assert video_config_cache.stats["misses"] == 1
+    assert video_config_cache.stats["hits"] == 1
+    # cached instance is never handed out, so that callers can safely alter the response
+    assert vc_response1 == vc_response2
+    assert vc_response1 is not vc_response2
+    # unflushed changes bypass the cache
+    vc.name = "renamed video config"
+    assert get_video_config_response(vc).name == "renamed video config"
+    assert video_config_cache.stats["misses"] == 1
+    # committed changes renew the updated_at stamp and invalidate the cache
+    session_config.commit()
+    assert get_video_config_response(vc).name == "renamed video config"
+    assert video_config_cache.stats["misses"] == 2
+
+
+def test_video_config_cache_children(session_video_config):
+    video_config_cache.clear()
+    vc = crud.video_config.get(session_video_config, id=1)
+    vc_response1 = get_video_config_response(vc)
+    assert get_video_config_response(vc) == vc_response1
+    assert video_config_cache.stats["hits"] == 1
+    # a change in the camera config must invalidate the cached video config
+    vc.camera_config.name = "renamed camera config"
+    session_video_config.commit()
+    vc_response2 = get_video_config_response(vc)
+    assert vc_response2.camera_config.name == "renamed camera config"
+    assert video_config_cache.stats["misses"] == 2
+
+
 def test_video_config_transform_cs(video_config_response):
     # manipulate rvec and tvec and try it out
     vc = video_config_response
@@ -32,6 +77,67 @@ def test_video_config_transform_cs(video_config_response):
     assert np.allclose(cs_transform_wl.gdf.geometry.y - vc.cross_section_wl.gdf.geometry.y, 10)
 
 
+def test_video_config_transform_cs_cached(cross_section_with_crs):
+    cross_section_rt_cache.clear()
+    cs = CrossSectionResponseCameraConfig(id=1, name="cs", features=json.loads(cross_section_with_crs))
+    cs_rt1 = _rotate_translate_cross_section(cs, [0.0, 0.0, np.pi / 2], [1.0, 0.0, 0.0])
+    # rotation of 90 degrees around the z-axis through the mean point (1, 5/3, 1), then x + 1
+    assert np.allclose(cs_rt1.x, [1 + 1 + 5 / 3, 1 + 1 + 2 / 3, 1 + 1 - 7 / 3])
+    assert np.allclose(cs_rt1.z, cs.z)
+    # without a key of the stored records, the cache is not used
+    assert cross_section_rt_cache.stats["misses"] == 0
+    # with a key, the transform is computed once and shared
+    cs_rt2 = _rotate_translate_cross_section(cs, [0.0, 0.0, np.pi / 2], [1.0, 0.0, 0.0], key=("video config", 1))
+    assert (
+        _rotate_translate_cross_section(cs, [0.0, 0.0, np.pi / 2], [1.0, 0.0, 0.0], key=("video config", 1)) is cs_rt2
+    )
+    assert cross_section_rt_cache.stats["hits"] == 1
+    assert cross_section_rt_cache.stats["misses"] == 1
+    assert cs_rt2.x == cs_rt1.x
+
+
+def test_video_config_transform_cs_per_instance(cross_section_with_crs):
+    cs = CrossSectionResponseCameraConfig(id=1, name="cs", features=json.loads(cross_section_with_crs))
+    vc = VideoConfigResponse(name="video config", cross_section=cs, tvec=[0.0, 0.0, 1.0])
+    cs_rt = vc.cross_section_rt
+    # dumping the video config does not recompute the already computed transform
+    vc.model_dump()
+    assert vc.cross_section_rt is cs_rt
+    assert np.allclose(np.array(cs_rt.z) - np.array(cs.z), 1.0)
+    # assigning a field renews the transform
+    vc.tvec = [0.0, 0.0, 2.0]
+    assert np.allclose(np.array(vc.cross_section_rt.z) - np.array(cs.z), 2.0)
+
+
+def test_video_config_transform_cs_cached_records(session_config, cross_section_with_crs):
+    video_config_cache.clear()
+    cross_section_rt_cache.clear()
+    cs = CrossSection(name="cs", features=json.loads(cross_section_with_crs))
+    vc = VideoConfig(name="video config", cross_section=cs, tvec=[0.0, 0.0, 1.0])
+    session_config.add(vc)
+    session_config.commit()
+    cs_rt = get_video_config_response(vc).cross_section_rt
+    # another copy of the same records shares the transform
+    assert get_video_config_response(vc).cross_section_rt is cs_rt
+    assert cross_section_rt_cache.stats["misses"] == 1
+    assert cross_section_rt_cache.stats["hits"] == 1
+    # a changed record is transformed again
+    vc.tvec = [0.0, 0.0, 2.0]
+    session_config.commit()
+    cs_rt = get_video_config_response(vc).cross_section_rt
+    assert cross_section_rt_cache.stats["misses"] == 2
+    assert np.allclose(np.array(cs_rt.z) - np.array(get_video_config_response(vc).cross_section.z), 2.0)
+
+
+def test_video_config_serialize_cs_cached(video_config_response):
+    # dumping the video config must not recompute the already computed transforms
+    cs_rt = video_config_response.cross_section_rt
+    cs_wl_rt = video_config_response.cross_section_wl_rt
+    video_config_response.model_dump()
+    assert video_config_response.cross_section_rt is cs_rt
+    assert video_config_response.cross_section_wl_rt is cs_wl_rt
+
+
 def test_video_config_recipe_cleaned(video_config_response):
     vc = video_config_response
     tvec = [0.0, 0.0, 1]
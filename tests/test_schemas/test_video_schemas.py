@@ -7,10 +7,13 @@ import pytest
 from pydantic import AnyHttpUrl
 from pyorc import sample_data
 
+import orc_api.schemas.video
 from orc_api import crud
 from orc_api import db as models
 from orc_api.schemas.callback_url import CallbackUrlCreate, CallbackUrlResponse
-from orc_api.schemas.video import VideoListResponse
+from orc_api.schemas.video import VideoListResponse, VideoMedia, VideoResponse
+from orc_api.schemas.video_config import VideoConfigResponse, get_video_config_summaries
+from orc_api.utils.admission import JobTracker
 
 
 @pytest.mark.skip(reason="Testing full video run only done on interactive request.")
@@ -56,6 +59,18 @@ def test_get_video_list_response(session_video_with_config):
     assert video_list_response2.allowed_to_run == False
 
 
+def test_get_video_list_response_from_row(session_video_with_config):
+    rec = session_video_with_config.get(models.Video, 1)
+    row = crud.video.get_list_rows(session_video_with_config, count=1)[0]
+    summaries = get_video_config_summaries(session_video_with_config, [row.video_config_id])
+    video_list_response = VideoListResponse.from_row(row, summaries[row.video_config_id])
+    video_list_response_orm = VideoListResponse.from_orm_model(
+        rec, VideoConfigResponse.model_validate(rec.video_config)
+    )
+    # projected row and full ORM model must give the same response
+    assert video_list_response == video_list_response_orm
+
+
 def test_video_run_daemon_shutdown(tmpdir, video_response_no_ts, session_video_config, monkeypatch):
     """Mock running of video in order to test if shutdown is handled correctly."""
     monkeypatch.setattr("orc_api.schemas.video.get_session", lambda: session_video_config)
@@ -93,6 +108,29 @@ def test_video_run_daemon_shutdown(tmpdir, video_response_no_ts, session_video_c
     assert mock_shutdown.call_count == 1
 
 
+def test_video_run_shutdown_after_last_video(tmpdir, session_config, monkeypatch):
+    monkeypatch.setattr("orc_api.schemas.video.get_session", lambda: session_config)
+    monkeypatch.setattr("orc_api.schemas.video.video_jobs", JobTracker())
+    monkeypatch.setattr("time.sleep", lambda *args: None)
+    mock_shutdown = mock.Mock()
+    monkeypatch.setattr("subprocess.call", mock_shutdown)
+    video = models.Video(timestamp=datetime(2020, 1, 1))
+    session_config.add(video)
+    session_config.commit()
+    video_response = VideoResponse.model_validate(video)
+    # another video is still running
+    orc_api.schemas.video.video_jobs.start()
+    with pytest.raises(Exception, match="ERROR"):
+        video_response.run(base_path=str(tmpdir), shutdown_after_task=True)
+    assert mock_shutdown.call_count == 0
+    # once the other video has finished, a shutdown is due
+    assert orc_api.schemas.video.video_jobs.finish()
+    # a single video shuts down after running, also when it failed
+    with pytest.raises(Exception, match="ERROR"):
+        video_response.run(base_path=str(tmpdir), shutdown_after_task=True)
+    assert mock_shutdown.call_count == 1
+
+
 def test_video_update_timeseries(video_response_no_ts, session_video_config, monkeypatch):
     # create a time series record first
     crud.time_series.add(session_video_config, models.TimeSeries(timestamp=datetime.now(), h=1.5))
@@ -141,6 +179,23 @@ def test_video_properties(tmpdir, video_response_no_ts, monkeypatch):
     assert isinstance(video_response_no_ts.get_discharge_file(base_path=tmpdir), str)
 
 
+def test_video_media(tmpdir, monkeypatch):
+    media = VideoMedia(frame_count=40, fps=20.0, width=640, height=480, codec="H264", duration=2.0)
+    video = VideoResponse(id=1, timestamp=datetime(2020, 1, 1), file="video.mp4", media=media)
+
+    def mock_probe_video(fn):
+        raise AssertionError("stored metadata should be used")
+
+    monkeypatch.setattr("orc_api.schemas.video.probe_video", mock_probe_video)
+    assert video.frame_count(base_path=tmpdir) == 40
+    assert video.dims(base_path=tmpdir) == (480, 640)
+    # videos stored without metadata are probed once
+    video.media = None
+    monkeypatch.setattr("orc_api.schemas.video.probe_video", lambda fn: media.model_dump())
+    assert video.frame_count(base_path=tmpdir) == 40
+    assert video.media == media
+
+
 def test_video_sync(session_video_with_config, video_response, monkeypatch):
     """Test for syncing a video record to remote API (real response is mocked)."""
     # let's assume we are posting on site 1
@@ -179,6 +234,47 @@ def test_video_sync(session_video_with_config, video_response, monkeypatch):
     assert video_update.sync_status == models.SyncStatus.SYNCED
 
 
+def test_video_sync_chunked(session_video_with_config, video_response, monkeypatch):
+    """Test for syncing a large video in resumable chunks (real responses are mocked)."""
+    site = 1
+    posted = {}
+
+    def mock_upload_file(callback_url, path, upload_id=None, save_state=None):
+        save_state("3", 1024)
+        return "3"
+
+    def mock_post(self, endpoint: str, data=None, json=None, files=None, timeout=None):
+        posted.update(data=data, files=files)
+        # the upload state is persisted while uploading
+        assert crud.video.get(session_video_with_config, video_response.id).upload_offset == 1024
+
+        class MockResponse:
+            status_code = 201
+
+            def json(self):
+                return {"id": 7, "timestamp": video_response.timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+        return MockResponse()
+
+    video_response.video_config.sync_status = models.SyncStatus.SYNCED
+    video_response.video_config.remote_id = 5
+    video_response.time_series.sync_status = models.SyncStatus.SYNCED
+    video_response.time_series.remote_id = 7
+    monkeypatch.setattr("orc_api.schemas.video.UPLOAD_CHUNK_SIZE", 1)
+    monkeypatch.setattr("orc_api.schemas.video.chunked_upload.upload_file", mock_upload_file)
+    monkeypatch.setattr(CallbackUrlResponse, "post", mock_post)
+    video_update = video_response.sync_remote(
+        session=session_video_with_config, base_path=sample_data.get_hommerich_pyorc_files(), site=site
+    )
+    # the video record refers to the upload instead of sending the file
+    assert posted["data"]["upload"] == "3"
+    assert "file" not in posted["files"]
+    assert video_update.remote_id == 7
+    video_rec = crud.video.get(session_video_with_config, video_response.id)
+    assert video_rec.upload_id is None
+    assert video_rec.upload_offset == 0
+
+
 def test_video_sync_not_permitted(session_video_with_config, video_response, monkeypatch):
     """Test for syncing a video to remote API (real response is mocked)."""
     # let's assume we are posting on site 1
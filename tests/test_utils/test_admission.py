@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+import pytest
+
+from orc_api.utils import admission
+
+
+def test_thread_budget():
+    assert admission.thread_budget(workers=1, cpu_count=8) == 8
+    assert admission.thread_budget(workers=3, cpu_count=8) == 2
+    # never less than one thread
+    assert admission.thread_budget(workers=16, cpu_count=8) == 1
+
+
+def test_apply_thread_budget(monkeypatch):
+    for var in admission.THREAD_ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+    admission.apply_thread_budget(2)
+    for var in admission.THREAD_ENV_VARS:
+        assert os.environ[var] == "2"
+
+
+@pytest.mark.parametrize(
+    ("recipe", "frame_count", "expected"),
+    [
+        ({}, 100, 100),
+        ({"video": {"start_frame": 10, "end_frame": 40}}, 100, 30),
+        ({"video": {"start_frame": 10, "end_frame": 400}}, 100, 90),
+    ],
+)
+def test_get_recipe_frame_count(recipe, frame_count, expected):
+    assert admission.get_recipe_frame_count(recipe, frame_count) == expected
+
+
+def test_estimate_job_memory():
+    small = admission.estimate_job_memory(640, 480, 100)
+    large = admission.estimate_job_memory(1920, 1080, 100)
+    assert admission.BASE_MEMORY_JOB < small < large
+
+
+def test_memory_admission(monkeypatch):
+    controller = admission.MemoryAdmission(reserve=0, poll_interval=0.01)
+    monkeypatch.setattr(controller, "available", lambda: 100 - controller.reserved)
+    # a job larger than the available memory is still admitted when nothing else runs
+    assert controller.acquire(200)
+    # but a second job then has to wait
+    assert not controller.acquire(10, timeout=0.05)
+    admitted = threading.Event()
+
+    def job():
+        with controller.admit(50):
+            admitted.set()
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    time.sleep(0.05)
+    assert not admitted.is_set()
+    controller.release(200)
+    thread.join(timeout=1)
+    assert admitted.is_set()
+    assert controller.running == 0
+    assert controller.reserved == 0
+
+
+def test_memory_admission_running_jobs(monkeypatch):
+    controller = admission.MemoryAdmission(reserve=0, poll_interval=0.01)
+    system = {"available": 1000, "jobs": 0}
+    monkeypatch.setattr(
+        admission.psutil, "virtual_memory", lambda: type("Memory", (), {"available": system["available"]})
+    )
+    monkeypatch.setattr(controller, "jobs_memory", lambda: system["jobs"])
+    assert controller.acquire(400)
+    # the first job now uses its memory, which the system no longer reports as available
+    system.update(available=600, jobs=400)
+    assert controller.available() == 600
+    assert controller.acquire(500, timeout=0.05)
+    # the second job does not use its memory yet, so its reservation is still subtracted
+    assert controller.available() == 100
+    assert not controller.acquire(200, timeout=0.05)
+    system.update(available=100, jobs=900)
+    assert controller.available() == 100
+    controller.release(500)
+    controller.release(400)
+    assert controller.running == 0
+
+
+def test_job_tracker():
+    tracker = admission.JobTracker()
+    tracker.start()
+    tracker.start()
+    # a shutdown requested by the first finished job waits for the other job
+    assert not tracker.finish(shutdown=True)
+    assert tracker.finish()
+    # without a request, the last job does not shut down
+    tracker.start()
+    assert not tracker.finish()
@@ -0,0 +1,17 @@
+from orc_api.utils.cache import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # "b" is now least recently used and is evicted
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b", "default") == "default"
+    assert len(cache) == 2
+    assert cache.stats == {"hits": 1, "misses": 2, "size": 2, "maxsize": 2}
+    cache.clear()
+    assert cache.stats == {"hits": 0, "misses": 0, "size": 0, "maxsize": 2}
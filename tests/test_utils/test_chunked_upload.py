@@ -0,0 +1,141 @@
+import gzip
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from orc_api.schemas.callback_url import CallbackUrlResponse
+from orc_api.utils import chunked_upload
+
+
+@pytest.fixture
+def upload_server():
+    """Local HTTP server implementing the chunked upload end points of LiveORC."""
+    state = {"uploads": {}, "received": 0, "fail_at": set(), "reject_at": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, status, body):
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def _upload_id(self):
+            return self.path.rstrip("/").split("/")[-1]
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            upload_id = str(len(state["uploads"]) + 1)
+            state["uploads"][upload_id] = {"size": body["size"], "data": b""}
+            self._respond(201, {"id": upload_id, "offset": 0})
+
+        def do_GET(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            upload = state["uploads"].get(self._upload_id())
+            if upload is None:
+                return self._respond(404, {"detail": "Not found"})
+            self._respond(200, {"offset": len(upload["data"])})
+
+        def do_PATCH(self):
+            chunk = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.headers.get("Content-Encoding") == "gzip":
+                chunk = gzip.decompress(chunk)
+            state["received"] += len(chunk)
+            upload = state["uploads"][self._upload_id()]
+            start = int(self.headers["Content-Range"].split()[1].split("-")[0])
+            if start in state["reject_at"]:
+                state["reject_at"].remove(start)
+                return self._respond(400, {"detail": "Bad request"})
+            if start in state["fail_at"]:
+                # the chunk arrives, but the response is lost
+                state["fail_at"].remove(start)
+                upload["data"] += chunk
+                return self._respond(503, {"detail": "Service unavailable"})
+            if start != len(upload["data"]):
+                return self._respond(409, {"offset": len(upload["data"])})
+            upload["data"] += chunk
+            self._respond(200, {"offset": len(upload["data"])})
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    callback_url = CallbackUrlResponse(
+        id=1,
+        created_at=datetime.now(),
+        url=f"http://127.0.0.1:{httpd.server_port}",
+        token_refresh_end_point="/api/token/refresh/",
+        token_access="token_access_value",
+        token_refresh="token_refresh_value",
+        token_expiration=datetime.now() + timedelta(hours=1),
+    )
+    yield callback_url, state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def video_file(tmpdir):
+    path = tmpdir.join("video.mp4")
+    path.write_binary(bytes(range(256)) * 40)  # 10240 bytes
+    return str(path)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_file(upload_server, video_file, compress):
+    callback_url, state = upload_server
+    states = []
+    upload_id = chunked_upload.upload_file(
+        callback_url,
+        video_file,
+        save_state=lambda *args: states.append(args),
+        chunk_size=4096,
+        compress=compress,
+    )
+    assert state["uploads"][upload_id]["data"] == open(video_file, "rb").read()
+    assert state["received"] == 10240
+    assert states == [(upload_id, 0), (upload_id, 4096), (upload_id, 8192), (upload_id, 10240)]
+
+
+def test_upload_file_lost_response(upload_server, video_file):
+    callback_url, state = upload_server
+    state["fail_at"].add(4096)
+    upload_id = chunked_upload.upload_file(callback_url, video_file, chunk_size=4096, backoff=0)
+    assert state["uploads"][upload_id]["data"] == open(video_file, "rb").read()
+    # the chunk without response has arrived, so it is not sent again
+    assert state["received"] == 10240
+
+
+def test_upload_file_resume(upload_server, video_file):
+    callback_url, state = upload_server
+    states = []
+    state["reject_at"].add(8192)
+    with pytest.raises(ValueError, match="rejected"):
+        chunked_upload.upload_file(
+            callback_url, video_file, save_state=lambda *args: states.append(args), chunk_size=4096, backoff=0
+        )
+    upload_id, offset = states[-1]
+    assert offset == 8192
+    state["received"] = 0
+    assert chunked_upload.upload_file(callback_url, video_file, upload_id=upload_id, chunk_size=4096) == upload_id
+    assert state["uploads"][upload_id]["data"] == open(video_file, "rb").read()
+    # only the remaining bytes are sent
+    assert state["received"] == 10240 - 8192
+    # an unknown upload starts all over
+    assert chunked_upload.upload_file(callback_url, video_file, upload_id="99", chunk_size=4096) != "99"
+
+
+def test_upload_file_retries_exceeded(upload_server, video_file, mocker):
+    callback_url, _ = upload_server
+    mocker.patch.object(chunked_upload, "send_chunk", side_effect=chunked_upload.ChunkError("mocked failure"))
+    with pytest.raises(chunked_upload.ChunkError):
+        chunked_upload.upload_file(callback_url, video_file, chunk_size=4096, retries=2, backoff=0)
+    assert chunked_upload.send_chunk.call_count == 3
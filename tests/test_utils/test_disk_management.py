@@ -0,0 +1,162 @@
+import errno
+import os
+
+from orc_api.utils import disk_management
+
+
+def test_move_file(tmpdir, monkeypatch):
+    src = os.path.join(tmpdir, "src.mp4")
+    dst = os.path.join(tmpdir, "sub", "dst.mp4")
+    with open(src, "w") as f:
+        f.write("data")
+    disk_management.move_file(src, dst)
+    assert not os.path.exists(src)
+    assert os.path.isfile(dst)
+
+    # across filesystems, rename is not possible and the file is copied instead
+    def rename(*_args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(disk_management.os, "rename", rename)
+    disk_management.move_file(dst, src)
+    assert os.path.isfile(src)
+    assert not os.path.exists(dst)
+
+
+def test_transfer_file_keep_source(tmpdir, monkeypatch):
+    src = os.path.join(tmpdir, "src.mp4")
+    with open(src, "w") as f:
+        f.write("data")
+    # within one filesystem a hard link is made, no data is copied
+    dst_link = os.path.join(tmpdir, "link", "dst.mp4")
+    assert disk_management.transfer_file(src, dst_link, move=False) == "link"
+    assert os.path.samefile(src, dst_link)
+
+    # without hard links and copy-on-write support, the file is copied
+    def fail(*_args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(disk_management.os, "link", fail)
+    monkeypatch.setattr(disk_management, "reflink_file", fail)
+    dst_copy = os.path.join(tmpdir, "copy", "dst.mp4")
+    assert disk_management.transfer_file(src, dst_copy, move=False) == "copy"
+    assert not os.path.samefile(src, dst_copy)
+    with open(dst_copy) as f:
+        assert f.read() == "data"
+    assert os.path.isfile(src)
+
+
+def test_file_stability_tracker(tmpdir):
+    tracker = disk_management.FileStabilityTracker(window=10)
+    fn = os.path.join(tmpdir, "video.mp4")
+    fn_empty = os.path.join(tmpdir, "empty.mp4")
+    with open(fn, "w") as f:
+        f.write("data")
+    open(fn_empty, "w").close()
+    fns = [fn, fn_empty, os.path.join(tmpdir, "missing.mp4")]
+    # first observation, and unchanged but not yet for the full window
+    assert tracker.observe(fns, now=0) == []
+    assert tracker.observe(fns, now=5) == []
+    # unchanged during the window, empty files are never stable
+    assert tracker.observe(fns, now=10) == [fn]
+    # a file that is written into again must be unchanged for the full window again
+    with open(fn, "a") as f:
+        f.write("more data")
+    assert tracker.observe(fns, now=11) == []
+    assert tracker.observe(fns, now=21) == [fn]
+    # observations of files that are gone are dropped
+    assert tracker.observe([fn_empty], now=22) == []
+    assert list(tracker.load()) == [fn_empty]
+
+
+def test_file_stability_tracker_redis(tmpdir):
+    class FakeRedis:
+        def __init__(self):
+            self.hashes = {}
+
+        def hgetall(self, key):
+            return {k.encode(): v.encode() for k, v in self.hashes.get(key, {}).items()}
+
+        def pipeline(self):
+            return self
+
+        def delete(self, key):
+            self.hashes.pop(key, None)
+
+        def hset(self, key, mapping):
+            self.hashes.setdefault(key, {}).update(mapping)
+
+        def execute(self):
+            pass
+
+    redis_client = FakeRedis()
+    fn = os.path.join(tmpdir, "video.mp4")
+    with open(fn, "w") as f:
+        f.write("data")
+    # observations are shared between trackers of different processes
+    assert disk_management.FileStabilityTracker(window=1, redis_client=redis_client).observe([fn], now=0) == []
+    assert disk_management.FileStabilityTracker(window=1, redis_client=redis_client).observe([fn], now=1) == [fn]
+
+
+def test_file_stability_tracker_redis_unavailable(tmpdir):
+    class BrokenRedis:
+        def __getattr__(self, name):
+            raise ConnectionError("redis unavailable")
+
+    tracker = disk_management.FileStabilityTracker(window=1, redis_client=BrokenRedis())
+    fn = os.path.join(tmpdir, "video.mp4")
+    with open(fn, "w") as f:
+        f.write("data")
+    # observations are kept in memory instead
+    assert tracker.observe([fn], now=0) == []
+    assert tracker.observe([fn], now=1) == [fn]
+
+
+def test_file_stability_tracker_pending(tmpdir):
+    tracker = disk_management.FileStabilityTracker(window=10)
+    fn = os.path.join(tmpdir, "video.mp4")
+    fn_empty = os.path.join(tmpdir, "empty.mp4")
+    with open(fn, "w") as f:
+        f.write("data")
+    open(fn_empty, "w").close()
+    tracker.observe([fn, fn_empty], now=0)
+    # new files may become stable in a next scan
+    assert sorted(tracker.pending(now=5)) == sorted([fn, fn_empty])
+    # files unchanged during the window are no longer pending, also when they are never stable (empty)
+    assert tracker.observe([fn, fn_empty], now=10) == [fn]
+    assert tracker.pending(now=10) == []
+
+
+def test_file_claims():
+    claims = disk_management.FileClaims(ttl=3600)
+    assert claims.claim("video.mp4")
+    # only one task can claim a file
+    assert not claims.claim("video.mp4")
+    assert claims.claim("other.mp4")
+    claims.release("video.mp4")
+    assert claims.claim("video.mp4")
+    # expired claims can be claimed again
+    assert claims.claim("short.mp4", ttl=0)
+    assert claims.claim("short.mp4")
+
+
+def test_file_claims_redis():
+    class FakeRedis:
+        def __init__(self):
+            self.keys = {}
+
+        def set(self, key, value, nx=False, px=None):
+            if nx and key in self.keys:
+                return None
+            self.keys[key] = value
+            return True
+
+        def delete(self, key):
+            self.keys.pop(key, None)
+
+    redis_client = FakeRedis()
+    # claims are shared between different processes
+    assert disk_management.FileClaims(redis_client=redis_client).claim("video.mp4")
+    assert not disk_management.FileClaims(redis_client=redis_client).claim("video.mp4")
+    disk_management.FileClaims(redis_client=redis_client).release("video.mp4")
+    assert list(redis_client.keys) == []
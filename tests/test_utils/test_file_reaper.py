@@ -0,0 +1,75 @@
+import os
+import time
+
+from orc_api.utils import file_reaper
+
+
+def _make_dirs(tmpdir, n):
+    paths = []
+    for i in range(n):
+        path = tmpdir.mkdir(str(i))
+        path.join("video.mp4").write("video")
+        paths.append(str(path))
+    return paths
+
+
+def _wait(reaper, timeout=5):
+    stop = time.monotonic() + timeout
+    while time.monotonic() < stop:
+        progress = reaper.progress()
+        if progress["removed"] + progress["failed"] == progress["submitted"]:
+            return
+        time.sleep(0.01)
+
+
+def test_reap_batch(tmpdir):
+    reaper = file_reaper.FileReaper(batch_size=2)
+    paths = _make_dirs(tmpdir, 3)
+    # already removed directories count as removed
+    reaper.pending.extend(paths + [str(tmpdir.join("missing"))])
+    assert reaper.reap_batch() == 2
+    assert sorted(os.listdir(tmpdir)) == ["2"]
+    assert reaper.reap_batch() == 2
+    assert reaper.reap_batch() == 0
+    assert os.listdir(tmpdir) == []
+    assert reaper.progress() == {"submitted": 0, "removed": 4, "failed": 0, "pending": 0}
+
+
+def test_file_reaper_thread(tmpdir):
+    reaper = file_reaper.FileReaper(batch_size=2, rate=20)
+    tic = time.monotonic()
+    assert reaper.submit(_make_dirs(tmpdir, 6)) == 6
+    _wait(reaper)
+    # the second and third batch wait for the rate limit
+    assert time.monotonic() - tic >= 0.2
+    assert os.listdir(tmpdir) == []
+    assert reaper.progress() == {"submitted": 6, "removed": 6, "failed": 0, "pending": 0}
+    reaper.stop(timeout=5)
+    assert not reaper._thread.is_alive()
+    # submitting again restarts the thread
+    reaper.submit(_make_dirs(tmpdir, 1))
+    _wait(reaper)
+    assert os.listdir(tmpdir) == []
+    reaper.stop(timeout=5)
+
+
+def test_file_reaper_journal(tmpdir):
+    journal = str(tmpdir.join("pending.txt"))
+    paths = _make_dirs(tmpdir.mkdir("uploads"), 3)
+    # queued directories are kept on disk, a process stopping halfway leaves them in the journal
+    reaper = file_reaper.FileReaper(batch_size=1, rate=1, journal=journal)
+    reaper.submit(paths)
+    reaper.stop(timeout=5)
+    assert reaper.progress()["pending"] > 0
+    with open(journal) as f:
+        assert f.read().splitlines() == paths
+    # a new process resumes the removal, directories that are already removed count as removed
+    reaper = file_reaper.FileReaper(batch_size=2, journal=journal)
+    assert reaper.resume() == 3
+    _wait(reaper)
+    reaper.stop(timeout=5)
+    assert os.listdir(tmpdir.join("uploads")) == []
+    assert reaper.progress() == {"submitted": 3, "removed": 3, "failed": 0, "pending": 0}
+    # the journal is removed once all directories are handled
+    assert not os.path.exists(journal)
+    assert file_reaper.FileReaper(journal=journal).resume() == 0
@@ -0,0 +1,95 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from orc_api.utils import frames
+
+
+@pytest.fixture
+def gop_video(tmpdir):
+    # a moving gradient, so that the encoder writes keyframes with predicted frames in between
+    fn = str(tmpdir.join("video.mp4"))
+    out = cv2.VideoWriter(fn, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (160, 120))
+    base = np.tile(np.arange(160, dtype=np.uint8), (120, 1))
+    for i in range(40):
+        out.write(np.dstack([np.roll(base, 4 * i, axis=1)] * 3))
+    out.release()
+    return fn
+
+
+@pytest.fixture
+def decoded_frames(gop_video):
+    cap = cv2.VideoCapture(gop_video)
+    decoded = []
+    while True:
+        success, frame = cap.read()
+        if not success:
+            break
+        decoded.append(frame)
+    cap.release()
+    return decoded
+
+
+def test_frame_index(gop_video):
+    frame_index = frames.build_frame_index(gop_video)
+    assert frame_index["frame_count"] == 40
+    assert frame_index["seekable"]
+    # the first frame is a keyframe, with predicted frames in between keyframes
+    assert frame_index["keyframes"][0] == 0
+    assert 1 < len(frame_index["keyframes"]) < 40
+    # built once and stored next to the video
+    assert frames.read_frame_index(gop_video) == frame_index
+    assert os.path.exists(frames.get_frame_index_file(gop_video))
+
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_read_frame(gop_video, decoded_frames, monkeypatch, seekable):
+    reader = frames.FrameReader(cache_size=4, pool_size=2)
+    frame_index = dict(frames.build_frame_index(gop_video), seekable=seekable)
+    monkeypatch.setattr(reader, "get_frame_index", lambda fn: frame_index)
+    # forwards, backwards and across keyframes
+    for frame_nr in [0, 1, 2, 20, 13, 39, 5]:
+        assert np.array_equal(reader.read_frame(gop_video, frame_nr), decoded_frames[frame_nr])
+    with pytest.raises(IndexError):
+        reader.read_frame(gop_video, 40)
+
+
+def test_read_frame_decode_failure(gop_video, monkeypatch):
+    reader = frames.FrameReader(cache_size=4, pool_size=2)
+    # frames within the reported frame count that cannot be decoded are not reported as missing
+    frame_index = dict(frames.build_frame_index(gop_video), frame_count=50)
+    monkeypatch.setattr(reader, "get_frame_index", lambda fn: frame_index)
+    with pytest.raises(IOError, match="could not be read"):
+        reader.read_frame(gop_video, 45)
+    with pytest.raises(IndexError):
+        reader.read_frame(gop_video, 50)
+
+
+def test_capture_pool(gop_video, mocker):
+    reader = frames.FrameReader(cache_size=4, pool_size=2)
+    reader.read_frame(gop_video, 10)
+    # the next frame is read with the same capture, without seeking
+    cap, pos = reader.pool.acquire(gop_video, 11)
+    assert pos == 11
+    reader.pool.release(gop_video, cap, pos)
+    open_capture = mocker.spy(frames.cv2, "VideoCapture")
+    reader.read_frame(gop_video, 11)
+    assert open_capture.call_count == 0
+    reader.pool.clear()
+
+
+def test_get_frame_jpeg(gop_video, mocker):
+    reader = frames.FrameReader(cache_size=4, pool_size=2)
+    read_frame = mocker.spy(reader, "read_frame")
+    jpeg = reader.get_frame_jpeg(gop_video, 3, key=1)
+    assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape == (120, 160, 3)
+    # cached per video, frame and rotation
+    assert reader.get_frame_jpeg(gop_video, 3, key=1) == jpeg
+    rotated = reader.get_frame_jpeg(gop_video, 3, rotate=90, key=1)
+    assert cv2.imdecode(np.frombuffer(rotated, np.uint8), cv2.IMREAD_COLOR).shape == (160, 120, 3)
+    assert read_frame.call_count == 2
+    assert reader.cache.stats["hits"] == 1
+    with pytest.raises(ValueError, match="Rotation"):
+        reader.get_frame_jpeg(gop_video, 3, rotate=45)
@@ -0,0 +1,63 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from orc_api.utils import http_session
+
+
+@pytest.fixture
+def server():
+    """Local HTTP server recording client ports, failing the first GET request with 503."""
+    state = {"ports": set(), "get_count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep connections alive
+
+        def _respond(self, status):
+            state["ports"].add(self.client_address[1])
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def do_GET(self):
+            state["get_count"] += 1
+            self._respond(503 if state["get_count"] == 1 else 200)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._respond(201)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_get_http_session(monkeypatch):
+    http_session.close_http_session()
+    session = http_session.get_http_session()
+    assert http_session.get_http_session() is session
+    # a forked process gets its own session
+    monkeypatch.setattr(http_session.os, "getpid", lambda: -1)
+    assert http_session.get_http_session() is not session
+    http_session.close_http_session()
+
+
+def test_http_session_keep_alive_retry(server):
+    url, state = server
+    session = http_session.create_http_session(retries=2, backoff=0)
+    # temporary server errors of GET requests are retried
+    assert session.get(f"{url}/api/").status_code == 200
+    assert state["get_count"] == 2
+    for _ in range(5):
+        assert session.post(f"{url}/api/time_series/", json={"h": 1.0}).status_code == 201
+    # all requests went through one connection
+    assert len(state["ports"]) == 1
+    session.close()
@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from orc_api.utils import incoming_watcher
+
+
+def _write(path, content=b"video"):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_polling_backend(tmpdir):
+    backend = incoming_watcher.PollingBackend(str(tmpdir), poll_interval=0)
+    fn = os.path.join(tmpdir, "video_1.mp4")
+    _write(fn)
+    # first observation, not yet known to be stable
+    assert backend.read(timeout=0) == []
+    # unchanged since the previous poll
+    assert backend.read(timeout=0) == [fn]
+    # reported only once
+    assert backend.read(timeout=0) == []
+    # a growing file is not reported until it stopped changing
+    _write(fn, b"video with more data")
+    assert backend.read(timeout=0) == []
+    assert backend.read(timeout=0) == [fn]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_inotify_backend(tmpdir):
+    backend = incoming_watcher.InotifyBackend(str(tmpdir))
+    try:
+        fn = os.path.join(tmpdir, "video_1.mp4")
+        # file is reported when closed after writing
+        with open(fn, "wb") as f:
+            f.write(b"video")
+            assert backend.read(timeout=0.1) == []
+        assert backend.read(timeout=1) == [fn]
+        # files in new subfolders are reported too
+        subdir = os.path.join(tmpdir, "sub")
+        os.makedirs(subdir)
+        assert backend.read(timeout=1) == []
+        fn_sub = os.path.join(subdir, "video_2.mp4")
+        _write(fn_sub)
+        assert backend.read(timeout=1) == [fn_sub]
+    finally:
+        backend.close()
+
+
+def test_incoming_watcher_debounce(tmpdir):
+    submitted = []
+    watcher = incoming_watcher.IncomingWatcher(str(tmpdir), callback=submitted.append, suffix="mp4", debounce=2)
+    fn = os.path.join(tmpdir, "video_1.mp4")
+    _write(fn)
+    _write(os.path.join(tmpdir, "notes.txt"))
+    watcher.add_events([fn, os.path.join(tmpdir, "notes.txt")], now=0)
+    # only files with the right suffix are pending
+    assert list(watcher.pending) == [fn]
+    assert watcher.next_timeout(now=1) == 1
+    # a new event restarts the debounce time
+    watcher.add_events([fn], now=1.5)
+    assert watcher.pop_due(now=2.5) == []
+    assert watcher.pop_due(now=3.5) == [fn]
+    assert watcher.pending == {}
+    # removed or empty files are not submitted
+    watcher.add_events([os.path.join(tmpdir, "gone.mp4")], now=0)
+    assert watcher.pop_due(now=10) == []
+
+
+def test_incoming_watcher_thread(tmpdir):
+    submitted = threading.Event()
+    batches = []
+
+    def callback(file_paths):
+        batches.append(file_paths)
+        submitted.set()
+
+    watcher = incoming_watcher.IncomingWatcher(
+        str(tmpdir), callback=callback, suffix="mp4", debounce=0.1, poll_interval=0.1
+    )
+    watcher.start()
+    try:
+        fn = os.path.join(tmpdir, "video_1.mp4")
+        _write(fn)
+        assert submitted.wait(timeout=5)
+    finally:
+        watcher.stop(timeout=5)
+    assert batches == [[fn]]
@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from orc_api.utils import mjpeg
+
+
+# camera feed with a frame every 10 ms
+class FakeFeed:
+    live = True
+    opened = []
+
+    def __init__(self, url):
+        """Initialize a closed feed."""
+        self.url = url
+        self.is_open = False
+
+    def open(self):
+        self.is_open = True
+        self.opened.append(self)
+
+    def grab(self):
+        time.sleep(0.01)
+        return True
+
+    def retrieve(self):
+        return np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def fake_feed(monkeypatch):
+    FakeFeed.opened = []
+    monkeypatch.setattr(mjpeg, "FeedSource", FakeFeed)
+    return FakeFeed
+
+
+@pytest.fixture
+def video_file(tmpdir):
+    fn = str(tmpdir.join("video.mp4"))
+    out = cv2.VideoWriter(fn, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (64, 48))
+    for n in range(5):
+        out.write(np.full((48, 64, 3), n * 40, dtype=np.uint8))
+    out.release()
+    return fn
+
+
+@pytest.mark.parametrize(
+    ("rotate", "max_width", "shape"),
+    [(None, 0, (48, 64)), (90, 0, (64, 48)), (None, 32, (24, 32)), (270, 24, (32, 24))],
+)
+def test_encode_jpeg(rotate, max_width, shape):
+    frame = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+    jpeg = mjpeg.encode_jpeg(frame, rotate=rotate, max_width=max_width)
+    assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape[:2] == shape
+    # lower quality gives smaller frames
+    assert len(mjpeg.encode_jpeg(frame, rotate=rotate, quality=10, max_width=max_width)) < len(jpeg)
+    with pytest.raises(ValueError, match="Rotation"):
+        mjpeg.encode_jpeg(frame, rotate=45)
+
+
+@pytest.mark.asyncio
+async def test_stream_hub_shares_producer(video_file):
+    hub = mjpeg.StreamHub()
+    sources = []
+
+    def source_factory():
+        sources.append(mjpeg.VideoFileSource(video_file, start_frame=0, end_frame=5))
+        return sources[-1]
+
+    viewers = [hub.subscribe(video_file, source_factory, max_fps=0) for _ in range(2)]
+    # one producer reads the video for both viewers
+    assert len(sources) == 1
+    assert viewers[0].encoder is viewers[1].encoder
+    for viewer in viewers:
+        for _ in range(7):
+            jpeg = await asyncio.wait_for(viewer.get(), timeout=5)
+            assert jpeg.startswith(b"\xff\xd8")
+    # other options need another producer
+    other = hub.subscribe(video_file, source_factory, max_width=32, max_fps=0)
+    assert len(sources) == 2
+    hub.unsubscribe(other)
+    producer = viewers[0].encoder
+    hub.unsubscribe(viewers[0])
+    assert producer.is_alive()
+    # the producer stops with the last viewer
+    hub.unsubscribe(viewers[1])
+    assert not producer.is_alive()
+    hub.stop(timeout=5)
+    assert hub.producers == {}
+
+
+@pytest.mark.asyncio
+async def test_producer_backpressure(video_file):
+    producer = mjpeg.MJPEGProducer(mjpeg.VideoFileSource(video_file, end_frame=5), buffer_size=2)
+    viewer = producer.add_viewer(asyncio.get_running_loop())
+    producer.start()
+    await asyncio.sleep(0.5)
+    # the producer waits for the viewer instead of reading on
+    assert producer.frames == 2
+    await viewer.get()
+    await asyncio.sleep(0.5)
+    assert producer.frames == 3
+    producer.stop(timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_with_source(tmpdir, video_file):
+    hub = mjpeg.StreamHub()
+    frames = [frame async for frame in hub.stream(video_file, lambda: mjpeg.VideoFileSource(video_file), max_fps=0)]
+    assert len(frames) == 5
+    assert all(frame.startswith(mjpeg.FRAME_HEADER) for frame in frames)
+    # a feed that cannot be opened ends the stream without frames
+    missing = str(tmpdir.join("missing.mp4"))
+    assert [frame async for frame in hub.stream(missing, lambda: mjpeg.FeedSource(missing))] == []
+
+
+async def wait_for(condition, timeout=5.0):
+    tic = time.monotonic()
+    while not condition():
+        assert time.monotonic() - tic < timeout
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_feed_relay_fan_out(fake_feed):
+    hub = mjpeg.FeedRelayHub(idle_timeout=0.2)
+    viewers = [
+        hub.subscribe("rtsp://camera", max_fps=0),
+        hub.subscribe("rtsp://camera", max_fps=0),
+        hub.subscribe("rtsp://camera", max_width=32, max_fps=0),
+    ]
+    for viewer in viewers:
+        jpeg = await asyncio.wait_for(viewer.get(), timeout=5)
+        width = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape[1]
+        assert width == (32 if viewer is viewers[2] else 64)
+    # one connection to the camera, and one encoder per combination of options
+    assert len(fake_feed.opened) == 1
+    relay = hub.relays["rtsp://camera"]
+    assert len(relay.encoders) == 2
+    # frames are decoded once for all encoders
+    assert relay.frames_decoded <= relay.frames_read
+    for viewer in viewers[:2]:
+        hub.unsubscribe(viewer)
+    assert len(relay.encoders) == 1
+    assert hub.is_open("rtsp://camera")
+    hub.unsubscribe(viewers[2])
+    # the feed is closed when idle
+    await wait_for(lambda: not fake_feed.opened[0].is_open)
+    assert not hub.is_open("rtsp://camera")
+    assert hub.relays == {}
+
+
+@pytest.mark.asyncio
+async def test_feed_relay_reused_within_idle_timeout(fake_feed):
+    hub = mjpeg.FeedRelayHub(idle_timeout=5)
+    viewer = hub.subscribe("rtsp://camera", max_fps=0)
+    await asyncio.wait_for(viewer.get(), timeout=5)
+    hub.unsubscribe(viewer)
+    # e.g. a page reload, the camera is not connected again
+    viewer = hub.subscribe("rtsp://camera", max_fps=0)
+    await asyncio.wait_for(viewer.get(), timeout=5)
+    assert len(fake_feed.opened) == 1
+    hub.stop(timeout=5)
+    # remaining viewers receive the end of the stream
+    while await asyncio.wait_for(viewer.get(), timeout=5) is not None:
+        pass
+    assert not fake_feed.opened[0].is_open
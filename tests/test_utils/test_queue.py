@@ -90,6 +90,38 @@ async def test_process_video_not_ready(videos, session_mock, mock_send_task, moc
     mock_send_task.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_process_videos(videos, session_mock, mocker):
+    video_responses = [VideoResponse.model_validate(v) for v in videos]
+    mocker.patch.object(VideoResponse, "ready_to_run", new_callable=PropertyMock, return_value=(True, "Ready"))
+    group_mock = mocker.patch("orc_api.utils.queue.group")
+    session_mock.query.return_value.filter.return_value.all.return_value = videos
+
+    result = await queue.process_videos(session=session_mock, videos=video_responses, priority=1)
+
+    # all videos submitted in one group, and statuses updated in one transaction
+    group_mock.assert_called_once()
+    signatures = list(group_mock.call_args[0][0])
+    assert [sig.args for sig in signatures] == [(v.id, False) for v in videos]
+    group_mock.return_value.apply_async.assert_called_once()
+    session_mock.query.return_value.filter.return_value.update.assert_called_once()
+    session_mock.commit.assert_called_once()
+    assert len(result) == 3
+
+
+@pytest.mark.asyncio
+async def test_process_videos_not_ready(videos, session_mock, mocker):
+    video_responses = [VideoResponse.model_validate(v) for v in videos]
+    mocker.patch.object(
+        VideoResponse, "ready_to_run", new_callable=PropertyMock, return_value=(False, "Video is not ready.")
+    )
+    group_mock = mocker.patch("orc_api.utils.queue.group")
+    result = await queue.process_videos(session=session_mock, videos=video_responses)
+    assert result == []
+    group_mock.assert_not_called()
+    session_mock.commit.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_sync_video_no_site(videos, session_mock, mock_send_task):
     # when no site is available, the video instance should be returned as is without any error, and without task
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from orc_api import db
+from orc_api.utils import sync_executor
+
+
+def test_rate_limiter():
+    limiter = sync_executor.RateLimiter(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    # the first operation starts immediately, the next ones follow the rate
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+    # no limit
+    limiter = sync_executor.RateLimiter(rate=0)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+def test_get_rate_limiter():
+    limiter = sync_executor.get_rate_limiter(site=1, rate=5)
+    assert sync_executor.get_rate_limiter(site=1, rate=5) is limiter
+    assert sync_executor.get_rate_limiter(site=2, rate=5) is not limiter
+
+
+def test_sync_videos_concurrently(mocker):
+    publish = mocker.patch("orc_api.utils.sync_executor.publish_sync_progress")
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def sync_video(video_id):
+        with lock:
+            running.append(video_id)
+            max_running.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(video_id)
+        if video_id == 3:
+            raise RuntimeError("mocked failure")
+        return {"status": "ok", "video_id": video_id}
+
+    results = sync_executor.sync_videos_concurrently(list(range(10)), site=1, sync_video=sync_video, max_workers=3)
+
+    # results are in order of the videos, failures are reported per video
+    assert [r["video_id"] for r in results] == list(range(10))
+    assert results[3]["status"] == "error"
+    # videos are synced concurrently, but never more than the maximum number of workers
+    assert 1 < max(max_running) <= 3
+    # progress is published at the start and after each video
+    assert publish.call_count == 11
+    assert publish.call_args.kwargs == {"total": 10, "done": 10, "failed": 1}
+    # with one Redis client for the whole batch
+    assert len({call.args[0] for call in publish.call_args_list}) == 1
+
+
+def test_publish_sync_progress():
+    client = MagicMock()
+    sync_executor.publish_sync_progress(client, site=1, total=10, done=2, failed=1)
+    # batch progress is not sent to consumers of the status of single videos
+    channel, message = client.publish.call_args.args
+    assert channel == "video_sync_progress"
+    assert json.loads(message) == {"batch": True, "site": 1, "total": 10, "done": 2, "failed": 1}
+    # failures to publish do not stop the sync
+    client.publish.side_effect = ConnectionError("redis unavailable")
+    sync_executor.publish_sync_progress(client, site=1, total=10, done=3, failed=1)
+
+
+def test_sync_video_configs(session_config, mocker):
+    vc_shared = db.VideoConfig(name="shared")
+    vc_synced = db.VideoConfig(name="synced", sync_status=db.SyncStatus.SYNCED)
+    session_config.add_all([vc_shared, vc_synced])
+    session_config.commit()
+    videos = [db.Video(timestamp=datetime(2024, 1, 1, h), video_config_id=vc_shared.id) for h in range(3)]
+    videos.append(db.Video(timestamp=datetime(2024, 1, 1, 4), video_config_id=vc_synced.id))
+    session_config.add_all(videos)
+    session_config.commit()
+    response = MagicMock()
+    get_response = mocker.patch("orc_api.utils.sync_executor.get_video_config_response", return_value=response)
+
+    failed = sync_executor.sync_video_configs(session_config, [v.id for v in videos], site=1)
+
+    # the shared video config is pushed once for all its videos, synced video configs are skipped
+    assert failed == []
+    get_response.assert_called_once()
+    assert get_response.call_args.args[0].id == vc_shared.id
+    response.sync_remote.assert_called_once_with(session=session_config, site=1)
+    # failing video configs are reported
+    response.sync_remote.side_effect = ValueError("Remote update failed")
+    assert sync_executor.sync_video_configs(session_config, [v.id for v in videos], site=1) == [vc_shared.id]
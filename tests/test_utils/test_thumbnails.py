@@ -0,0 +1,99 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from orc_api import db
+from orc_api.utils import thumbnails
+
+
+@pytest.fixture
+def upload_dir(tmpdir, monkeypatch):
+    # a small video in the upload directory
+    os.makedirs(tmpdir.join("videos", "1"))
+    out = cv2.VideoWriter(
+        str(tmpdir.join("videos", "1", "video.mp4")), cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (320, 240)
+    )
+    for _ in range(3):
+        out.write((255 * np.random.rand(240, 320, 3)).astype(np.uint8))
+    out.release()
+    # a file that is not a video
+    os.makedirs(tmpdir.join("videos", "2"))
+    tmpdir.join("videos", "2", "video.mp4").write("not a video")
+    monkeypatch.setattr("orc_api.db.video.UPLOAD_DIRECTORY", str(tmpdir))
+    return str(tmpdir)
+
+
+@pytest.fixture
+def thumbnail_worker(upload_dir, monkeypatch):
+    worker = thumbnails.ThumbnailWorker(base_path=upload_dir)
+    monkeypatch.setattr(thumbnails, "thumbnail_worker", worker)
+    yield worker
+    worker.stop(timeout=5)
+
+
+def test_create_video_thumbnails(upload_dir):
+    assert thumbnails.create_video_thumbnails("videos/1/video.mp4", base_path=upload_dir) == "videos/1/video_thumb.jpg"
+    sizes = {}
+    for size in thumbnails.THUMBNAIL_SIZES:
+        img = cv2.imread(os.path.join(upload_dir, "videos", "1", f"video_{size}.jpg"))
+        sizes[size] = img.shape[:2]
+    assert sizes == {"thumb": (38, 50), "preview": (240, 320)}
+
+
+def test_thumbnail_worker(session_config, thumbnail_worker, mocker):
+    create_thumbnails = mocker.spy(thumbnails.image, "create_thumbnails")
+    videos = [db.Video(file=f"videos/{n}/video.mp4") for n in [1, 2]]
+    # no thumbnails are made without a video file
+    videos.append(db.Video(file="videos/3/video.mp4"))
+    session_config.add_all(videos)
+    session_config.commit()
+    assert [video.thumbnail_status for video in videos] == [db.ThumbnailStatus.PENDING] * 3
+    thumbnail_worker.join()
+    # decoded once per video, not within the transaction of the request
+    assert create_thumbnails.call_count == 2
+    for video in videos:
+        session_config.refresh(video)
+    assert [video.thumbnail_status for video in videos] == [
+        db.ThumbnailStatus.DONE,
+        db.ThumbnailStatus.FAILED,
+        db.ThumbnailStatus.PENDING,
+    ]
+    assert videos[0].thumbnail == "videos/1/video_thumb.jpg"
+    assert videos[1].thumbnail is None
+    # failed videos are not queued again on updates
+    videos[1].status = db.VideoStatus.DONE
+    session_config.commit()
+    thumbnail_worker.join()
+    assert create_thumbnails.call_count == 2
+
+
+def test_thumbnail_worker_rollback(session_config, thumbnail_worker):
+    submit = threading.Event()
+    thumbnail_worker.submit = lambda *args: submit.set()
+    session_config.add(db.Video(file="videos/1/video.mp4"))
+    session_config.flush()
+    session_config.rollback()
+    session_config.commit()
+    assert not submit.is_set()
+
+
+def test_restore_pending_thumbnails(session_config, thumbnail_worker, mocker):
+    # videos added by a process that stopped before their thumbnails were created
+    submit = mocker.patch.object(thumbnail_worker, "submit")
+    videos = [db.Video(file=f"videos/{n}/video.mp4") for n in [1, 2, 3]]
+    session_config.add_all(videos)
+    session_config.commit()
+    mocker.stop(submit)
+    # queued again at startup, except videos without video file
+    assert thumbnails.restore_pending_thumbnails(session_config) == 2
+    assert thumbnail_worker.join(timeout=5)
+    for video in videos:
+        session_config.refresh(video)
+    assert [video.thumbnail_status for video in videos] == [
+        db.ThumbnailStatus.DONE,
+        db.ThumbnailStatus.FAILED,
+        db.ThumbnailStatus.PENDING,
+    ]